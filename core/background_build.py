@@ -0,0 +1,183 @@
+"""
+Background construction of the code detection and matching indexes.
+Builds run on a daemon thread and publish partial tables as they go, so
+callers on the GUI thread never wait for an index to finish.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+# Build states reported by BackgroundBuilder.state
+BUILD_IDLE = 'idle'
+BUILD_RUNNING = 'building'
+BUILD_READY = 'ready'
+BUILD_FAILED = 'failed'
+
+
+class BuildTicket:
+    """
+    Handle a build function uses to report progress and publish results.
+    
+    A ticket belongs to one build. Once a newer build is started (or the
+    build is cancelled) the ticket is stale: cancelled turns True and
+    publish() stops applying results, so a superseded build can never
+    overwrite the tables of the current one.
+    """
+    
+    def __init__(self, builder: 'BackgroundBuilder' = None, generation: int = 0,
+                 first_publish: int = 64):
+        """
+        Initialize a build ticket.
+        
+        Args:
+            builder: Owning builder, or None for a synchronous build
+            generation: Build generation the ticket belongs to
+            first_publish: Files to process before the first partial publish
+        """
+        self.builder = builder
+        self.generation = generation
+        self._next_publish = first_publish
+    
+    @property
+    def cancelled(self) -> bool:
+        """Check if a newer build superseded this one."""
+        return self.builder is not None and self.builder.generation != self.generation
+    
+    def report(self, files_done: int, files_total: int):
+        """Report how many files the build has processed."""
+        if self.builder is not None and not self.cancelled:
+            self.builder.files_done = files_done
+            self.builder.files_total = files_total
+    
+    def should_publish(self, files_done: int) -> bool:
+        """
+        Check if partial results should be published after files_done files.
+        
+        Checkpoints double each time, so republishing growing tables costs
+        at most a constant factor over building them once.
+        """
+        if self.builder is None or files_done < self._next_publish:
+            return False
+        while self._next_publish <= files_done:
+            self._next_publish *= 2
+        return True
+    
+    def publish(self, apply: Callable[[], None]) -> bool:
+        """
+        Apply results unless the build was superseded.
+        
+        Args:
+            apply: Function swapping the new tables into place
+        
+        Returns:
+            True if the results were applied
+        """
+        if self.builder is None:
+            apply()
+            return True
+        
+        with self.builder._lock:
+            if self.cancelled:
+                return False
+            apply()
+            return True
+
+
+class BackgroundBuilder:
+    """Runs one index build at a time on a daemon thread."""
+    
+    def __init__(self, name: str):
+        """
+        Initialize the builder.
+        
+        Args:
+            name: Name used for the worker thread and log messages
+        """
+        self.name = name
+        self.state = BUILD_IDLE
+        self.key = None
+        self.files_done = 0
+        self.files_total = 0
+        self.error = None
+        self.started_at = 0.0
+        self.generation = 0
+        
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def start(self, key: str, build: Callable[[BuildTicket], bool]):
+        """
+        Start a build, superseding any build still running.
+        
+        Args:
+            key: What is being built (e.g. the project name)
+            build: Function doing the build; receives a BuildTicket and
+                returns True on success
+        """
+        with self._lock:
+            self.generation += 1
+            ticket = BuildTicket(self, self.generation)
+            self.key = key
+            self.state = BUILD_RUNNING
+            self.files_done = 0
+            self.files_total = 0
+            self.error = None
+            self.started_at = time.time()
+        
+        self._thread = threading.Thread(
+            target=self._run, args=(ticket, build),
+            name=f"{self.name}-build", daemon=True
+        )
+        self._thread.start()
+    
+    def _run(self, ticket: BuildTicket, build: Callable[[BuildTicket], bool]):
+        """Run a build on the worker thread and record how it ended."""
+        try:
+            success = build(ticket)
+            error = None
+        except Exception as e:
+            print(f"Error in background {self.name} build: {e}")
+            success = False
+            error = str(e)
+        
+        with self._lock:
+            if ticket.generation == self.generation:
+                self.state = BUILD_READY if success else BUILD_FAILED
+                self.error = error
+    
+    def cancel(self):
+        """Supersede the running build, if any, and go back to idle."""
+        with self._lock:
+            self.generation += 1
+            self.key = None
+            self.state = BUILD_IDLE
+            self.files_done = 0
+            self.files_total = 0
+    
+    def is_building(self) -> bool:
+        """Check if a build is in progress."""
+        return self.state == BUILD_RUNNING
+    
+    def progress(self) -> float:
+        """Get the share of files processed by the current build (0.0 to 1.0)."""
+        if self.state == BUILD_READY:
+            return 1.0
+        if not self.files_total:
+            return 0.0
+        return min(1.0, self.files_done / self.files_total)
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the running build to finish.
+        
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+        
+        Returns:
+            True if no build is running anymore
+        """
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return not self.is_building()
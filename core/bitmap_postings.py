@@ -0,0 +1,232 @@
+"""
+Compressed file-set postings for the identifier index.
+Each key maps to the set of file ids containing it, stored roaring-style:
+sparse sets as sorted id arrays, dense sets as integer bitmaps, so
+intersections, unions and popcounts run as big-integer operations in C.
+"""
+
+from array import array
+from typing import Iterable, List
+
+# Keys found in more than this share of files carry no evidence and are dropped
+DEFAULT_MAX_DOC_SHARE = 0.5
+
+# Projects smaller than this keep every key; shares are meaningless on a few files
+MIN_FILES_FOR_STOP_KEYS = 20
+
+
+def bitmap_from_ids(file_ids: Iterable[int]) -> int:
+    """Build an integer bitmap with the bits of the given file ids set."""
+    bitmap = 0
+    for file_id in file_ids:
+        bitmap |= 1 << file_id
+    return bitmap
+
+
+def popcount(bitmap: int) -> int:
+    """Count the set bits of an integer bitmap (int.bit_count needs Python 3.10)."""
+    return bin(bitmap).count('1')
+
+
+def bitmap_ids(bitmap: int) -> List[int]:
+    """
+    List the file ids set in an integer bitmap, in increasing order.
+    
+    Args:
+        bitmap: Non-negative integer bitmap
+    
+    Returns:
+        Ids of the set bits
+    """
+    bits = bin(bitmap)[:1:-1]  # Least significant bit first
+    ids = []
+    position = bits.find('1')
+    while position >= 0:
+        ids.append(position)
+        position = bits.find('1', position + 1)
+    return ids
+
+
+class BitmapPostings:
+    """
+    Key -> file-id set postings with array and bitmap containers.
+    
+    Ids are appended as array('I') containers while indexing; freeze()
+    drops stop keys by document frequency and turns containers whose ids
+    would take more room than a bitmap into integer bitmaps.
+    """
+    
+    def __init__(self, max_doc_share: float = DEFAULT_MAX_DOC_SHARE):
+        """
+        Initialize empty postings.
+        
+        Args:
+            max_doc_share: Keys in a larger share of files are dropped on freeze()
+        """
+        self.max_doc_share = max_doc_share
+        self.total_files = 0
+        self.stop_keys = 0
+        self._postings = {}  # key -> array('I') of file ids or int bitmap
+    
+    def __len__(self) -> int:
+        return len(self._postings)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._postings
+    
+    def __iter__(self):
+        return iter(self._postings)
+    
+    def add_file(self, file_id: int, keys: Iterable[str]):
+        """
+        Record that a file contains each of the given (distinct) keys.
+        
+        Args:
+            file_id: Interned id of the file
+            keys: Distinct keys found in the file
+        """
+        postings = self._postings
+        for key in keys:
+            container = postings.get(key)
+            if container is None:
+                postings[key] = array('I', [file_id])
+            elif isinstance(container, int):
+                postings[key] = container | (1 << file_id)
+            else:
+                container.append(file_id)
+        self.total_files = max(self.total_files, file_id + 1)
+    
+    def doc_freq(self, key: str) -> int:
+        """Get the number of files containing a key."""
+        container = self._postings.get(key)
+        if container is None:
+            return 0
+        if isinstance(container, int):
+            return popcount(container)
+        return len(container)
+    
+    def bitmap(self, key: str) -> int:
+        """Get the files containing a key as an integer bitmap (0 if none)."""
+        container = self._postings.get(key, 0)
+        if isinstance(container, int):
+            return container
+        return bitmap_from_ids(container)
+    
+    def file_ids(self, key: str) -> List[int]:
+        """Get the ids of the files containing a key."""
+        container = self._postings.get(key)
+        if container is None:
+            return []
+        if isinstance(container, int):
+            return bitmap_ids(container)
+        return list(container)
+    
+    def freeze(self, total_files: int = None):
+        """
+        Drop stop keys and pick the compact container for every key.
+        
+        Args:
+            total_files: Number of indexed files (default: highest id + 1)
+        """
+        if total_files is not None:
+            self.total_files = total_files
+        total = self.total_files
+        
+        max_doc_freq = int(total * self.max_doc_share)
+        drop_stop_keys = total >= MIN_FILES_FOR_STOP_KEYS
+        frozen = {}
+        
+        for key, container in self._postings.items():
+            doc_freq = popcount(container) if isinstance(container, int) else len(container)
+            if drop_stop_keys and doc_freq > max_doc_freq:
+                self.stop_keys += 1
+                continue
+            
+            # An id costs 32 bits in an array, a bitmap costs one bit per file
+            if not isinstance(container, int) and doc_freq * 32 > total:
+                container = bitmap_from_ids(container)
+            frozen[key] = container
+        
+        self._postings = frozen
+    
+    def memory_usage(self) -> int:
+        """Get the approximate bytes held by the containers and their keys."""
+        total = 0
+        for key, container in self._postings.items():
+            total += len(key)
+            if isinstance(container, int):
+                total += (container.bit_length() + 7) // 8
+            else:
+                total += len(container) * container.itemsize
+        return total
+    
+    def frozen_copy(self) -> 'BitmapPostings':
+        """Get a frozen copy, leaving these postings open for more files."""
+        copy = BitmapPostings(self.max_doc_share)
+        copy.total_files = self.total_files
+        copy._postings = {
+            key: container if isinstance(container, int) else array('I', container)
+            for key, container in self._postings.items()
+        }
+        copy.freeze()
+        return copy
+
+
+class BitSlicedCounter:
+    """
+    Per-file counters kept as bit planes of integer bitmaps.
+    
+    Adding a bitmap increments the counter of every file in it with one
+    ripple-carry pass over the planes, so counting how many query keys
+    each file contains costs a few big-integer operations per key rather
+    than a Python step per file.
+    """
+    
+    def __init__(self, bits: int = 3):
+        """
+        Initialize counters able to count up to 2**bits - 1.
+        
+        Args:
+            bits: Number of bit planes; larger counts saturate
+        """
+        self.planes = [0] * bits
+        self.saturated = 0  # Files whose count overflowed the planes
+        self.touched = 0    # Files counted at least once
+    
+    def add(self, bitmap: int, times: int = 1):
+        """
+        Increment the counters of all files in a bitmap.
+        
+        Args:
+            bitmap: Files to count
+            times: How many times to count them
+        """
+        self.touched |= bitmap
+        for _ in range(times):
+            carry = bitmap
+            for i, plane in enumerate(self.planes):
+                self.planes[i] = plane ^ carry
+                carry &= plane
+                if not carry:
+                    break
+            self.saturated |= carry
+    
+    def exactly(self, count: int) -> int:
+        """Get the bitmap of files counted exactly `count` times."""
+        if count <= 0 or count >= 1 << len(self.planes):
+            return 0
+        
+        result = self.touched & ~self.saturated
+        for i, plane in enumerate(self.planes):
+            if count >> i & 1:
+                result &= plane
+            else:
+                result &= ~plane
+        return result
+    
+    def at_least(self, count: int) -> int:
+        """Get the bitmap of files counted at least `count` times."""
+        result = self.saturated
+        for value in range(max(1, count), 1 << len(self.planes)):
+            result |= self.exactly(value)
+        return result
@@ -0,0 +1,246 @@
+"""
+Shared in-memory store of project file contents.
+Each file of a project is read once into a single compact per-project
+buffer; the detection and matching indexes take views of it and derive
+normalized forms lazily instead of keeping their own copies.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Larger files are not stored; readers fall back to reading them from disk
+MAX_STORED_FILE_SIZE = 1024 * 1024
+
+# Projects kept in memory at once (the current one and the one before it)
+MAX_STORED_PROJECTS = 2
+
+
+def decode_text(data: bytes) -> str:
+    """
+    Decode stored bytes the way open(..., errors='ignore') reads text.
+    
+    Args:
+        data: Raw file bytes
+    
+    Returns:
+        Text with universal newlines
+    """
+    text = bytes(data).decode('utf-8', errors='ignore')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+class ProjectContentStore:
+    """
+    Raw bytes of project files, one buffer per project, addressed by offsets.
+    
+    Each buffer is an immutable bytes object replaced as a whole when files
+    change, so memoryviews handed out stay valid while a reload runs. The
+    most recently loaded projects are kept side by side, so matchers working
+    on different projects don't evict each other's contents.
+    """
+    
+    def __init__(self, max_file_size: int = MAX_STORED_FILE_SIZE,
+                 max_projects: int = MAX_STORED_PROJECTS):
+        """
+        Initialize an empty content store.
+        
+        Args:
+            max_file_size: Largest file kept in memory
+            max_projects: Number of projects kept in memory
+        """
+        self.max_file_size = max_file_size
+        self.max_projects = max_projects
+        
+        # project_name -> (buffer, file_path -> (offset, length, mtime, size)),
+        # least recently loaded first; each value is swapped as one
+        self._projects = OrderedDict()
+        self._derived = {}  # project_name -> {form -> {file_path: derived text}}
+        self._lock = threading.RLock()
+    
+    def __contains__(self, file_path: str) -> bool:
+        return self._find(file_path) is not None
+    
+    def __len__(self) -> int:
+        return sum(len(entries) for _, entries in list(self._projects.values()))
+    
+    def load(self, project_name: str, file_paths: Iterable[str],
+             keep: Optional[Iterable[str]] = None) -> int:
+        """
+        Make the store hold the current contents of a project's files.
+        
+        Only file_paths are checked: those already stored with an unchanged
+        mtime and size are kept without being read again, everything else
+        is read once.
+        
+        Args:
+            project_name: Name of the project
+            file_paths: Files to check (the changed files, or all of them)
+            keep: Other files of the project to keep as stored without
+                checking them; without it, file_paths is the complete file
+                list and any other stored file is dropped
+        
+        Returns:
+            Number of files read from disk
+        """
+        with self._lock:
+            old_buffer, old_entries = self._projects.pop(project_name, (b'', {}))
+            derived = self._derived.setdefault(project_name, {})
+            buffer_view = memoryview(old_buffer)
+            parts = []
+            entries = {}
+            offset = 0
+            files_read = 0
+            
+            def add(file_path, data, mtime, size):
+                nonlocal offset
+                entries[file_path] = (offset, len(data), mtime, size)
+                parts.append(data)
+                offset += len(data)
+            
+            for file_path in file_paths:
+                try:
+                    stat = os.stat(file_path)
+                    if stat.st_size > self.max_file_size:
+                        continue
+                    
+                    old = old_entries.get(file_path)
+                    if old is not None and old[2:] == (stat.st_mtime, stat.st_size):
+                        data = buffer_view[old[0]:old[0] + old[1]]
+                    else:
+                        with open(file_path, 'rb') as f:
+                            data = f.read()
+                        files_read += 1
+                        self._drop_derived(derived, file_path)
+                    add(file_path, data, stat.st_mtime, stat.st_size)
+                
+                except OSError as e:
+                    print(f"Error reading {file_path} into content store: {e}")
+            
+            for file_path in (keep or ()):
+                old = old_entries.get(file_path)
+                if old is not None and file_path not in entries:
+                    add(file_path, buffer_view[old[0]:old[0] + old[1]], *old[2:])
+            
+            for file_path in old_entries.keys() - entries.keys():
+                self._drop_derived(derived, file_path)
+            
+            if files_read or entries.keys() != old_entries.keys():
+                self._projects[project_name] = (b''.join(parts), entries)
+            else:
+                self._projects[project_name] = (old_buffer, old_entries)
+            
+            # Keep only the most recently loaded projects
+            while len(self._projects) > self.max_projects:
+                evicted, _ = self._projects.popitem(last=False)
+                self._derived.pop(evicted, None)
+            return files_read
+    
+    def clear(self, project_name: Optional[str] = None):
+        """
+        Drop stored contents.
+        
+        Args:
+            project_name: Project to drop, or None for all projects
+        """
+        with self._lock:
+            if project_name is None:
+                self._projects = OrderedDict()
+                self._derived = {}
+            else:
+                self._projects.pop(project_name, None)
+                self._derived.pop(project_name, None)
+    
+    @staticmethod
+    def _drop_derived(derived: Dict[str, Dict[str, str]], file_path: str):
+        """Forget derived forms of a file whose contents changed."""
+        for forms in derived.values():
+            forms.pop(file_path, None)
+    
+    def _find(self, file_path: str) -> Optional[Tuple[str, bytes, Tuple[int, int, float, int]]]:
+        """Get (project name, buffer, entry) of a stored file, most recent project first."""
+        for project_name, (buffer, entries) in reversed(list(self._projects.items())):
+            entry = entries.get(file_path)
+            if entry is not None:
+                return project_name, buffer, entry
+        return None
+    
+    def raw(self, file_path: str) -> Optional[memoryview]:
+        """Get a read-only view of a stored file's bytes, or None if not stored."""
+        found = self._find(file_path)
+        if found is None:
+            return None
+        _, buffer, entry = found
+        return memoryview(buffer)[entry[0]:entry[0] + entry[1]]
+    
+    def text(self, file_path: str) -> Optional[str]:
+        """Get a stored file's text, or None if not stored."""
+        data = self.raw(file_path)
+        return decode_text(data) if data is not None else None
+    
+    def stat(self, file_path: str) -> Optional[Tuple[float, int]]:
+        """Get the (mtime, size) a stored file was read with."""
+        found = self._find(file_path)
+        return found[2][2:] if found is not None else None
+    
+    def file_paths(self, project_name: str) -> List[str]:
+        """Get the paths of a project's stored files."""
+        return list(self._projects.get(project_name, (b'', {}))[1])
+    
+    def derived(self, file_path: str, form: str, normalize: Callable[[str], str]) -> Optional[str]:
+        """
+        Get a normalized form of a file, computing it on first use.
+        
+        Every caller asking for the same form shares one copy.
+        
+        Args:
+            file_path: Path to the file
+            form: Name of the normalized form (e.g. 'whitespace')
+            normalize: Function computing the form from the file text
+        
+        Returns:
+            Derived text, or None if the file is not stored
+        """
+        found = self._find(file_path)
+        if found is None:
+            return None
+        project_name, buffer, entry = found
+        forms = self._derived.setdefault(project_name, {}).setdefault(form, {})
+        value = forms.get(file_path)
+        if value is None:
+            value = normalize(decode_text(memoryview(buffer)[entry[0]:entry[0] + entry[1]]))
+            forms[file_path] = value
+        return value
+    
+    def memory_usage(self) -> Dict[str, int]:
+        """Get bytes held by the raw buffers and by each derived form."""
+        usage = {'raw': sum(len(buffer) for buffer, _ in list(self._projects.values()))}
+        for derived in list(self._derived.values()):
+            for form, values in list(derived.items()):
+                usage[form] = usage.get(form, 0) + sum(len(value) for value in list(values.values()))
+        return usage
+
+
+def read_text(file_path: str) -> str:
+    """
+    Get a file's text from the shared store, reading it from disk if it is
+    not stored (too large, or not part of a loaded project).
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        File text
+    """
+    text = project_content_store.text(file_path)
+    if text is None:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+    return text
+
+
+# Create singleton instance
+project_content_store = ProjectContentStore()
@@ -0,0 +1,61 @@
+"""
+Time budgets for matching on the interactive clipboard path.
+Matchers check a Deadline as they visit files and, once it passes, return
+the best results found so far in a MatchResults list flagged as partial.
+"""
+
+import time
+from typing import Iterable, Optional
+
+
+class Deadline:
+    """
+    Point in time a search has to finish by.
+    
+    A Deadline without a budget never expires, so callers can check one
+    unconditionally. Once expired() has returned True the deadline stays
+    `reached`, which is how a search reports that it stopped early.
+    """
+    
+    def __init__(self, deadline_ms: Optional[float] = None):
+        """
+        Start the clock.
+        
+        Args:
+            deadline_ms: Time budget in milliseconds, or None for no limit
+        """
+        self.deadline_ms = deadline_ms
+        self.expires_at = None if deadline_ms is None else time.monotonic() + deadline_ms / 1000.0
+        self.reached = False
+    
+    def expired(self) -> bool:
+        """Check if the budget is used up (and remember that it was)."""
+        if self.expires_at is not None and not self.reached and time.monotonic() >= self.expires_at:
+            self.reached = True
+        return self.reached
+    
+    def remaining_ms(self) -> Optional[float]:
+        """Get the milliseconds left, or None if there is no limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000.0)
+
+
+class MatchResults(list):
+    """
+    List of matches that also tells whether the search was cut short.
+    
+    Behaves like the plain list the matchers used to return; `partial` is
+    True when a deadline stopped the search before every file was visited.
+    """
+    
+    def __init__(self, matches: Iterable = (), partial: bool = False):
+        """
+        Initialize the results.
+        
+        Args:
+            matches: Matches, best first
+            partial: Whether the search stopped at its deadline
+        """
+        super().__init__(matches)
+        self.partial = partial
@@ -0,0 +1,176 @@
+"""
+Read-only access to a repository's index (`.git/index`).
+The index lists every tracked file with the stat data git recorded when it
+last staged it, so a project's tracked files are known without walking the
+tree, and a file whose size and modification time still match its entry is
+unmodified without reading it - the same check `git status` makes.
+"""
+
+import os
+import struct
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from .git_objects import GitError
+
+# Modes of regular files (symlinks, submodules and sparse directories are left to the walk)
+REGULAR_FILE_MODES = (0o100644, 0o100755, 0o100664)
+
+# Entry flags
+FLAG_EXTENDED = 0x4000
+FLAG_STAGE = 0x3000
+EXTENDED_SKIP_WORKTREE = 0x4000
+
+_ENTRY = struct.Struct('>10I20sH')
+
+
+class IndexEntry(NamedTuple):
+    """Stat data git recorded for one tracked file."""
+    mtime_seconds: int
+    mtime_nanoseconds: int
+    size: int           # Lower 32 bits, as stored by git
+    mode: int
+
+
+class GitIndex:
+    """
+    Tracked files of a repository's index.
+    
+    Supports index versions 2 to 4. Split indexes and sparse indexes don't
+    list every file, so reading them raises GitError.
+    """
+    
+    def __init__(self, index_path: Path):
+        """
+        Read an index file.
+        
+        Args:
+            index_path: Path of the index (usually .git/index)
+        
+        Raises:
+            GitError: If the index is missing, corrupt or of an unsupported kind
+        """
+        try:
+            stat = os.stat(index_path)
+            with open(index_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            raise GitError(f"Cannot read index: {e}")
+        
+        self.mtime = stat.st_mtime_ns   # For racily clean entries (see is_modified)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.entries = self._parse(data)  # '/'-separated path -> IndexEntry
+    
+    @staticmethod
+    def _parse(data: bytes) -> Dict[str, IndexEntry]:
+        """Parse the header, entries and extension list of an index."""
+        if len(data) < 32 or data[:4] != b'DIRC':
+            raise GitError("Not a git index")
+        version, count = struct.unpack_from('>II', data, 4)
+        if version not in (2, 3, 4):
+            raise GitError(f"Unsupported index version {version}")
+        
+        entries = {}
+        offset = 12
+        previous = b''
+        try:
+            for _ in range(count):
+                (_, _, mtime_seconds, mtime_nanoseconds, _, _, mode, _, _, size,
+                 _, flags) = _ENTRY.unpack_from(data, offset)
+                start = offset
+                offset += _ENTRY.size
+                extended = 0
+                if flags & FLAG_EXTENDED:
+                    extended, = struct.unpack_from('>H', data, offset)
+                    offset += 2
+                
+                if version == 4:
+                    # Path prefix-compressed against the previous entry's path
+                    strip, offset = _read_varint(data, offset)
+                    end = data.index(b'\0', offset)
+                    path = previous[:len(previous) - strip] + data[offset:end]
+                    offset = end + 1
+                else:
+                    # NUL-terminated, padded to a multiple of 8 bytes
+                    end = data.index(b'\0', offset)
+                    path = data[offset:end]
+                    offset = start + ((end - start + 8) & ~7)
+                previous = path
+                
+                if mode == 0o040000:
+                    raise GitError("Sparse index")
+                if (mode in REGULAR_FILE_MODES and not flags & FLAG_STAGE and
+                        not extended & EXTENDED_SKIP_WORKTREE):
+                    entries[path.decode('utf-8', errors='surrogateescape')] = IndexEntry(
+                        mtime_seconds, mtime_nanoseconds, size, mode
+                    )
+        except (struct.error, ValueError) as e:
+            raise GitError(f"Corrupt index: {e}")
+        
+        # A split index keeps most entries in a shared file
+        while offset + 8 <= len(data) - 20:
+            signature, size = struct.unpack_from('>4sI', data, offset)
+            if signature == b'link':
+                raise GitError("Split index")
+            offset += 8 + size
+        
+        return entries
+    
+    def is_modified(self, entry: IndexEntry, stat: os.stat_result) -> bool:
+        """
+        Check if a file may differ from its index entry.
+        
+        Args:
+            entry: Index entry of the file
+            stat: Current stat of the file
+        
+        Returns:
+            True if size or modification time changed, or if the file was
+            modified so close to the index write that its stat data can't
+            tell (racily clean, as git calls it)
+        """
+        if (stat.st_size & 0xFFFFFFFF) != entry.size:
+            return True
+        seconds, nanoseconds = divmod(stat.st_mtime_ns, 1_000_000_000)
+        if seconds != entry.mtime_seconds:
+            return True
+        if entry.mtime_nanoseconds and nanoseconds != entry.mtime_nanoseconds:
+            return True
+        
+        # Written in the same instant as the index: later writes may keep the stat data
+        index_seconds, index_nanoseconds = divmod(self.mtime, 1_000_000_000)
+        if entry.mtime_seconds != index_seconds:
+            return entry.mtime_seconds > index_seconds
+        return not entry.mtime_nanoseconds or entry.mtime_nanoseconds >= index_nanoseconds
+
+
+def _read_varint(data: bytes, offset: int):
+    """Read a variable-length integer as used by index version 4 paths."""
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, offset
+
+
+def read_git_index(git_dir: Path) -> Optional[GitIndex]:
+    """
+    Read the index of a repository.
+    
+    Args:
+        git_dir: Git directory of the repository
+    
+    Returns:
+        The index, or None if it is missing or cannot be used
+    """
+    index_path = git_dir / 'index'
+    if not index_path.exists():
+        return None
+    try:
+        return GitIndex(index_path)
+    except GitError as e:
+        print(f"Not using git index {index_path}: {e}")
+        return None
@@ -0,0 +1,487 @@
+"""
+Read-only access to a local git repository's objects.
+Commits, trees and blobs are read straight from `.git` - loose objects and
+packfiles (version 2 index, offset and reference deltas) - without running
+git or touching the network. Only SHA-1 repositories are supported.
+"""
+
+import mmap
+import struct
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Pack object types
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+TYPE_NAMES = {OBJ_COMMIT: b'commit', OBJ_TREE: b'tree', OBJ_BLOB: b'blob', OBJ_TAG: b'tag'}
+
+# Tree entry modes of files and directories (symlinks and submodules are skipped)
+FILE_MODES = (b'100644', b'100755', b'100664')
+TREE_MODE = b'40000'
+
+# Decompressed delta bases kept for reuse; deltas of one file's versions chain
+MAX_CACHED_BASES = 256
+
+# Compressed bytes fed to zlib at a time when inflating packed objects
+INFLATE_CHUNK = 64 * 1024
+
+
+class GitError(Exception):
+    """Raised when a repository or one of its objects cannot be read."""
+
+
+def find_git_dir(path: str) -> Optional[Tuple[Path, Path]]:
+    """
+    Find the working tree root and git directory of a path.
+    
+    Args:
+        path: Working tree root (or any directory inside it)
+    
+    Returns:
+        Tuple of (working tree root, git directory), or None if the path is
+        not in a repository
+    """
+    current = Path(path).resolve()
+    for directory in [current] + list(current.parents):
+        dot_git = directory / '.git'
+        if dot_git.is_dir():
+            return directory, dot_git
+        if dot_git.is_file():
+            # Worktrees and submodules point to their git directory
+            with open(dot_git, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read().strip()
+            if content.startswith('gitdir:'):
+                return directory, (directory / content[len('gitdir:'):].strip()).resolve()
+    return None
+
+
+def common_git_dir(git_dir: Path) -> Path:
+    """Get the directory holding a repository's objects and shared refs (the main one for linked worktrees)."""
+    common_dir = git_dir / 'commondir'
+    if common_dir.is_file():
+        return (git_dir / common_dir.read_text().strip()).resolve()
+    return git_dir
+
+
+def resolve_ref(git_dir: Path, common_dir: Path, ref: str = 'HEAD') -> Optional[str]:
+    """
+    Resolve a ref (e.g. 'HEAD' or 'refs/heads/main') to a commit id.
+    
+    Args:
+        git_dir: Git directory (see find_git_dir)
+        common_dir: Its common directory (see common_git_dir)
+        ref: Ref name
+    
+    Returns:
+        Hex commit id, or None if the ref does not exist (e.g. no commits yet)
+    """
+    packed_refs = None
+    for _ in range(10):  # Symbolic refs nest only a few levels
+        ref_path = (git_dir if ref == 'HEAD' else common_dir) / ref
+        if ref_path.is_file():
+            value = ref_path.read_text().strip()
+        else:
+            if packed_refs is None:
+                packed_refs = _packed_refs(common_dir)
+            value = packed_refs.get(ref)
+            if value is None:
+                return None
+        
+        if not value.startswith('ref:'):
+            return value
+        ref = value[len('ref:'):].strip()
+    return None
+
+
+def _packed_refs(common_dir: Path) -> Dict[str, str]:
+    """Read the refs stored in packed-refs."""
+    refs = {}
+    packed = common_dir / 'packed-refs'
+    if packed.is_file():
+        for line in packed.read_text().splitlines():
+            if line and line[0] not in '#^':
+                sha, _, name = line.partition(' ')
+                refs[name] = sha
+    return refs
+
+
+def head_commit(path: str) -> Optional[str]:
+    """
+    Get the commit HEAD of a path's repository points to.
+    
+    Only refs are read (no packs are opened), so this is cheap enough to
+    check before every use of an index built from the history.
+    
+    Args:
+        path: Working tree root (or any directory inside it)
+    
+    Returns:
+        Hex commit id, or None if the path is not in a repository or it
+        has no commits yet
+    """
+    found = find_git_dir(path)
+    if found is None:
+        return None
+    git_dir = found[1]
+    return resolve_ref(git_dir, common_git_dir(git_dir))
+
+
+class PackFile:
+    """One packfile and its version 2 index."""
+    
+    def __init__(self, idx_path: Path):
+        """
+        Read a pack index.
+        
+        Args:
+            idx_path: Path of the .idx file (the .pack file lies beside it)
+        
+        Raises:
+            GitError: If the index is not a version 2 pack index
+        """
+        with open(idx_path, 'rb') as f:
+            index = f.read()
+        if index[:8] != b'\xfftOc\x00\x00\x00\x02':
+            raise GitError(f"Unsupported pack index: {idx_path}")
+        
+        self.fanout = struct.unpack_from('>256I', index, 8)
+        count = self.fanout[255]
+        names_start = 8 + 256 * 4
+        offsets_start = names_start + count * 20 + count * 4
+        self.names = index[names_start:names_start + count * 20]
+        self.offsets = struct.unpack_from(f'>{count}I', index, offsets_start)
+        self.large_offsets = index[offsets_start + count * 4:]
+        self.count = count
+        self.pack_path = idx_path.with_suffix('.pack')
+        self._pack = None
+    
+    def find(self, sha: bytes) -> Optional[int]:
+        """Get the offset of an object in the pack, or None if it is not in this pack."""
+        first = sha[0]
+        low = self.fanout[first - 1] if first else 0
+        high = self.fanout[first]
+        names = self.names
+        while low < high:
+            middle = (low + high) // 2
+            name = names[middle * 20:middle * 20 + 20]
+            if name < sha:
+                low = middle + 1
+            elif name > sha:
+                high = middle
+            else:
+                offset = self.offsets[middle]
+                if offset & 0x80000000:
+                    index = (offset & 0x7fffffff) * 8
+                    offset = struct.unpack_from('>Q', self.large_offsets, index)[0]
+                return offset
+        return None
+    
+    def data(self) -> mmap.mmap:
+        """Get the pack's content, mapped on first use."""
+        if self._pack is None:
+            with open(self.pack_path, 'rb') as f:
+                self._pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._pack
+
+
+def _inflate(data: mmap.mmap, position: int) -> bytes:
+    """Decompress the zlib stream starting at a position of a pack."""
+    decompressor = zlib.decompressobj()
+    parts = []
+    while not decompressor.eof:
+        chunk = data[position:position + INFLATE_CHUNK]
+        if not chunk:
+            raise GitError("Truncated pack object")
+        parts.append(decompressor.decompress(chunk))
+        position += INFLATE_CHUNK
+    return b''.join(parts)
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Rebuild an object from its delta base and a git delta."""
+    def varint(position: int) -> Tuple[int, int]:
+        value = shift = 0
+        while True:
+            byte = delta[position]
+            position += 1
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value, position
+    
+    _, position = varint(0)             # Base size
+    result_size, position = varint(position)
+    parts = []
+    while position < len(delta):
+        opcode = delta[position]
+        position += 1
+        if opcode & 0x80:
+            # Copy a range of the base
+            offset = size = 0
+            for i in range(4):
+                if opcode & (1 << i):
+                    offset |= delta[position] << (8 * i)
+                    position += 1
+            for i in range(3):
+                if opcode & (0x10 << i):
+                    size |= delta[position] << (8 * i)
+                    position += 1
+            parts.append(base[offset:offset + (size or 0x10000)])
+        elif opcode:
+            # Insert literal bytes
+            parts.append(delta[position:position + opcode])
+            position += opcode
+        else:
+            raise GitError("Invalid delta opcode")
+    
+    result = b''.join(parts)
+    if len(result) != result_size:
+        raise GitError("Delta result has the wrong size")
+    return result
+
+
+class GitRepository:
+    """
+    Object reader for one repository.
+    
+    Objects are looked up among the loose objects first and then in the
+    packfiles; decompressed delta bases are cached, since consecutive
+    versions of a file are usually stored as deltas of each other.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open a repository.
+        
+        Args:
+            path: Working tree root (or any directory inside it)
+        
+        Raises:
+            GitError: If the path is not inside a git repository
+        """
+        found = find_git_dir(path)
+        if found is None:
+            raise GitError(f"Not a git repository: {path}")
+        self.work_tree, self.git_dir = found
+        
+        # Linked worktrees keep their objects in the main repository
+        self.common_dir = common_git_dir(self.git_dir)
+        
+        self.objects_dir = self.common_dir / 'objects'
+        self.packs = []
+        pack_dir = self.objects_dir / 'pack'
+        if pack_dir.is_dir():
+            for idx_path in sorted(pack_dir.glob('*.idx')):
+                try:
+                    self.packs.append(PackFile(idx_path))
+                except (OSError, GitError, struct.error) as e:
+                    print(f"Skipping pack {idx_path.name}: {e}")
+        
+        self._bases = OrderedDict()  # (pack index, offset) -> (type, data)
+    
+    def resolve_ref(self, ref: str = 'HEAD') -> Optional[str]:
+        """
+        Resolve a ref (e.g. 'HEAD' or 'refs/heads/main') to a commit id.
+        
+        Args:
+            ref: Ref name
+        
+        Returns:
+            Hex commit id, or None if the ref does not exist (e.g. no commits yet)
+        """
+        return resolve_ref(self.git_dir, self.common_dir, ref)
+    
+    def read_object(self, sha: str) -> Tuple[bytes, bytes]:
+        """
+        Read an object.
+        
+        Args:
+            sha: Hex object id
+        
+        Returns:
+            Tuple of (type name, content)
+        
+        Raises:
+            GitError: If the object is missing or corrupt
+        """
+        loose = self.objects_dir / sha[:2] / sha[2:]
+        if loose.is_file():
+            with open(loose, 'rb') as f:
+                raw = zlib.decompress(f.read())
+            header, _, content = raw.partition(b'\0')
+            return header.split(b' ')[0], content
+        
+        binary = bytes.fromhex(sha)
+        for pack_index, pack in enumerate(self.packs):
+            offset = pack.find(binary)
+            if offset is not None:
+                object_type, content = self._read_packed(pack_index, offset)
+                return TYPE_NAMES[object_type], content
+        
+        raise GitError(f"Object not found: {sha}")
+    
+    def _read_packed(self, pack_index: int, offset: int) -> Tuple[int, bytes]:
+        """Read the object at an offset of a pack, resolving deltas."""
+        key = (pack_index, offset)
+        cached = self._bases.get(key)
+        if cached is not None:
+            self._bases.move_to_end(key)
+            return cached
+        
+        data = self.packs[pack_index].data()
+        byte = data[offset]
+        position = offset + 1
+        object_type = (byte >> 4) & 7
+        shift = 4
+        while byte & 0x80:
+            byte = data[position]
+            position += 1
+            shift += 7
+        
+        if object_type == OBJ_OFS_DELTA:
+            byte = data[position]
+            position += 1
+            distance = byte & 0x7f
+            while byte & 0x80:
+                byte = data[position]
+                position += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7f)
+            base_type, base = self._read_packed(pack_index, offset - distance)
+            result = (base_type, _apply_delta(base, _inflate(data, position)))
+        elif object_type == OBJ_REF_DELTA:
+            base_name, base = self.read_object(data[position:position + 20].hex())
+            base_type = {name: number for number, name in TYPE_NAMES.items()}[base_name]
+            result = (base_type, _apply_delta(base, _inflate(data, position + 20)))
+        elif object_type in TYPE_NAMES:
+            result = (object_type, _inflate(data, position))
+        else:
+            raise GitError(f"Unknown pack object type {object_type}")
+        
+        self._bases[key] = result
+        while len(self._bases) > MAX_CACHED_BASES:
+            self._bases.popitem(last=False)
+        return result
+    
+    def read_commit(self, sha: str) -> Dict[str, object]:
+        """
+        Read a commit.
+        
+        Args:
+            sha: Hex commit id
+        
+        Returns:
+            Dictionary with 'tree', 'parents' (list of ids), 'time' (committer
+            timestamp) and 'summary' (first message line)
+        """
+        object_type, content = self.read_object(sha)
+        if object_type != b'commit':
+            raise GitError(f"{sha} is a {object_type.decode()}, not a commit")
+        
+        headers, _, message = content.partition(b'\n\n')
+        commit = {'tree': None, 'parents': [], 'time': 0,
+                  'summary': message.decode('utf-8', errors='replace').split('\n', 1)[0]}
+        for line in headers.split(b'\n'):
+            name, _, value = line.partition(b' ')
+            if name == b'tree':
+                commit['tree'] = value.decode()
+            elif name == b'parent':
+                commit['parents'].append(value.decode())
+            elif name == b'committer':
+                try:
+                    commit['time'] = int(value.rsplit(b' ', 2)[-2])
+                except (IndexError, ValueError):
+                    pass
+        return commit
+    
+    def read_tree(self, sha: str) -> Iterator[Tuple[bytes, str, str]]:
+        """
+        List the entries of a tree.
+        
+        Args:
+            sha: Hex tree id
+        
+        Yields:
+            (mode, name, hex object id) tuples
+        """
+        _, content = self.read_object(sha)
+        position = 0
+        while position < len(content):
+            space = content.index(b' ', position)
+            nul = content.index(b'\0', space)
+            yield (content[position:space], content[space + 1:nul].decode('utf-8', errors='surrogateescape'),
+                   content[nul + 1:nul + 21].hex())
+            position = nul + 21
+    
+    def history(self, max_commits: int, ref: str = 'HEAD') -> List[Tuple[str, Dict[str, object]]]:
+        """
+        Walk the first-parent history of a ref, newest commit first.
+        
+        Args:
+            max_commits: Number of commits to read
+            ref: Ref to start from
+        
+        Returns:
+            List of (commit id, commit) tuples (see read_commit)
+        """
+        # Shallow clones lack the parents of their boundary commits
+        shallow_path = self.common_dir / 'shallow'
+        shallow = set(shallow_path.read_text().split()) if shallow_path.is_file() else set()
+        
+        commits = []
+        sha = self.resolve_ref(ref)
+        while sha and len(commits) < max_commits:
+            commit = self.read_commit(sha)
+            commits.append((sha, commit))
+            sha = commit['parents'][0] if commit['parents'] and sha not in shallow else None
+        return commits
+
+
+class TreeFiles:
+    """
+    Files of commit trees, reusing the listings of subtrees already read.
+    
+    Consecutive commits share most of their subtrees, so each distinct
+    tree object is parsed once.
+    """
+    
+    def __init__(self, repository: GitRepository):
+        """
+        Initialize an empty tree cache.
+        
+        Args:
+            repository: Repository to read trees from
+        """
+        self.repository = repository
+        self._listings = {}  # tree id -> {relative path: blob id}
+    
+    def files(self, tree_sha: str) -> Dict[str, str]:
+        """
+        List every file below a tree.
+        
+        Args:
+            tree_sha: Hex tree id
+        
+        Returns:
+            Dictionary of relative path ('/'-separated) -> hex blob id
+        """
+        listing = self._listings.get(tree_sha)
+        if listing is not None:
+            return listing
+        
+        listing = {}
+        for mode, name, sha in self.repository.read_tree(tree_sha):
+            if mode == TREE_MODE:
+                for path, blob in self.files(sha).items():
+                    listing[f"{name}/{path}"] = blob
+            elif mode in FILE_MODES:
+                listing[name] = sha
+        
+        self._listings[tree_sha] = listing
+        return listing
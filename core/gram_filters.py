@@ -0,0 +1,203 @@
+"""
+Per-file blocked Bloom filters of character n-grams.
+Each file's distinct n-grams are summarized in a few 64-bit blocks; a query
+rules out every file whose filter lacks one of the n-grams of each window
+it must share, before any substring comparison runs.
+"""
+
+from array import array
+from typing import List
+
+from .rolling_hash import MASK64, MIX_MULTIPLIER, ROLLING_BASE
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Characters per n-gram; queries shorter than this cannot be filtered
+GRAM_LENGTH = 4
+
+# Filter bits per distinct n-gram and bits set per n-gram (~2% false positives)
+BITS_PER_GRAM = 10
+BITS_PER_ENTRY = 4
+
+# Query n-grams checked against the filters; longer queries are sampled
+MAX_QUERY_GRAMS = 256
+
+
+def _mix(value: int) -> int:
+    """Finish a polynomial n-gram hash so its high and low bits are spread."""
+    value = (value * MIX_MULTIPLIER) & MASK64
+    return value ^ (value >> 29)
+
+
+def gram_hashes(text: str) -> List[int]:
+    """
+    Hash every distinct n-gram of a text.
+    
+    Args:
+        text: Normalized text
+    
+    Returns:
+        64-bit hashes of the text's distinct n-grams
+    """
+    hashes = []
+    for gram in {text[i:i + GRAM_LENGTH] for i in range(len(text) - GRAM_LENGTH + 1)}:
+        value = 0
+        for char in gram:
+            value = (value * ROLLING_BASE + ord(char)) & MASK64
+        hashes.append(_mix(value))
+    return hashes
+
+
+def _gram_hash_array(text: str) -> 'np.ndarray':
+    """Hash every distinct n-gram of a text with NumPy (same values as gram_hashes)."""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    count = len(codes) - GRAM_LENGTH + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    
+    values = np.zeros(count, dtype=np.uint64)
+    for i in range(GRAM_LENGTH):
+        values = values * np.uint64(ROLLING_BASE) + codes[i:i + count]
+    values = np.unique(values) * np.uint64(MIX_MULTIPLIER)
+    return values ^ (values >> np.uint64(29))
+
+
+def _entry_mask(gram_hash: int) -> int:
+    """Get the bits an n-gram sets inside its 64-bit block."""
+    mask = 0
+    for i in range(BITS_PER_ENTRY):
+        mask |= 1 << ((gram_hash >> (6 * i)) & 63)
+    return mask
+
+
+class GramBloomFilters:
+    """
+    Blocked Bloom filters of character n-grams, one per file, in one array.
+    
+    A file's filter is a run of 64-bit blocks sized to its number of
+    distinct n-grams. Each n-gram picks one block from its high hash bits
+    and sets a few bits inside it, so a membership test reads one word.
+    """
+    
+    def __init__(self):
+        """Initialize an empty set of filters."""
+        self.blocks = array('Q')        # filter blocks of all files, in file order
+        self.block_starts = array('I')  # file_id -> index of its first block
+        self.block_counts = array('I')  # file_id -> number of blocks
+    
+    def __len__(self) -> int:
+        return len(self.block_starts)
+    
+    def add_file(self, text: str):
+        """
+        Build and append the filter of the next file.
+        
+        Args:
+            text: Normalized content of the file
+        """
+        if HAS_NUMPY:
+            hashes = _gram_hash_array(text)
+            block_count = max(1, -(-len(hashes) * BITS_PER_GRAM // 64))
+            
+            masks = np.zeros(len(hashes), dtype=np.uint64)
+            for i in range(BITS_PER_ENTRY):
+                bits = (hashes >> np.uint64(6 * i)) & np.uint64(63)
+                masks |= np.left_shift(np.uint64(1), bits)
+            
+            blocks = np.zeros(block_count, dtype=np.uint64)
+            np.bitwise_or.at(blocks, (hashes >> np.uint64(32)) % np.uint64(block_count), masks)
+            file_blocks = array('Q', blocks.tobytes())
+        else:
+            hashes = gram_hashes(text)
+            block_count = max(1, -(-len(hashes) * BITS_PER_GRAM // 64))
+            
+            file_blocks = array('Q', [0]) * block_count
+            for gram_hash in hashes:
+                file_blocks[(gram_hash >> 32) % block_count] |= _entry_mask(gram_hash)
+        
+        self.block_starts.append(len(self.blocks))
+        self.block_counts.append(block_count)
+        self.blocks.extend(file_blocks)
+    
+    def extend(self, other: 'GramBloomFilters'):
+        """Append the filters of another set, e.g. one built by a worker process."""
+        offset = len(self.blocks)
+        self.blocks.extend(other.blocks)
+        self.block_starts.extend(start + offset for start in other.block_starts)
+        self.block_counts.extend(other.block_counts)
+    
+    def candidates(self, query: str, window: int) -> List[int]:
+        """
+        Find the files that may contain some `window`-character substring of the query.
+        
+        A file survives if its filter holds every n-gram of at least one
+        window of the query. Files are never wrongly excluded. Long queries
+        are checked on every few n-grams only: each window still contains a
+        run of consecutive sampled n-grams, which a matching file must hold.
+        
+        Args:
+            query: Normalized query text
+            window: Length of the substrings a matching file must share
+        
+        Returns:
+            Ids of the files that may match, in increasing order
+        """
+        file_count = len(self.block_starts)
+        window = min(window, len(query))
+        if window < GRAM_LENGTH or not file_count:
+            return list(range(file_count))
+        
+        # Hash each n-gram of the query in order, keeping every stride-th one
+        grams_per_window = window - GRAM_LENGTH + 1
+        stride = max(1, min((len(query) - GRAM_LENGTH + 1) // MAX_QUERY_GRAMS, grams_per_window))
+        grams = []
+        for i in range(0, len(query) - GRAM_LENGTH + 1, stride):
+            value = 0
+            for char in query[i:i + GRAM_LENGTH]:
+                value = (value * ROLLING_BASE + ord(char)) & MASK64
+            grams.append(_mix(value))
+        
+        # Any window of the query covers at least this many consecutive sampled n-grams
+        run_length = grams_per_window // stride
+        
+        if HAS_NUMPY:
+            blocks = np.frombuffer(self.blocks, dtype=np.uint64)
+            starts = np.frombuffer(self.block_starts, dtype=np.uint32).astype(np.int64)
+            counts = np.frombuffer(self.block_counts, dtype=np.uint32).astype(np.int64)
+            
+            present = {}
+            for gram_hash in set(grams):
+                mask = np.uint64(_entry_mask(gram_hash))
+                words = blocks[starts + (gram_hash >> 32) % counts]
+                present[gram_hash] = (words & mask) == mask
+            
+            run = np.zeros(file_count, dtype=np.int32)
+            survivors = np.zeros(file_count, dtype=bool)
+            for gram_hash in grams:
+                run = (run + 1) * present[gram_hash]
+                survivors |= run >= run_length
+            return np.flatnonzero(survivors).tolist()
+        
+        masks = {gram_hash: _entry_mask(gram_hash) for gram_hash in grams}
+        survivors = []
+        for file_id in range(file_count):
+            start, count = self.block_starts[file_id], self.block_counts[file_id]
+            run = 0
+            for gram_hash in grams:
+                mask = masks[gram_hash]
+                if (self.blocks[start + (gram_hash >> 32) % count] & mask) == mask:
+                    run += 1
+                    if run >= run_length:
+                        survivors.append(file_id)
+                        break
+                else:
+                    run = 0
+        return survivors
+    
+    def memory_usage(self) -> int:
+        """Get the bytes held by the filters."""
+        return len(self.blocks) * 8 + len(self.block_starts) * 4 + len(self.block_counts) * 4
@@ -0,0 +1,342 @@
+"""
+Matching of copied code against earlier revisions of project files.
+Code copied from an old deploy, a review or someone's paste often matches a
+past version of a file rather than the working tree. The blobs of the last
+commits are read from the local `.git` directory and winnowed like the
+current files; each fingerprint is stored once per file with the range of
+revisions containing it, so unchanged code is not indexed again for every
+commit.
+"""
+
+import math
+import os
+import time
+from array import array
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+from .background_build import BackgroundBuilder, BuildTicket
+from .content_store import decode_text
+from .git_objects import GitError, GitRepository, TreeFiles, head_commit
+from .match_memo import match_memo, next_generation
+from .postings import PostingsIndex
+from .project_linker import project_linker
+from .settings import settings
+from .tokenizer import family_for_path, query_streams, tokenize_file
+from .winnowing import WinnowingIndex
+
+# Past versions larger than this are not indexed (same limit as instant lookup)
+MAX_BLOB_SIZE = 500 * 1024
+
+# Revision ranges are packed as first | last << 16 into the postings' positions
+MAX_REVISIONS = 0xFFFF
+
+
+class HistoryIndex:
+    """
+    Winnowed fingerprints of the past versions of one project's files.
+    
+    A file's revisions are the runs of commits, newest first, in which its
+    blob stays the same; revision 0 is the version in HEAD when the file
+    exists there. Postings map a fingerprint to (file id, revision range).
+    """
+    
+    def __init__(self, kgram: int = 8, window: int = 5):
+        """
+        Initialize an empty history index.
+        
+        Args:
+            kgram: Tokens per k-gram
+            window: Winnowing window in k-grams
+        """
+        self.winnowing = WinnowingIndex(kgram, window)  # Used for its fingerprinting
+        self.project_name = None
+        self.head = None            # Commit the history was read from
+        self.file_paths = []        # file_id -> absolute file path
+        self.revisions = []         # file_id -> [(commit id, commit summary)] newest first
+        self.in_head = []           # file_id -> whether revision 0 is the HEAD version
+        self.fingerprints = PostingsIndex()  # fingerprint -> (file ids, packed revision ranges)
+        self.families = set()
+        self.commits_indexed = 0
+        self.blobs_indexed = 0
+        self.generation = next_generation()  # Identifies this index in memo keys
+    
+    def __len__(self) -> int:
+        return len(self.file_paths)
+    
+    def build(self, project_name: str, project_path: str, file_paths: List[str], max_commits: int,
+              ticket: BuildTicket = None) -> bool:
+        """
+        Index the versions of a project's files in its recent history.
+        
+        Args:
+            project_name: Name of the project
+            project_path: Root directory of the project
+            file_paths: Project files whose past versions are indexed
+            max_commits: Number of first-parent commits to read from HEAD
+            ticket: Ticket of the background build, if any
+        
+        Returns:
+            True if successful
+        
+        Raises:
+            GitError: If the project is not in a readable git repository
+        """
+        if ticket is None:
+            ticket = BuildTicket()
+        
+        repository = GitRepository(project_path)
+        commits = repository.history(max_commits)
+        trees = TreeFiles(repository)
+        
+        # Project files by their path in the repository
+        tracked = {}
+        for file_path in file_paths:
+            relative = os.path.relpath(file_path, repository.work_tree)
+            if not relative.startswith('..'):
+                tracked[relative.replace(os.sep, '/')] = file_path
+        
+        # Runs of the same blob per file, newest first: [(blob, commit, summary)]
+        runs = defaultdict(list)
+        previous = {}
+        for commit_number, (commit_sha, commit) in enumerate(commits):
+            if ticket.cancelled:
+                return False
+            listing = trees.files(commit['tree'])
+            for relative, file_path in tracked.items():
+                blob = listing.get(relative)
+                if blob is not None and previous.get(relative) != (commit_number - 1, blob):
+                    runs[file_path].append((blob, commit_sha, commit['summary']))
+                if blob is not None:
+                    previous[relative] = (commit_number, blob)
+        
+        blob_fingerprints = {}  # blob -> fingerprint set, shared by files with equal versions
+        
+        ticket.report(0, len(runs))
+        for files_done, (file_path, file_runs) in enumerate(runs.items(), 1):
+            if ticket.cancelled:
+                return False
+            
+            file_id = len(self.file_paths)
+            self.file_paths.append(file_path)
+            self.revisions.append([(commit_sha, summary) for _, commit_sha, summary in file_runs[:MAX_REVISIONS]])
+            self.in_head.append(file_runs[0][1] == commits[0][0])
+            self.families.add(family_for_path(file_path))
+            
+            # Each fingerprint once per run of consecutive revisions containing it
+            open_ranges = {}  # fingerprint -> first revision
+            hashes, ranges = array('Q'), array('I')
+            for revision, (blob, _, _) in enumerate(file_runs[:MAX_REVISIONS]):
+                fingerprints = blob_fingerprints.get(blob)
+                if fingerprints is None:
+                    fingerprints = blob_fingerprints[blob] = self._fingerprint_blob(repository, blob, file_path)
+                for fingerprint in [f for f in open_ranges if f not in fingerprints]:
+                    hashes.append(fingerprint)
+                    ranges.append(open_ranges.pop(fingerprint) | (revision - 1) << 16)
+                for fingerprint in fingerprints:
+                    open_ranges.setdefault(fingerprint, revision)
+            
+            last = min(len(file_runs), MAX_REVISIONS) - 1
+            for fingerprint, first in open_ranges.items():
+                hashes.append(fingerprint)
+                ranges.append(first | last << 16)
+            self.fingerprints.extend(hashes, file_id, ranges)
+            ticket.report(files_done, len(runs))
+        
+        self.fingerprints.freeze()
+        self.project_name = project_name
+        self.head = commits[0][0] if commits else None
+        self.commits_indexed = len(commits)
+        self.blobs_indexed = len(blob_fingerprints)
+        return True
+    
+    def _fingerprint_blob(self, repository: GitRepository, blob: str, file_path: str) -> set:
+        """Get the winnowed fingerprints of one file version."""
+        try:
+            _, content = repository.read_object(blob)
+        except GitError as e:
+            print(f"Error reading {os.path.basename(file_path)} version {blob[:8]}: {e}")
+            return set()
+        
+        if len(content) > MAX_BLOB_SIZE or b'\0' in content[:8000]:
+            return set()
+        hashes, _ = self.winnowing.fingerprint(tokenize_file(file_path, decode_text(content)))
+        return set(hashes)
+    
+    def search(self, text: str, threshold: float = 0.5,
+               limit: int = 5) -> List[Tuple[str, str, str, float]]:
+        """
+        Find past file versions that match a text better than the HEAD version.
+        
+        Fingerprints are weighted by inverse document frequency across files,
+        as in WinnowingIndex.search. A file's score is the best share of the
+        query weight any single revision of it contains.
+        
+        Args:
+            text: Copied text
+            threshold: Minimum score
+            limit: Maximum number of matches
+        
+        Returns:
+            List of (file_path, commit id, commit summary, score) tuples sorted
+            by score; the commit is the newest one with the matching version
+        """
+        total_files = len(self.file_paths)
+        if not total_files:
+            return []
+        
+        best = {}  # file_id -> (score, revision)
+        for stream in query_streams(text, self.families):
+            query_hashes = set(self.winnowing.fingerprint(stream)[0])
+            if not query_hashes:
+                continue
+            
+            postings = self.fingerprints.lookup_many(query_hashes)
+            unseen_weight = math.log((total_files + 1) / 1.5)
+            query_weight = unseen_weight * (len(query_hashes) - len(postings))
+            
+            # Weight each file's revisions by the query fingerprints they contain
+            revision_weights = {}
+            for file_ids, ranges in postings.values():
+                weight = math.log((total_files + 1) / (len(set(file_ids)) + 0.5))
+                query_weight += weight
+                for file_id, packed in zip(file_ids, ranges):
+                    weights = revision_weights.get(file_id)
+                    if weights is None:
+                        weights = revision_weights[file_id] = [0.0] * len(self.revisions[file_id])
+                    for revision in range(packed & 0xFFFF, (packed >> 16) + 1):
+                        weights[revision] += weight
+            
+            if query_weight <= 0:
+                continue
+            for file_id, weights in revision_weights.items():
+                revision = max(range(len(weights)), key=lambda r: (weights[r], -r))
+                score = weights[revision] / query_weight
+                
+                # The HEAD version is what the current-tree matchers report
+                if self.in_head[file_id] and weights[revision] <= weights[0]:
+                    continue
+                if file_id not in best or score > best[file_id][0]:
+                    best[file_id] = (score, revision)
+        
+        results = []
+        for file_id, (score, revision) in best.items():
+            if score >= threshold:
+                commit_sha, summary = self.revisions[file_id][revision]
+                results.append((self.file_paths[file_id], commit_sha, summary, min(1.0, score)))
+        
+        results.sort(key=lambda x: x[3], reverse=True)
+        return results[:limit]
+
+
+class ProjectHistory:
+    """
+    Builds the history index of the current project in the background and queries it.
+    
+    The index is built for a (project, HEAD commit) pair and built again
+    when HEAD moves, so new commits are indexed; until the new index is
+    published, searches use the previous one.
+    """
+    
+    def __init__(self):
+        """Initialize without an index."""
+        self.index = HistoryIndex()
+        self.builder = BackgroundBuilder("history-index")
+        self.last_build_time = 0
+        self._key = None  # (project, HEAD commit) built or being built; None after a failure
+    
+    def build(self, project_name: str, ticket: BuildTicket = None) -> bool:
+        """
+        Build the history index of a project.
+        
+        Args:
+            project_name: Name of the project
+            ticket: Ticket of the background build, or None to build synchronously
+        
+        Returns:
+            True if successful
+        """
+        project_data = project_linker.linked_projects.get(project_name)
+        if not project_data:
+            return False
+        
+        start_time = time.time()
+        index = HistoryIndex()
+        try:
+            if not index.build(project_name, project_data.get("path", ""), project_data.get("files", []),
+                               settings.history_max_commits, ticket):
+                return False
+        except (GitError, OSError) as e:
+            print(f"No history index for {project_name}: {e}")
+            return False
+        
+        def apply():
+            self.index = index
+        
+        if not (ticket or BuildTicket()).publish(apply):
+            return False
+        
+        self.last_build_time = time.time() - start_time
+        print(f"History index built: {index.blobs_indexed} versions of {len(index)} files "
+              f"from {index.commits_indexed} commits in {self.last_build_time:.3f}s "
+              f"({len(index.fingerprints)} fingerprints)")
+        return True
+    
+    def refresh_if_needed(self):
+        """
+        Start building the current project's history index if it is missing,
+        for another project or for an older HEAD, or if its last build failed.
+        """
+        current_project = project_linker.current_project
+        if not current_project or self.builder.is_building():
+            return
+        
+        project_data = project_linker.linked_projects.get(current_project)
+        head = self._head(project_data.get("path", "")) if project_data else None
+        if head is None:
+            return  # Not a git repository, or no commits yet
+        
+        key = (current_project, head)
+        if key != self._key:
+            self._key = key
+            self.builder.start(current_project, lambda ticket: self._build_key(key, ticket))
+    
+    @staticmethod
+    def _head(project_path: str) -> Optional[str]:
+        """Get the commit HEAD of a project's repository points to, or None."""
+        try:
+            return head_commit(project_path)
+        except (GitError, OSError):
+            return None
+    
+    def _build_key(self, key: Tuple[str, str], ticket: BuildTicket) -> bool:
+        """Build the index for key on the builder's thread, letting the next refresh retry if it fails."""
+        success = False
+        try:
+            success = self.build(key[0], ticket)
+        finally:
+            if not success and not ticket.cancelled and self._key == key:
+                self._key = None
+        return success
+    
+    def search(self, text: str, threshold: float = 0.5) -> List[Tuple[str, str, str, float]]:
+        """
+        Find past versions of the current project's files matching copied text.
+        
+        Args:
+            text: Copied text
+            threshold: Minimum score
+        
+        Returns:
+            List of (file_path, commit id, commit summary, score) tuples; empty
+            until the index of the current project is built
+        """
+        index = self.index  # Read once - a build may publish a new index meanwhile
+        if index.project_name != project_linker.current_project:
+            return []
+        return match_memo.memoized('history', text, lambda: index.search(text, threshold),
+                                   project_name=index.project_name, generation=index.generation, args=(threshold,))
+
+
+# Create singleton instance
+project_history = ProjectHistory()
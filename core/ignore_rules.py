@@ -0,0 +1,264 @@
+"""
+Ignore rules for project file discovery.
+Patterns from nested `.gitignore` files, the repository's `.git/info/exclude`
+and per-project `.lumenignore` files (same syntax) are compiled into one
+regular expression per file set, so discovery can test a path with a single
+match and skip ignored directories without descending into them.
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from .git_objects import find_git_dir
+
+# Per-project ignore file, with the syntax of .gitignore
+LUMEN_IGNORE_FILE = '.lumenignore'
+
+# Ignore files read in each directory; later files take precedence
+IGNORE_FILES = ('.gitignore', LUMEN_IGNORE_FILE)
+
+# Case-insensitive file systems match patterns case-insensitively, as git does there
+_FLAGS = re.IGNORECASE if os.name == 'nt' or sys.platform == 'darwin' else 0
+
+
+def _translate(pattern: str) -> str:
+    """Translate the glob part of a gitignore pattern to a regular expression."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        if pattern.startswith('**', i):
+            at_start = i == 0 or pattern[i - 1] == '/'
+            at_end = i + 2 == len(pattern) or pattern[i + 2] == '/'
+            if at_start and at_end:
+                if i + 2 == len(pattern):
+                    parts.append('.*')                  # 'dir/**': everything inside
+                else:
+                    parts.append('(?:.*/)?')            # '**/' : any number of directories
+                    i += 1
+                i += 2
+                continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                members = pattern[i + 1:end]
+                if members[0] in '!^':
+                    members = '^' + members[1:]
+                parts.append('(?!/)[' + members.replace('\\', '\\\\') + ']')
+                i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return ''.join(parts)
+
+
+def parse_pattern(line: str) -> Optional[Tuple[str, bool, bool]]:
+    """
+    Parse one line of an ignore file.
+    
+    Args:
+        line: Line without its newline
+    
+    Returns:
+        Tuple of (regular expression for paths relative to the ignore file's
+        directory, whether it re-includes (!), whether it only matches
+        directories), or None for blank lines and comments
+    """
+    # Trailing spaces are dropped unless escaped
+    line = re.sub(r'(?<!\\) +$', '', line)
+    if not line or line.startswith('#'):
+        return None
+    
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\!') or line.startswith('\\#'):
+        line = line[1:]
+    
+    directory_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    
+    # A slash anywhere but the end anchors the pattern to the ignore file's directory
+    anchored = '/' in line
+    body = _translate(line.lstrip('/'))
+    return (body if anchored else '(?:.*/)?' + body), negated, directory_only
+
+
+class IgnoreRules:
+    """Compiled patterns of the ignore files of one directory."""
+    
+    def __init__(self, base: str, lines: Iterable[str]):
+        """
+        Compile ignore patterns.
+        
+        Args:
+            base: Directory the patterns are relative to
+            lines: Lines of the ignore files, in order of precedence (last wins)
+        """
+        self.base = base
+        patterns = [parsed for parsed in map(parse_pattern, lines) if parsed is not None]
+        
+        # Alternatives are tried in order, so the last pattern goes first; the
+        # matching group tells which pattern decided and whether it negates
+        self.file_pattern, self.file_negated = self._compile(
+            [pattern for pattern in patterns if not pattern[2]]
+        )
+        self.dir_pattern, self.dir_negated = self._compile(patterns)
+    
+    def __bool__(self) -> bool:
+        return self.dir_pattern is not None
+    
+    @staticmethod
+    def _compile(patterns: List[Tuple[str, bool, bool]]) -> Tuple[Optional['re.Pattern'], List[bool]]:
+        """Combine patterns into one expression, last pattern first."""
+        patterns = patterns[::-1]
+        if not patterns:
+            return None, []
+        combined = '|'.join(f'({regex})' for regex, _, _ in patterns)
+        return re.compile(combined, _FLAGS), [negated for _, negated, _ in patterns]
+    
+    def match(self, relative: str, is_dir: bool) -> Optional[bool]:
+        """
+        Check a path against the patterns.
+        
+        Args:
+            relative: '/'-separated path relative to the rules' directory
+            is_dir: Whether the path is a directory
+        
+        Returns:
+            True if ignored, False if re-included by a '!' pattern, None if no
+            pattern matches
+        """
+        pattern, negated = (self.dir_pattern, self.dir_negated) if is_dir else (self.file_pattern, self.file_negated)
+        if pattern is None:
+            return None
+        match = pattern.fullmatch(relative)
+        if match is None:
+            return None
+        return not negated[match.lastindex - 1]
+
+
+def read_rules(directory: str, names: Iterable[str] = IGNORE_FILES) -> Optional[IgnoreRules]:
+    """
+    Read the ignore files of a directory.
+    
+    Args:
+        directory: Directory holding the files
+        names: Ignore file names, lowest precedence first
+    
+    Returns:
+        Compiled rules, or None if the directory has no (non-empty) ignore files
+    """
+    lines = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='ignore') as f:
+                lines.extend(f.read().splitlines())
+        except OSError:
+            continue
+    rules = IgnoreRules(directory, lines)
+    return rules if rules else None
+
+
+class IgnoreMatcher:
+    """
+    Ignore rules in effect for one directory: its own and its ancestors'.
+    
+    Rules of deeper directories take precedence over those of their parents,
+    as with nested .gitignore files.
+    """
+    
+    def __init__(self, rules: Tuple[Tuple[IgnoreRules, str, str], ...] = ()):
+        """
+        Initialize a matcher.
+        
+        Args:
+            rules: (rules, base directory, prefix) tuples, outermost first;
+                paths below the base directory are matched as prefix + their
+                path relative to it
+        """
+        self.rules = rules
+    
+    def child(self, directory: str, entry_names: Iterable[str]) -> 'IgnoreMatcher':
+        """
+        Get the matcher for a subdirectory, adding its ignore files if it has any.
+        
+        Args:
+            directory: Subdirectory path
+            entry_names: Names of the subdirectory's entries
+        
+        Returns:
+            Matcher for the subdirectory (self if it adds no rules)
+        """
+        names = [name for name in IGNORE_FILES if name in entry_names]
+        rules = read_rules(directory, names) if names else None
+        return IgnoreMatcher(self.rules + ((rules, directory, ''),)) if rules else self
+    
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        """
+        Check if a path is ignored.
+        
+        Args:
+            path: Path inside the directory the matcher belongs to
+            is_dir: Whether the path is a directory
+        
+        Returns:
+            True if the innermost rule matching the path ignores it
+        """
+        for rules, base, prefix in reversed(self.rules):
+            relative = prefix + path[len(base) + 1:].replace(os.sep, '/')
+            decision = rules.match(relative, is_dir)
+            if decision is not None:
+                return decision
+        return False
+
+
+def matcher_for_root(root: str) -> IgnoreMatcher:
+    """
+    Get the matcher in effect at a project root.
+    
+    Includes the repository's .git/info/exclude and the ignore files of the
+    directories between the repository's working tree and the root.
+    
+    Args:
+        root: Project root directory, as its files' paths will start
+    
+    Returns:
+        Matcher for the root directory (before its own ignore files)
+    """
+    try:
+        found = find_git_dir(root)
+        if found is None:
+            return IgnoreMatcher()
+        work_tree, git_dir = found
+        parts = Path(root).resolve().relative_to(work_tree).parts
+    except (OSError, ValueError) as e:
+        print(f"Error locating repository of {root}: {e}")
+        return IgnoreMatcher()
+    
+    # Rules of the working tree and the directories above the root apply to
+    # the root's files by their path from those directories
+    rules = []
+    exclude = read_rules(str(work_tree), [str(git_dir / 'info' / 'exclude')])
+    if exclude:
+        rules.append((exclude, root, '/'.join(parts) + '/' if parts else ''))
+    for depth in range(len(parts)):
+        directory_rules = read_rules(str(work_tree.joinpath(*parts[:depth])))
+        if directory_rules:
+            rules.append((directory_rules, root, '/'.join(parts[depth:]) + '/'))
+    return IgnoreMatcher(tuple(rules))
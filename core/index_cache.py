@@ -0,0 +1,308 @@
+"""
+Resident per-project index cache shared by the detection and matching indexes.
+Finished indexes of recently used projects stay in memory under one byte
+budget, so switching back to a project reuses them instead of rebuilding;
+the least recently used ones are evicted first, either spilled to disk
+(on a background thread) or dropped.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .settings import settings
+
+# Bump when the layout of spilled entries changes
+SPILL_FORMAT_VERSION = 3
+
+
+def safe_file_stem(name: str) -> str:
+    """
+    Turn a project name into a file name stem.
+    
+    Characters that are not safe in file names are replaced, and a hash of
+    the original name is appended so names differing only in those
+    characters (e.g. 'a/b' and 'a_b') don't share files.
+    
+    Args:
+        name: Project name
+    
+    Returns:
+        Stem made of word characters, '.', '-' and '_'
+    """
+    slug = re.sub(r'[^\w.-]', '_', name).lstrip('.')[:64]
+    digest = hashlib.blake2b(name.encode('utf-8', errors='surrogateescape'), digest_size=4).hexdigest()
+    return f"{slug}_{digest}"
+
+
+class ResidentIndexCache:
+    """
+    LRU cache of per-project indexes with a memory budget.
+    
+    Entries are keyed by (owner, project) and carry the caller's estimate
+    of their size. When the total goes over budget, least recently used
+    entries are evicted; entries put with spill=True are pickled to disk
+    on a background thread and loaded back by get(), which also hands out
+    entries whose spill is still pending. Neither the most recently used entry
+    nor the entry of each owner's current project (see set_current) is
+    evicted, so an owner's current index always stays resident even when
+    another owner's puts push the cache over budget.
+    
+    Callers store whatever they need to check an entry is still current
+    (e.g. file mtimes) alongside the index, and validate it themselves.
+    """
+    
+    def __init__(self, spill_path: str = None, budget_bytes: int = None):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            spill_path: Directory for spilled entries
+            budget_bytes: Memory budget (default: from settings, read on every put)
+        """
+        if spill_path is None:
+            spill_path = os.path.join(os.path.dirname(__file__), "index_spill")
+        
+        self.spill_path = Path(spill_path)
+        self.budget_bytes = budget_bytes
+        
+        self._entries = OrderedDict()  # (owner, project) -> (value, size_bytes, spill)
+        self._current = {}             # owner -> project whose entry is never evicted
+        self._spilling = {}            # (owner, project) -> (value, size_bytes) waiting to be written
+        self._spill_executor = None    # Single thread writing evicted entries, started on first use
+        self._lock = threading.RLock()
+        
+        # Statistics
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _budget(self) -> int:
+        """Get the memory budget in bytes."""
+        if self.budget_bytes is not None:
+            return self.budget_bytes
+        return int(settings.index_cache_budget_mb * 1024 * 1024)
+    
+    def get(self, owner: str, project_name: str, include_spilled: bool = True) -> Optional[object]:
+        """
+        Get a cached index, loading it back from disk if it was spilled.
+        
+        Args:
+            owner: Name of the index kind (e.g. 'instant')
+            project_name: Name of the project
+            include_spilled: Whether to load spilled entries (False on the GUI thread)
+        
+        Returns:
+            Cached value, or None if not cached
+        """
+        key = (owner, project_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            
+            # Evicted but not written yet: take it back instead of waiting for the file
+            pending = self._spilling.pop(key, None)
+        
+        if pending is not None:
+            self.hits += 1
+            self.put(owner, project_name, pending[0], pending[1], spill=True)
+            return pending[0]
+        
+        if not include_spilled:
+            return None
+        
+        loaded = self._load_spilled(key)
+        if loaded is None:
+            self.misses += 1
+            return None
+        
+        value, size_bytes = loaded
+        self.spill_hits += 1
+        self.put(owner, project_name, value, size_bytes, spill=True)
+        return value
+    
+    def put(self, owner: str, project_name: str, value: object, size_bytes: int, spill: bool = False):
+        """
+        Store a finished index as the most recently used entry.
+        
+        Entries evicted to make room are handed to the spill thread, so
+        callers (which may hold their own locks) never wait for disk writes.
+        
+        Args:
+            owner: Name of the index kind
+            project_name: Name of the project
+            value: Index to keep (never mutated afterwards)
+            size_bytes: Estimated memory held by the index
+            spill: Whether to write the entry to disk when evicted
+        """
+        key = (owner, project_name)
+        with self._lock:
+            self._spilling.pop(key, None)
+            self._entries[key] = (value, size_bytes, spill)
+            self._entries.move_to_end(key)
+            evicted = self._evict()
+            
+            for evicted_key, (evicted_value, evicted_size, evicted_spill) in evicted:
+                spill_entry = evicted_spill and settings.index_cache_spill_to_disk
+                if spill_entry:
+                    self._spilling[evicted_key] = (evicted_value, evicted_size)
+                    if self._spill_executor is None:
+                        self._spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-spill")
+                    self._spill_executor.submit(self._spill_pending, evicted_key)
+                print(f"Evicted {evicted_key[0]} index of project '{evicted_key[1]}' "
+                      f"({evicted_size / 1024 / 1024:.1f} MB){' to disk' if spill_entry else ''}")
+    
+    def set_current(self, owner: str, project_name: Optional[str]):
+        """
+        Record the project an owner is using, whose entry must stay resident.
+        
+        Args:
+            owner: Name of the index kind
+            project_name: Name of the project, or None if the owner has none
+        """
+        with self._lock:
+            self._current[owner] = project_name
+    
+    def discard(self, owner: str, project_name: str):
+        """Forget a project's index in memory and on disk."""
+        key = (owner, project_name)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._spilling.pop(key, None)
+        
+        try:
+            self._spill_file(key).unlink()
+        except OSError:
+            pass
+    
+    def _evict(self) -> List[Tuple[Tuple[str, str], Tuple[object, int, bool]]]:
+        """
+        Remove least recently used entries until the cache fits its budget.
+        
+        The most recently used entry and the owners' current entries are
+        kept, even if that leaves the cache over budget.
+        
+        Returns:
+            Removed (key, entry) pairs, oldest first
+        """
+        budget = self._budget()
+        usage = self.memory_usage()
+        protected = {(owner, project) for owner, project in self._current.items() if project is not None}
+        protected.update(list(self._entries)[-1:])
+        
+        evicted = []
+        for key in list(self._entries):
+            if usage <= budget:
+                break
+            if key in protected:
+                continue
+            entry = self._entries.pop(key)
+            evicted.append((key, entry))
+            usage -= entry[1]
+            self.evictions += 1
+        return evicted
+    
+    def _spill_file(self, key: Tuple[str, str]) -> Path:
+        """Get the path an entry is spilled to."""
+        owner, project_name = key
+        return self.spill_path / f"{owner}_{safe_file_stem(project_name)}.pkl"
+    
+    def _spill_pending(self, key: Tuple[str, str]):
+        """Write an evicted entry on the spill thread, unless it was taken back or discarded meanwhile."""
+        with self._lock:
+            pending = self._spilling.get(key)
+        if pending is None:
+            return
+        
+        spilled = self._spill(key, *pending)
+        with self._lock:
+            if self._spilling.get(key) is pending:
+                del self._spilling[key]
+            elif spilled and key not in self._spilling and key not in self._entries:
+                # Discarded while it was being written
+                try:
+                    self._spill_file(key).unlink()
+                except OSError:
+                    pass
+    
+    def wait_for_spills(self):
+        """Block until every evicted entry handed to the spill thread is written."""
+        executor = self._spill_executor
+        if executor is not None:
+            executor.submit(lambda: None).result()
+    
+    def _spill(self, key: Tuple[str, str], value: object, size_bytes: int) -> bool:
+        """Write an evicted entry to disk; returns True if it was written."""
+        try:
+            self.spill_path.mkdir(exist_ok=True)
+            path = self._spill_file(key)
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({
+                    'version': SPILL_FORMAT_VERSION,
+                    'key': key,
+                    'size_bytes': size_bytes,
+                    'value': value
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            return True
+        
+        except Exception as e:
+            print(f"Error spilling {key[0]} index of project '{key[1]}': {e}")
+            return False
+    
+    def _load_spilled(self, key: Tuple[str, str]) -> Optional[Tuple[object, int]]:
+        """Load a spilled entry, ignoring missing or stale files."""
+        path = self._spill_file(key)
+        if not path.exists():
+            return None
+        
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            
+            if data.get('version') != SPILL_FORMAT_VERSION or data.get('key') != key:
+                return None
+            
+            return data['value'], data['size_bytes']
+        
+        except Exception as e:
+            print(f"Error loading spilled {key[0]} index of project '{key[1]}': {e}")
+            return None
+    
+    def resident_projects(self, owner: str) -> List[str]:
+        """Get the projects with a resident index of a kind, least recently used first."""
+        with self._lock:
+            return [project for kind, project in self._entries if kind == owner]
+    
+    def memory_usage(self) -> int:
+        """Get the estimated bytes held by resident entries."""
+        with self._lock:
+            return sum(size_bytes for _, size_bytes, _ in self._entries.values())
+    
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        with self._lock:
+            return {
+                'resident_entries': len(self._entries),
+                'memory_mb': round(self.memory_usage() / 1024 / 1024, 2),
+                'budget_mb': round(self._budget() / 1024 / 1024, 2),
+                'hits': self.hits,
+                'spill_hits': self.spill_hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+# Create singleton instance
+resident_index_cache = ResidentIndexCache()
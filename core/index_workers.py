@@ -0,0 +1,419 @@
+"""
+Sharded, multi-process construction of the code detection indexes.
+Files are split into shards that worker processes tokenize and hash in
+parallel; each shard is sent with the file contents the parent already
+holds in the content store, and comes back as compact arrays that the
+parent merges into its tables. The workers are one persistent pool
+started at launch (see start_worker_pool), so builds running on
+background threads never start processes themselves.
+
+Everything a worker runs lives in this module, which stays free of
+side effects (no project_linker import) so workers never touch the
+linked-projects file or the GUI.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .content_store import decode_text, project_content_store, read_text
+from .rolling_hash import hash_text64, hash_tokens, rolling_window_hashes
+from .substring_index import SubstringIndex
+from .tokenizer import tokenize, tokenize_file
+from .winnowing import WinnowingIndex
+
+# Below this many files a pool costs more to start than it saves
+MIN_FILES_FOR_PROCESSES = 64
+
+# Shards per worker, so workers that finish early can pick up more work
+SHARDS_PER_WORKER = 4
+
+# Shards queued per worker; only these hold a copy of their file contents
+QUEUED_SHARDS_PER_WORKER = 2
+
+# Largest file CodeMatcher caches for context matching
+MAX_CONTEXT_FILE_SIZE = 1024 * 1024
+
+# Worker processes shared by all builds, or None to run shards in-process
+_worker_pool = None
+
+
+def max_index_workers() -> int:
+    """Get the number of worker processes to index with (one per core)."""
+    return max(1, os.cpu_count() or 1)
+
+
+def pool_context() -> Optional[multiprocessing.context.BaseContext]:
+    """
+    Get the multiprocessing context the worker pool is started with.
+    
+    Only fork is used: spawn and forkserver re-import the main script,
+    and main.py builds the Qt application at import time. Forking is only
+    safe while the process has a single thread, which is why the pool is
+    started once at launch. Where fork is unavailable (Windows) None is
+    returned and shards run in-process.
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def _worker_ready(_) -> int:
+    """Keep a freshly started worker busy briefly, so the pool starts all of them."""
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def start_worker_pool(max_workers: Optional[int] = None) -> bool:
+    """
+    Start the worker processes index builds run their shards on.
+    
+    Call once at launch, before Qt objects or any threads exist: a child
+    forked while another thread holds a lock (the content store's, the
+    project catalog's, logging's or malloc's) inherits the lock held and
+    can hang. All workers are started here; builds never fork later, and
+    without a pool they run their shards in-process.
+    
+    Args:
+        max_workers: Worker processes to start (default: one per core)
+    
+    Returns:
+        True if the pool is running
+    """
+    global _worker_pool
+    if _worker_pool is not None:
+        return True
+    
+    context = pool_context()
+    workers = max_workers or max_index_workers()
+    if context is None or workers < 2:
+        return False
+    
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        list(pool.map(_worker_ready, range(workers)))
+    except Exception as e:
+        print(f"Index worker processes unavailable, indexing in-process: {e}")
+        return False
+    
+    _worker_pool = pool
+    return True
+
+
+def split_shards(items: Sequence, shard_count: int, min_shard_size: int = 8) -> List[List]:
+    """
+    Split items into contiguous shards of roughly equal size.
+    
+    Args:
+        items: Items to split
+        shard_count: Desired number of shards
+        min_shard_size: Smallest shard worth sending to a worker
+    
+    Returns:
+        List of shards, in order
+    """
+    items = list(items)
+    if not items:
+        return []
+    
+    shard_size = max(min_shard_size, -(-len(items) // max(1, shard_count)))
+    return [items[i:i + shard_size] for i in range(0, len(items), shard_size)]
+
+
+def shard_contents(file_paths: List[str], copy: bool = False) -> List[Tuple[str, Optional[bytes]]]:
+    """
+    Pair each file of a shard with its bytes from the content store.
+    
+    Args:
+        file_paths: Files in the shard
+        copy: Copy the bytes out of the store, so they can be sent to a worker
+    
+    Returns:
+        List of (file_path, bytes) tuples; bytes is None for files the store
+        doesn't hold (too large), which the worker reads itself
+    """
+    contents = []
+    for file_path in file_paths:
+        data = project_content_store.raw(file_path)
+        if data is not None and copy:
+            data = bytes(data)
+        contents.append((file_path, data))
+    return contents
+
+
+def shard_text(file_path: str, data: Optional[bytes]) -> str:
+    """Get a file's text from the bytes sent with its shard, or from disk without them."""
+    return decode_text(data) if data is not None else read_text(file_path)
+
+
+def map_shards(worker: Callable[[List], object], file_paths: Sequence[str],
+               max_workers: Optional[int] = None) -> Iterator[Tuple[List[str], object]]:
+    """
+    Run a worker over shards of files, in worker processes when worthwhile.
+    
+    Each shard is handed to the worker as (file_path, bytes) pairs taken
+    from the content store (see shard_contents), so callers load the store
+    first and no file is read a second time by a worker. Results are
+    yielded in shard order as they complete, so callers can report
+    progress and publish partial tables. Only a few shards per worker are
+    queued at a time, which bounds the copies of file contents in flight.
+    Small inputs and processes without a worker pool (see
+    start_worker_pool) run the shards in this process.
+    
+    Args:
+        worker: Module-level function taking one shard of (file_path, bytes)
+            pairs and returning its result
+        file_paths: Files to shard
+        max_workers: Shards are sized for this many workers (default: one per core)
+    
+    Yields:
+        Tuples of (shard file paths, result)
+    """
+    global _worker_pool
+    pool = _worker_pool
+    workers = max_workers or max_index_workers()
+    parallel = pool is not None and workers > 1 and len(file_paths) >= MIN_FILES_FOR_PROCESSES
+    shards = split_shards(file_paths, workers * SHARDS_PER_WORKER if parallel else 1 + len(file_paths) // 64)
+    done = 0
+    
+    if parallel:
+        futures = []
+        try:
+            queue_size = workers * QUEUED_SHARDS_PER_WORKER
+            for shard in shards[:queue_size]:
+                futures.append(pool.submit(worker, shard_contents(shard, copy=True)))
+            for shard in shards:
+                result = futures[done].result()
+                done += 1
+                if len(futures) < len(shards):
+                    futures.append(pool.submit(worker, shard_contents(shards[len(futures)], copy=True)))
+                yield shard, result
+            return
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            print(f"Parallel indexing unavailable, continuing in-process: {e}")
+            if isinstance(e, BrokenProcessPool):
+                _worker_pool = None  # Not restarted: that would fork from this thread
+        finally:
+            # Don't run queued shards when the caller stopped early
+            for future in futures[done:]:
+                future.cancel()
+    
+    for shard in shards[done:]:
+        yield shard, worker(shard_contents(shard))
+
+
+def word_sequence_hashes(words: List[str], include_four: bool,
+                         token_cache: Dict[str, int] = None) -> Tuple[array, array]:
+    """
+    Hash 3-word (and optionally 4-word) windows with a rolling hash.
+    
+    3-word windows are kept only when the joined sequence is longer than
+    8 characters, matching what a query is able to look up.
+    
+    Args:
+        words: Lowercased words in order
+        include_four: Whether to also hash 4-word windows
+        token_cache: Optional word -> hash cache shared while building
+    
+    Returns:
+        Tuple of (window hashes, start word positions)
+    """
+    hashes = array('Q')
+    positions = array('I')
+    
+    token_hashes = hash_tokens(words, token_cache)
+    lengths = [len(word) for word in words]
+    
+    for i, window_hash in enumerate(rolling_window_hashes(token_hashes, 3)):
+        if lengths[i] + lengths[i + 1] + lengths[i + 2] > 6:  # Only meaningful sequences
+            hashes.append(window_hash)
+            positions.append(i)
+    
+    if include_four:
+        four_hashes = rolling_window_hashes(token_hashes, 4)
+        hashes.extend(four_hashes)
+        positions.extend(range(len(four_hashes)))
+    
+    return hashes, positions
+
+
+def index_file_for_instant_lookup(file_path: str, token_cache: Dict[str, int] = None,
+                                  content: Optional[str] = None) -> Optional[Dict[str, object]]:
+    """
+    Index a single file for instant lookup.
+    
+    The file is tokenized once; lines, word sequences and identifiers are
+    all taken from its token stream, so comments and spacing are ignored
+    the same way they are for queries.
+    
+    Args:
+        file_path: Path to the file
+        token_cache: Optional word -> hash cache shared while building
+        content: File text, if already read (default: read it)
+    
+    Returns:
+        Record of the file's line hashes, word sequences and identifiers,
+        or None if the file is empty or unreadable
+    """
+    try:
+        if content is None:
+            content = read_text(file_path)
+        
+        if not content.strip():
+            return None
+        
+        stream = tokenize_file(file_path, content)
+        line_hashes = array('Q')
+        line_numbers = array('I')
+        
+        # Index individual lines
+        for line_num, line_tokens in stream.code_lines().items():
+            if len(line_tokens) > 10:  # Only index substantial lines
+                line_hashes.append(hash_text64(line_tokens))
+                line_numbers.append(line_num)
+        
+        # Index word sequences (3 and 4 word rolling windows)
+        words = stream.words()
+        sequence_hashes, sequence_positions = word_sequence_hashes(
+            words, include_four=True, token_cache=token_cache
+        )
+        
+        # Index identifiers (function names, variable names, etc.)
+        identifier_entries = list(stream.identifier_counts())
+        
+        return {
+            'line_hashes': line_hashes,
+            'line_numbers': line_numbers,
+            'sequence_hashes': sequence_hashes,
+            'sequence_positions': sequence_positions,
+            'identifiers': identifier_entries
+        }
+    
+    except Exception as e:
+        print(f"Error indexing file {file_path}: {e}")
+        return None
+
+
+def index_instant_shard(contents: List[Tuple[str, Optional[bytes]]]) -> List[Optional[Dict[str, object]]]:
+    """
+    Build instant detector records for one shard of files.
+    
+    Args:
+        contents: (file_path, bytes) pairs of the shard (see shard_contents)
+    
+    Returns:
+        Record (or None) for each file, in shard order
+    """
+    token_cache = {}
+    records = []
+    for file_path, data in contents:
+        try:
+            content = shard_text(file_path, data)
+        except Exception as e:
+            print(f"Error indexing file {file_path}: {e}")
+            records.append(None)
+            continue
+        records.append(index_file_for_instant_lookup(file_path, token_cache, content))
+    return records
+
+
+def normalize_code(text: str, family: str = 'plain') -> str:
+    """
+    Normalize code text for context matching.
+    
+    Args:
+        text: Raw code text
+        family: Language family whose comments are dropped
+    
+    Returns:
+        Lowercased text without whitespace, comments, quotes, semicolons and commas
+    """
+    if not text:
+        return ""
+    
+    return tokenize(text, family).compact(drop_separators=True)
+
+
+def cache_context_shard(contents: List[Tuple[str, Optional[bytes]]]) -> SubstringIndex:
+    """
+    Normalize one shard of files and build its substring index.
+    
+    The normalized text lives only in the index corpus; the original
+    text stays in the shared content store.
+    
+    Args:
+        contents: (file_path, bytes) pairs of the shard (see shard_contents)
+    
+    Returns:
+        Substring index over the non-empty files of the shard
+    """
+    entries = []
+    for file_path, data in contents:
+        try:
+            # Skip very large files for performance
+            file_size = len(data) if data is not None else os.path.getsize(file_path)
+            if file_size > MAX_CONTEXT_FILE_SIZE:
+                print(f"Skipping large file for context matching: {os.path.basename(file_path)} ({file_size:,} bytes)")
+                continue
+            
+            normalized = tokenize_file(file_path, shard_text(file_path, data)).compact(drop_separators=True)
+            if normalized:  # Only cache non-empty files
+                entries.append((file_path, normalized))
+        
+        except Exception as e:
+            print(f"Error caching file {file_path}: {e}")
+    
+    segment = SubstringIndex()
+    segment.build(dict(entries))
+    return segment
+
+
+def normalize_whitespace(text: str, family: str = 'plain') -> str:
+    """Lowercase text and remove all whitespace, newlines and comments."""
+    return tokenize(text, family).compact()
+
+
+def content_hash(normalized: str) -> str:
+    """Hash whitespace-normalized content (see normalize_whitespace) for exact-copy lookup."""
+    return hashlib.md5(normalized.encode()).hexdigest()
+
+
+def index_text_shard(contents: List[Tuple[str, Optional[bytes]]], kgram: int = 8,
+                     window: int = 5) -> List[Tuple[str, str, array, array]]:
+    """
+    Prepare one shard of files for the project linker's text comparator.
+    
+    Args:
+        contents: (file_path, bytes) pairs of the shard (see shard_contents)
+        kgram: Tokens per winnowing k-gram
+        window: Winnowing window in k-grams
+    
+    Returns:
+        List of (file_path, content hash, fingerprints, fingerprint lines)
+        for each readable file
+    """
+    winnowing = WinnowingIndex(kgram, window)
+    entries = []
+    for file_path, data in contents:
+        try:
+            stream = tokenize_file(file_path, shard_text(file_path, data))
+            hashes, lines = winnowing.fingerprint(stream)
+            entries.append((
+                file_path, content_hash(stream.compact()), array('Q', hashes), array('I', lines)
+            ))
+        except Exception as e:
+            print(f"Error indexing file {file_path}: {e}")
+    return entries
+
+
+def text_shard_worker(kgram: int, window: int) -> Callable[[List[Tuple[str, Optional[bytes]]]], List]:
+    """Get a picklable index_text_shard bound to winnowing parameters."""
+    return partial(index_text_shard, kgram=kgram, window=window)
@@ -0,0 +1,353 @@
+"""
+Versioned binary index files opened with mmap for zero-copy loading.
+A file holds named sections of fixed-width arrays (hash keys, postings
+offsets, file ids), string tables and a small JSON metadata block. Opening
+one only maps it: lookups read the pages they touch straight from the page
+cache, which every process that maps the same file shares.
+"""
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .bitmap_postings import BitmapPostings, bitmap_from_ids, bitmap_ids, popcount
+from .postings import PostingsIndex
+from .rolling_hash import hash_text64
+
+MAGIC = b'LUMENIDX'
+
+# magic, format version, section count
+HEADER = struct.Struct('<8sII')
+
+# section name, array typecode, offset, length in bytes
+SECTION_ENTRY = struct.Struct('<24s8sQQ')
+
+# Sections start on 8-byte boundaries so every array can be cast in place
+ALIGNMENT = 8
+
+Section = Union[array, bytes, memoryview]
+
+
+def write_index_file(path: Union[str, Path], version: int, sections: Dict[str, Section],
+                     metadata: Dict[str, object] = None):
+    """
+    Write a binary index file atomically.
+    
+    Args:
+        path: Destination file
+        version: Format version stored in the header
+        sections: Dictionary of section name -> array, memoryview or raw bytes
+        metadata: JSON-serializable values stored alongside the arrays
+    
+    Raises:
+        ValueError: If a section name does not fit the section table
+    """
+    views = {name: memoryview(values) for name, values in sections.items()}
+    views['metadata'] = memoryview(json.dumps(metadata or {}).encode('utf-8'))
+    
+    table_size = HEADER.size + SECTION_ENTRY.size * len(views)
+    offset = -(-table_size // ALIGNMENT) * ALIGNMENT
+    entries = []
+    for name, view in views.items():
+        if len(name.encode('utf-8')) > 24:
+            raise ValueError(f"Section name too long: {name}")
+        entries.append((name, view.format, offset, view.nbytes))
+        offset += -(-view.nbytes // ALIGNMENT) * ALIGNMENT
+    
+    path = Path(path)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, version, len(entries)))
+        for name, typecode, section_offset, length in entries:
+            f.write(SECTION_ENTRY.pack(name.encode('utf-8'), typecode.encode('ascii'), section_offset, length))
+        
+        for (_, _, section_offset, _), view in zip(entries, views.values()):
+            f.write(b'\0' * (section_offset - f.tell()))
+            f.write(view)
+        f.write(b'\0' * (offset - f.tell()))
+    os.replace(tmp_path, path)
+
+
+class MappedIndexFile:
+    """
+    Read-only memory mapping of a binary index file.
+    
+    Sections are handed out as memoryviews cast to their array type, so
+    nothing is copied or unpickled. The mapping stays open as long as any
+    of those views is referenced.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Map an index file.
+        
+        Args:
+            path: File to map
+        
+        Raises:
+            ValueError: If the file is not a binary index file, or is truncated
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        view = memoryview(self._mmap)
+        if len(view) < HEADER.size:
+            raise ValueError(f"{path} is truncated")
+        magic, self.version, section_count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Lumen index file")
+        if len(view) < HEADER.size + section_count * SECTION_ENTRY.size:
+            raise ValueError(f"{path} is truncated")
+        
+        self._sections = {}
+        for i in range(section_count):
+            name, typecode, offset, length = SECTION_ENTRY.unpack_from(view, HEADER.size + i * SECTION_ENTRY.size)
+            if offset + length > len(view):
+                raise ValueError(f"{path} is truncated")
+            self._sections[name.rstrip(b'\0').decode('utf-8')] = (
+                typecode.rstrip(b'\0').decode('ascii'), offset, length
+            )
+        
+        self.metadata = json.loads(bytes(self.section('metadata')).decode('utf-8'))
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._sections
+    
+    def section(self, name: str) -> memoryview:
+        """Get a section as a memoryview of its array type."""
+        typecode, offset, length = self._sections[name]
+        view = memoryview(self._mmap)[offset:offset + length]
+        return view.cast(typecode) if typecode != 'B' else view
+    
+    def size(self) -> int:
+        """Get the size of the mapped file in bytes."""
+        return len(self._mmap)
+
+
+def open_index_file(path: Union[str, Path], version: int) -> Optional[MappedIndexFile]:
+    """
+    Map an index file if it exists and has the expected format version.
+    
+    Args:
+        path: File to map
+        version: Required format version
+    
+    Returns:
+        Mapped file, or None if it is missing, stale or unreadable
+    """
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        mapped = MappedIndexFile(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error mapping index file {path}: {e}")
+        return None
+    
+    return mapped if mapped.version == version else None
+
+
+def pack_strings(strings: Iterable[str]) -> Tuple[array, bytes]:
+    """
+    Pack strings into a string table.
+    
+    Args:
+        strings: Strings in order
+    
+    Returns:
+        Tuple of (byte offsets with one trailing end offset, UTF-8 data)
+    """
+    encoded = [string.encode('utf-8', errors='surrogateescape') for string in strings]
+    offsets = array('Q', [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return offsets, b''.join(encoded)
+
+
+class MappedStrings(Sequence):
+    """Read-only list of strings backed by a mapped string table."""
+    
+    def __init__(self, offsets: memoryview, data: memoryview):
+        """
+        Wrap a string table.
+        
+        Args:
+            offsets: Byte offsets of the strings, with one trailing end offset
+            data: UTF-8 data of all strings
+        """
+        self.offsets = offsets
+        self.data = data
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return bytes(self.data[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8', errors='surrogateescape')
+
+
+def postings_sections(prefix: str, index: PostingsIndex) -> Dict[str, array]:
+    """Get the sections storing a frozen postings index."""
+    index.freeze()
+    return {
+        f'{prefix}.keys': index.keys,
+        f'{prefix}.offsets': index.offsets,
+        f'{prefix}.file_ids': index.file_ids,
+        f'{prefix}.positions': index.positions
+    }
+
+
+def mapped_postings(mapped: MappedIndexFile, prefix: str) -> PostingsIndex:
+    """Get a postings index reading its arrays straight from a mapped file."""
+    index = PostingsIndex()
+    index.keys = mapped.section(f'{prefix}.keys')
+    index.offsets = mapped.section(f'{prefix}.offsets')
+    index.file_ids = mapped.section(f'{prefix}.file_ids')
+    index.positions = mapped.section(f'{prefix}.positions')
+    return index
+
+
+def bitmap_postings_sections(prefix: str, postings: BitmapPostings) -> Dict[str, Section]:
+    """
+    Get the sections storing frozen bitmap postings.
+    
+    Keys are stored as sorted 64-bit hashes of the key strings. Each
+    container is either its file ids (u32) or its bitmap bytes, padded to
+    a multiple of four bytes.
+    """
+    entries = []
+    for key in postings:
+        # Same container choice as BitmapPostings.freeze()
+        if postings.doc_freq(key) * 32 > postings.total_files:
+            bitmap = postings.bitmap(key)
+            data, dense = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), 1
+        else:
+            data, dense = array('I', postings.file_ids(key)).tobytes(), 0
+        entries.append((hash_text64(key), dense, data + b'\0' * (-len(data) % 4)))
+    entries.sort()
+    
+    offsets = array('Q', [0])
+    for _, _, data in entries:
+        offsets.append(offsets[-1] + len(data))
+    return {
+        f'{prefix}.keys': array('Q', [key_hash for key_hash, _, _ in entries]),
+        f'{prefix}.dense': array('B', [dense for _, dense, _ in entries]),
+        f'{prefix}.offsets': offsets,
+        f'{prefix}.data': b''.join(data for _, _, data in entries)
+    }
+
+
+class MappedBitmapPostings:
+    """
+    Read-only bitmap postings backed by a mapped file.
+    
+    Answers the queries of a frozen BitmapPostings; containers are turned
+    into integer bitmaps only for the keys a query asks for.
+    """
+    
+    def __init__(self, mapped: MappedIndexFile, prefix: str, total_files: int, stop_keys: int):
+        """
+        Wrap the sections written by bitmap_postings_sections().
+        
+        Args:
+            mapped: Mapped index file
+            prefix: Name prefix of the sections
+            total_files: Number of indexed files
+            stop_keys: Number of keys dropped when the postings were frozen
+        """
+        self.keys = mapped.section(f'{prefix}.keys')
+        self.dense = mapped.section(f'{prefix}.dense')
+        self.offsets = mapped.section(f'{prefix}.offsets')
+        self.data = mapped.section(f'{prefix}.data')
+        self.total_files = total_files
+        self.stop_keys = stop_keys
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+    
+    def _find(self, key: str) -> Optional[int]:
+        """Get the position of a key's container, if the key is present."""
+        key_hash = hash_text64(key)
+        index = bisect_left(self.keys, key_hash)
+        if index < len(self.keys) and self.keys[index] == key_hash:
+            return index
+        return None
+    
+    def bitmap(self, key: str) -> int:
+        """Get the files containing a key as an integer bitmap (0 if none)."""
+        index = self._find(key)
+        if index is None:
+            return 0
+        data = self.data[self.offsets[index]:self.offsets[index + 1]]
+        if self.dense[index]:
+            return int.from_bytes(data, 'little')
+        return bitmap_from_ids(data.cast('I'))
+    
+    def file_ids(self, key: str) -> List[int]:
+        """Get the ids of the files containing a key."""
+        index = self._find(key)
+        if index is None:
+            return []
+        data = self.data[self.offsets[index]:self.offsets[index + 1]]
+        if self.dense[index]:
+            return bitmap_ids(int.from_bytes(data, 'little'))
+        return data.cast('I').tolist()
+    
+    def doc_freq(self, key: str) -> int:
+        """Get the number of files containing a key."""
+        index = self._find(key)
+        if index is None:
+            return 0
+        data = self.data[self.offsets[index]:self.offsets[index + 1]]
+        if self.dense[index]:
+            return popcount(int.from_bytes(data, 'little'))
+        return len(data) // 4
+    
+    def memory_usage(self) -> int:
+        """Get the bytes held outside the page cache (none)."""
+        return 0
+    
+    def frozen_copy(self) -> 'MappedBitmapPostings':
+        """Get a frozen copy (these postings never change, so themselves)."""
+        return self
+
+
+class MappedArrays(Mapping):
+    """Read-only key -> array mapping over one mapped array split by offsets."""
+    
+    def __init__(self, key_ids: Dict[str, int], offsets: memoryview, values: memoryview):
+        """
+        Wrap a split array.
+        
+        Args:
+            key_ids: Dictionary of key -> index of its run
+            offsets: Start of each run in values, with one trailing end offset
+            values: Concatenated runs
+        """
+        self.key_ids = key_ids
+        self.offsets = offsets
+        self.values = values
+    
+    def __getitem__(self, key: str) -> memoryview:
+        index = self.key_ids[key]
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.key_ids)
+    
+    def __len__(self) -> int:
+        return len(self.key_ids)
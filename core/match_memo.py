@@ -0,0 +1,127 @@
+"""
+Memo of match results for recently copied text.
+One clipboard event runs the same text through several matchers (popup
+detection, context selection, source lookup), and copying again to keep the
+popup open repeats them. Results are remembered per stage, keyed by a digest
+of the text and the project and index they were computed against, so each
+stage matches a given copy only once.
+"""
+
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple, TypeVar
+
+# Results remembered; older ones are forgotten
+MAX_MEMO_ENTRIES = 32
+
+# Seconds a result stays valid - long enough for one copy-and-ask round
+MAX_MEMO_AGE = 60.0
+
+T = TypeVar('T')
+
+# Source of index generations (see next_generation)
+_generations = itertools.count(1)
+
+
+def content_digest(text: str) -> bytes:
+    """Get a digest identifying copied text."""
+    return hashlib.blake2b(text.encode('utf-8', errors='surrogateescape'), digest_size=16).digest()
+
+
+def next_generation() -> int:
+    """
+    Get a new index generation number for memo keys.
+    
+    Owners of an index take a new number whenever they publish, rebuild
+    or clear it. Numbers are never reused within the process, unlike the
+    id() of a replaced index object.
+    """
+    return next(_generations)
+
+
+class MatchMemo:
+    """
+    Bounded least-recently-used memo of match results.
+    
+    Results flagged as partial (a deadline cut the search short) are never
+    remembered, so a later call with more time can still find more.
+    """
+    
+    def __init__(self, max_entries: int = MAX_MEMO_ENTRIES, max_age: float = MAX_MEMO_AGE):
+        """
+        Initialize an empty memo.
+        
+        Args:
+            max_entries: Number of results to remember
+            max_age: Seconds after which a result is recomputed
+        """
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()  # key -> (stored_at, result), most recent last
+        self._lock = threading.Lock()
+        
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+    
+    def memoized(self, stage: str, text: str, compute: Callable[[], T], project_name: Optional[str] = None,
+                 generation: Hashable = None, args: Tuple = (), cacheable: bool = True) -> T:
+        """
+        Get the result of a matching stage, computing it only if not remembered.
+        
+        Args:
+            stage: Name of the matching stage (e.g. 'instant')
+            text: Text being matched
+            compute: Function computing the result
+            project_name: Project the result depends on
+            generation: Generation of the index queried (see next_generation),
+                so results of a rebuilt index are not reused
+            args: Other arguments the result depends on
+            cacheable: False to compute without remembering (e.g. while the
+                index is still building)
+        
+        Returns:
+            Result of the stage; shared between callers, so not to be modified
+        """
+        key = (stage, project_name, generation, args, content_digest(text))
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.max_age:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        result = compute()
+        if not cacheable or getattr(result, 'partial', False):
+            return result
+        
+        with self._lock:
+            self._entries[key] = (now, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+    
+    def clear(self):
+        """Forget all results."""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> dict:
+        """Get memo statistics."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Create singleton instance
+match_memo = MatchMemo()
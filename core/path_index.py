@@ -0,0 +1,155 @@
+"""
+Resolution of file references in stack traces and compiler output.
+Copied tracebacks and error logs name files as `file.py:123`,
+`File "/ci/build/src/app.py", line 7` or `src/foo/bar.ts(45,3)`, usually with
+a path prefix from another machine. A trie over the reversed path components
+of a project's files resolves such a reference by walking its components
+from the file name backwards, which takes microseconds and is exact.
+"""
+
+import re
+from typing import Dict, Iterable, List, Tuple
+
+# References resolving to more files than this (e.g. a bare `__init__.py:3`)
+# say too little to report
+MAX_AMBIGUOUS_FILES = 3
+
+# Confidence of files sharing a reference (below the popup's 95% cut-off)
+AMBIGUOUS_CONFIDENCE = 0.9
+
+# Python tracebacks name the file in quotes, which allows spaces; other tools
+# print path:line[:col] or path(line[,col])
+_REFERENCE = re.compile(
+    r'File "(?P<quoted>[^"\n]+)", line (?P<quoted_line>\d+)'
+    r'|(?P<path>(?:[A-Za-z]:)?[\w.~@+\-/\\]*\.[A-Za-z]\w*)'
+    r'(?::(?P<line>\d+)|\((?P<paren_line>\d+)(?:,\s*\d+)?\))'
+)
+
+_SEPARATORS = re.compile(r'[/\\]+')
+
+
+def path_components(path: str) -> List[str]:
+    """
+    Split a path into case-folded components, last component first.
+    
+    Both separators are accepted so references from Windows and POSIX
+    machines resolve alike; '.' components and drive letters are dropped.
+    
+    Args:
+        path: Absolute or relative path
+    
+    Returns:
+        Components in reverse order (file name first)
+    """
+    components = [part.casefold() for part in _SEPARATORS.split(path) if part and part != '.']
+    if components and components[0].endswith(':'):
+        components = components[1:]
+    components.reverse()
+    return components
+
+
+def extract_path_references(text: str) -> List[Tuple[str, int]]:
+    """
+    Find the file references with line numbers in traceback or log text.
+    
+    Args:
+        text: Copied text
+    
+    Returns:
+        (path as written, line number) tuples in order of appearance, without
+        duplicates
+    """
+    references = []
+    seen = set()
+    for match in _REFERENCE.finditer(text):
+        if match.group('quoted'):
+            reference = (match.group('quoted'), int(match.group('quoted_line')))
+        else:
+            reference = (match.group('path'), int(match.group('line') or match.group('paren_line')))
+        if reference not in seen:
+            seen.add(reference)
+            references.append(reference)
+    return references
+
+
+class PathSuffixIndex:
+    """
+    Trie over the reversed path components of a list of files.
+    
+    Each node holds the ids of the files whose paths end with the components
+    on the way to it, so the files matching the longest known suffix of a
+    reference are found without scanning the file list.
+    """
+    
+    def __init__(self, file_paths: Iterable[str]):
+        """
+        Index files by path suffix.
+        
+        Args:
+            file_paths: Project files (absolute paths)
+        """
+        self.file_paths = list(file_paths)
+        self.root = ({}, [])    # (component -> child node, ids of files below)
+        
+        for file_id, file_path in enumerate(self.file_paths):
+            node = self.root
+            for component in path_components(file_path):
+                children = node[0]
+                child = children.get(component)
+                if child is None:
+                    child = children[component] = ({}, [])
+                child[1].append(file_id)
+                node = child
+    
+    def __len__(self) -> int:
+        return len(self.file_paths)
+    
+    def resolve(self, path: str) -> Tuple[List[str], int]:
+        """
+        Find the files a referenced path most likely means.
+        
+        Args:
+            path: Path as written in a traceback (absolute, relative or
+                from another machine)
+        
+        Returns:
+            Tuple of (files ending with the longest matching suffix, number of
+            components matched); no files if even the file name is unknown
+        """
+        node = self.root
+        matched = 0
+        for component in path_components(path):
+            child = node[0].get(component)
+            if child is None:
+                break
+            node = child
+            matched += 1
+        
+        if not matched:
+            return [], 0
+        return [self.file_paths[file_id] for file_id in node[1]], matched
+    
+    def resolve_references(self, text: str) -> Dict[str, Tuple[float, List[int]]]:
+        """
+        Resolve all file references in traceback or log text.
+        
+        Args:
+            text: Copied text
+        
+        Returns:
+            Dictionary of file_path -> (confidence, referenced line numbers):
+            1.0 for files a reference resolves to alone, AMBIGUOUS_CONFIDENCE
+            for files sharing a reference with up to MAX_AMBIGUOUS_FILES others
+        """
+        resolved = {}
+        for path, line in extract_path_references(text):
+            file_paths, _ = self.resolve(path)
+            if len(file_paths) > MAX_AMBIGUOUS_FILES:
+                continue
+            
+            confidence = 1.0 if len(file_paths) == 1 else AMBIGUOUS_CONFIDENCE
+            for file_path in file_paths:
+                best, lines = resolved.get(file_path, (0.0, []))
+                lines.append(line)
+                resolved[file_path] = (max(best, confidence), lines)
+        return resolved
@@ -0,0 +1,217 @@
+"""
+Sorted hash postings shared by the code detection and matching indexes.
+Keys are 64-bit fingerprints kept in sorted arrays with compact postings,
+queried by binary search or NumPy searchsorted.
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+class PostingsIndex:
+    """
+    Sorted table of 64-bit hashes with compact postings of file ids and positions.
+    
+    Entries are appended while indexing and sorted by freeze(); lookups
+    then binary-search the sorted key array (or use NumPy searchsorted for
+    a whole query at once). Freezing again after more entries were queued
+    merges them with the entries already sorted.
+    """
+    
+    def __init__(self):
+        """Initialize an empty postings index."""
+        self.keys = array('Q')            # sorted distinct hashes
+        self.offsets = array('I', [0])    # postings of keys[i] are offsets[i]:offsets[i + 1]
+        self.file_ids = array('I')
+        self.positions = array('I')
+        
+        # Unsorted entries waiting for freeze()
+        self._pending_hashes = array('Q')
+        self._pending_file_ids = array('I')
+        self._pending_positions = array('I')
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    def extend(self, hashes: array, file_id: int, positions: array):
+        """
+        Queue all occurrences of hashes in one file.
+        
+        Args:
+            hashes: Content hashes
+            file_id: Interned id of the file containing them
+            positions: Line number or word offset of each hash
+        """
+        self._pending_hashes.extend(hashes)
+        self._pending_file_ids.extend(array('I', [file_id]) * len(hashes))
+        self._pending_positions.extend(positions)
+    
+    def extend_index(self, other: 'PostingsIndex', file_id_offset: int = 0, position_offset: int = 0):
+        """
+        Queue all entries of another index, e.g. one built by a worker process.
+        
+        Args:
+            other: Index to copy entries from
+            file_id_offset: Added to the other index's file ids
+            position_offset: Added to the other index's positions
+        """
+        other.freeze()
+        if not len(other.keys):
+            return
+        
+        self._pending_hashes.extend(other._expanded_keys())
+        if HAS_NUMPY:
+            file_ids = np.frombuffer(other.file_ids, dtype=np.uint32) + np.uint32(file_id_offset)
+            positions = np.frombuffer(other.positions, dtype=np.uint32) + np.uint32(position_offset)
+            self._pending_file_ids.extend(array('I', file_ids.tobytes()))
+            self._pending_positions.extend(array('I', positions.tobytes()))
+        else:
+            self._pending_file_ids.extend(array('I', [i + file_id_offset for i in other.file_ids]))
+            self._pending_positions.extend(array('I', [p + position_offset for p in other.positions]))
+    
+    def has_pending(self) -> bool:
+        """Check if entries were queued since the last freeze()."""
+        return len(self._pending_hashes) > 0
+    
+    def freeze(self):
+        """Sort queued entries by hash into the lookup arrays."""
+        if not self.has_pending():
+            return
+        
+        if len(self.keys):
+            # Re-queue the sorted entries first so the merge stays stable
+            self._pending_hashes = self._expanded_keys() + self._pending_hashes
+            self._pending_file_ids = self.file_ids + self._pending_file_ids
+            self._pending_positions = self.positions + self._pending_positions
+        
+        count = len(self._pending_hashes)
+        
+        if HAS_NUMPY:
+            hashes = np.frombuffer(self._pending_hashes, dtype=np.uint64)
+            order = np.argsort(hashes, kind='stable')
+            sorted_hashes = hashes[order]
+            keys, starts = np.unique(sorted_hashes, return_index=True)
+            
+            self.keys = array('Q', keys.tobytes())
+            self.offsets = array('I', np.append(starts, count).astype(np.uint32).tobytes())
+            self.file_ids = array('I', np.frombuffer(self._pending_file_ids, dtype=np.uint32)[order].tobytes())
+            self.positions = array('I', np.frombuffer(self._pending_positions, dtype=np.uint32)[order].tobytes())
+        else:
+            hashes = self._pending_hashes
+            order = sorted(range(count), key=hashes.__getitem__)
+            
+            keys = array('Q')
+            offsets = array('I')
+            previous = None
+            for rank, index in enumerate(order):
+                key = hashes[index]
+                if key != previous:
+                    keys.append(key)
+                    offsets.append(rank)
+                    previous = key
+            offsets.append(count)
+            
+            self.keys = keys
+            self.offsets = offsets
+            self.file_ids = array('I', [self._pending_file_ids[i] for i in order])
+            self.positions = array('I', [self._pending_positions[i] for i in order])
+        
+        self._pending_hashes = array('Q')
+        self._pending_file_ids = array('I')
+        self._pending_positions = array('I')
+    
+    def snapshot(self) -> 'PostingsIndex':
+        """
+        Freeze and return a read-only copy sharing the sorted arrays.
+        
+        freeze() always builds new arrays rather than mutating the sorted
+        ones, so the copy stays valid while more entries are merged here.
+        """
+        self.freeze()
+        copy = PostingsIndex()
+        copy.keys = self.keys
+        copy.offsets = self.offsets
+        copy.file_ids = self.file_ids
+        copy.positions = self.positions
+        return copy
+    
+    def memory_usage(self) -> int:
+        """Get the bytes held by the sorted and pending arrays."""
+        arrays = (self.keys, self.offsets, self.file_ids, self.positions,
+                  self._pending_hashes, self._pending_file_ids, self._pending_positions)
+        return sum(len(values) * values.itemsize for values in arrays)
+    
+    def _expanded_keys(self) -> array:
+        """Repeat each sorted key once per posting."""
+        if HAS_NUMPY:
+            counts = np.diff(np.frombuffer(self.offsets, dtype=np.uint32).astype(np.int64))
+            return array('Q', np.repeat(np.frombuffer(self.keys, dtype=np.uint64), counts).tobytes())
+        
+        expanded = array('Q')
+        for i, key in enumerate(self.keys):
+            expanded.extend(array('Q', [key]) * (self.offsets[i + 1] - self.offsets[i]))
+        return expanded
+    
+    def lookup(self, key: int) -> Optional[Tuple[array, array]]:
+        """Get the (file ids, positions) postings for a hash, if any."""
+        index = bisect_left(self.keys, key)
+        if index == len(self.keys) or self.keys[index] != key:
+            return None
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.file_ids[start:end], self.positions[start:end]
+    
+    def lookup_many(self, keys: Iterable[int]) -> Dict[int, Tuple[array, array]]:
+        """
+        Look up several hashes at once.
+        
+        Args:
+            keys: Hashes to look up
+        
+        Returns:
+            Dictionary of hash -> (file ids, positions) for the hashes found
+        """
+        keys = list(keys)
+        if not keys or not len(self.keys):
+            return {}
+        
+        if not HAS_NUMPY:
+            found = {}
+            for key in keys:
+                entry = self.lookup(key)
+                if entry is not None:
+                    found[key] = entry
+            return found
+        
+        table = np.frombuffer(self.keys, dtype=np.uint64)
+        query = np.array(keys, dtype=np.uint64)
+        indexes = np.searchsorted(table, query)
+        
+        found = {}
+        for key, index in zip(keys, indexes.tolist()):
+            if index < len(self.keys) and self.keys[index] == key:
+                start, end = self.offsets[index], self.offsets[index + 1]
+                found[key] = (self.file_ids[start:end], self.positions[start:end])
+        return found
+    
+    def __getstate__(self):
+        self.freeze()
+        return {
+            'keys': self.keys,
+            'offsets': self.offsets,
+            'file_ids': self.file_ids,
+            'positions': self.positions
+        }
+    
+    def __setstate__(self, state):
+        self.__init__()
+        self.keys = state['keys']
+        self.offsets = state['offsets']
+        self.file_ids = state['file_ids']
+        self.positions = state['positions']
@@ -0,0 +1,345 @@
+"""
+SQLite catalog of linked projects.
+Projects, their files and their index state live in an embedded database
+instead of one JSON document, so linking, validating or indexing a project
+writes only that project's rows in one transaction, and startup reads the
+project list without loading every project's file list.
+"""
+
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .tokenizer import family_for_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    linked_at REAL NOT NULL,
+    summaries TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS files (
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    content_hash TEXT,
+    language TEXT,
+    PRIMARY KEY (project_id, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS index_state (
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (project_id, name)
+) WITHOUT ROWID;
+"""
+
+# Keys of a project's dictionary stored as columns of the projects table
+PROJECT_COLUMNS = ('name', 'path', 'linked_at', 'summaries')
+
+
+class ProjectRecord(MutableMapping):
+    """
+    One linked project, used like the project dictionaries of projects.json.
+    
+    'files' is read from the catalog on first access. Assigning a key
+    writes it through to the catalog: 'files' as the difference to the
+    stored list, other keys (e.g. 'indexed') as index state. Lists and
+    dictionaries are read as copies, since editing them in place would not
+    reach the catalog; assign the edited value back to store it.
+    """
+    
+    def __init__(self, catalog: 'ProjectCatalog', project_id: int, fields: Dict[str, Any]):
+        """
+        Initialize a record.
+        
+        Args:
+            catalog: Catalog holding the project
+            project_id: Row id of the project
+            fields: Values of the projects table's columns
+        """
+        self.catalog = catalog
+        self.project_id = project_id
+        self._fields = fields
+        self._files = None          # Loaded on first access
+        self._state = None          # Loaded on first access
+    
+    def _load_state(self) -> Dict[str, Any]:
+        if self._state is None:
+            self._state = self.catalog.read_state(self.project_id)
+        return self._state
+    
+    def __getitem__(self, key: str) -> Any:
+        if key == 'files':
+            if self._files is None:
+                self._files = self.catalog.read_files(self.project_id)
+            return list(self._files)
+        if key in self._fields:
+            value = self._fields[key]
+        else:
+            value = self._load_state()[key]
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+    
+    def __setitem__(self, key: str, value: Any):
+        if key == 'files':
+            self.catalog.write_files(self.project_id, value)
+            self._files = list(value)
+        elif key in PROJECT_COLUMNS:
+            self.catalog.write_column(self.project_id, key, value)
+            self._fields[key] = copy.deepcopy(value)
+        else:
+            self.catalog.write_state(self.project_id, key, value)
+            self._load_state()[key] = copy.deepcopy(value)
+    
+    def __delitem__(self, key: str):
+        if key == 'files' or key in PROJECT_COLUMNS:
+            raise KeyError(f"Cannot delete '{key}' of a project")
+        if key not in self._load_state():
+            raise KeyError(key)
+        self.catalog.delete_state(self.project_id, key)
+        del self._state[key]
+    
+    def __iter__(self) -> Iterator[str]:
+        yield from self._fields
+        yield 'files'
+        yield from self._load_state()
+    
+    def __len__(self) -> int:
+        return len(self._fields) + 1 + len(self._load_state())
+
+
+class ProjectCatalog(MutableMapping):
+    """
+    Mapping of project name -> ProjectRecord over an SQLite database.
+    
+    Every write is one transaction touching only the project's own rows;
+    reads of one project use the primary keys, which lead with the
+    project id. The connection is shared between threads under a lock.
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Open (or create) a catalog.
+        
+        Args:
+            db_path: Path of the database file
+        """
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+        
+        # Project rows are few and small; file lists are loaded per project
+        self._records = {}
+        for project_id, name, path, linked_at, summaries in self._connection.execute(
+                "SELECT id, name, path, linked_at, summaries FROM projects ORDER BY id"):
+            self._records[name] = ProjectRecord(self, project_id, {
+                'name': name, 'path': path, 'linked_at': linked_at, 'summaries': json.loads(summaries)
+            })
+    
+    def __getitem__(self, project_name: str) -> ProjectRecord:
+        return self._records[project_name]
+    
+    def __setitem__(self, project_name: str, project_data: Dict[str, Any]):
+        """
+        Store a project and its files, replacing any project of the same name.
+        
+        A replaced project keeps its row id, and only the files and index
+        state that differ are written, so the rows of unchanged files (and
+        their recorded details) survive and existing records stay valid.
+        """
+        files = list(project_data.get("files", []))
+        path = project_data.get("path", "")
+        linked_at = project_data.get("linked_at", time.time())
+        summaries = project_data.get("summaries", {})
+        state = {key: value for key, value in project_data.items()
+                 if key not in PROJECT_COLUMNS and key != 'files'}
+        
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO projects (name, path, linked_at, summaries) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET path = excluded.path, linked_at = excluded.linked_at, "
+                "summaries = excluded.summaries",
+                (project_name, path, linked_at, json.dumps(summaries))
+            )
+            project_id, = self._connection.execute(
+                "SELECT id FROM projects WHERE name = ?", (project_name,)
+            ).fetchone()
+            self._replace_files(project_id, files)
+            self._replace_state(project_id, state)
+        
+        # Cached apart from the caller's objects, which it may go on editing
+        fields = {'name': project_name, 'path': path, 'linked_at': linked_at,
+                  'summaries': copy.deepcopy(summaries)}
+        record = self._records.get(project_name)
+        if record is None:
+            record = ProjectRecord(self, project_id, fields)
+            self._records[project_name] = record
+        else:
+            record._fields = fields
+        record._files = files
+        record._state = copy.deepcopy(state)
+    
+    def __delitem__(self, project_name: str):
+        record = self._records.pop(project_name)
+        with self._lock, self._connection:
+            # Files and index state go with the project (ON DELETE CASCADE)
+            self._connection.execute("DELETE FROM projects WHERE id = ?", (record.project_id,))
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._records))
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def read_files(self, project_id: int) -> List[str]:
+        """Get a project's file paths, sorted."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path FROM files WHERE project_id = ? ORDER BY path", (project_id,)
+            ).fetchall()
+        return [path for path, in rows]
+    
+    def write_files(self, project_id: int, file_paths: Iterable[str]):
+        """Replace a project's file list, inserting and deleting only the difference."""
+        with self._lock, self._connection:
+            self._replace_files(project_id, file_paths)
+    
+    def _replace_files(self, project_id: int, file_paths: Iterable[str]):
+        """Replace a project's file list by its difference (within the caller's transaction)."""
+        new_paths = set(file_paths)
+        old_paths = {path for path, in self._connection.execute(
+            "SELECT path FROM files WHERE project_id = ?", (project_id,))}
+        self._connection.executemany(
+            "DELETE FROM files WHERE project_id = ? AND path = ?",
+            [(project_id, path) for path in old_paths - new_paths]
+        )
+        self._insert_files(project_id, new_paths - old_paths)
+    
+    def _insert_files(self, project_id: int, file_paths: Iterable[str]):
+        """Insert file rows (within the caller's transaction)."""
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO files (project_id, path, language) VALUES (?, ?, ?)",
+            [(project_id, path, family_for_path(path)) for path in file_paths]
+        )
+    
+    def write_column(self, project_id: int, column: str, value: Any):
+        """Update one column of a project's row."""
+        if column not in PROJECT_COLUMNS:
+            raise KeyError(column)
+        if column == 'summaries':
+            value = json.dumps(value)
+        with self._lock, self._connection:
+            self._connection.execute(f"UPDATE projects SET {column} = ? WHERE id = ?", (value, project_id))
+    
+    def read_state(self, project_id: int) -> Dict[str, Any]:
+        """Get a project's index state."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT name, value FROM index_state WHERE project_id = ?", (project_id,)
+            ).fetchall()
+        return {name: json.loads(value) for name, value in rows}
+    
+    def write_state(self, project_id: int, name: str, value: Any):
+        """Set one index state value of a project (JSON-serializable)."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO index_state (project_id, name, value, updated_at) VALUES (?, ?, ?, ?)",
+                (project_id, name, json.dumps(value), time.time())
+            )
+    
+    def _replace_state(self, project_id: int, state: Dict[str, Any]):
+        """Replace a project's index state, writing only changed values (within the caller's transaction)."""
+        old_state = {name: value for name, value in self._connection.execute(
+            "SELECT name, value FROM index_state WHERE project_id = ?", (project_id,))}
+        new_state = {name: json.dumps(value) for name, value in state.items()}
+        self._connection.executemany(
+            "DELETE FROM index_state WHERE project_id = ? AND name = ?",
+            [(project_id, name) for name in old_state.keys() - new_state.keys()]
+        )
+        now = time.time()
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO index_state (project_id, name, value, updated_at) VALUES (?, ?, ?, ?)",
+            [(project_id, name, value, now) for name, value in new_state.items() if old_state.get(name) != value]
+        )
+    
+    def delete_state(self, project_id: int, name: str):
+        """Remove one index state value of a project."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM index_state WHERE project_id = ? AND name = ?",
+                                     (project_id, name))
+    
+    def file_count(self, project_name: str) -> int:
+        """Get the number of files of a project without loading them."""
+        with self._lock:
+            count, = self._connection.execute(
+                "SELECT COUNT(*) FROM files WHERE project_id = ?", (self._records[project_name].project_id,)
+            ).fetchone()
+        return count
+    
+    def file_details(self, project_name: str) -> Dict[str, Tuple[Optional[int], Optional[float], Optional[str], str]]:
+        """
+        Get the recorded details of a project's files.
+        
+        Args:
+            project_name: Name of the project
+        
+        Returns:
+            Dictionary of file_path -> (size, mtime, content hash, language);
+            size, mtime and hash are None until the project is indexed
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path, size, mtime, content_hash, language FROM files WHERE project_id = ?",
+                (self._records[project_name].project_id,)
+            ).fetchall()
+        return {path: details for path, *details in rows}
+    
+    def update_file_details(self, project_name: str,
+                            details: Iterable[Tuple[str, Optional[int], Optional[float], Optional[str]]]):
+        """
+        Record size, mtime and content hash of indexed files.
+        
+        Args:
+            project_name: Name of the project
+            details: (file_path, size, mtime, content hash) tuples
+        """
+        project_id = self._records[project_name].project_id
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE files SET size = ?, mtime = ?, content_hash = ? WHERE project_id = ? AND path = ?",
+                [(size, mtime, content_hash, project_id, path) for path, size, mtime, content_hash in details]
+            )
+    
+    def import_json(self, json_path: str) -> int:
+        """
+        Import the projects of a projects.json file.
+        
+        Args:
+            json_path: Path of the JSON document
+        
+        Returns:
+            Number of projects imported
+        """
+        with open(json_path, 'r') as f:
+            projects = json.load(f)
+        for project_name, project_data in projects.items():
+            self[project_name] = project_data
+        return len(projects)
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
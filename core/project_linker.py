@@ -1,12 +1,30 @@
 import os
-import json
-import hashlib
 import threading
 import time
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import re
+import queue
+import sqlite3
+from array import array
+
+from .content_store import project_content_store, read_text
+from .deadline import Deadline, MatchResults
+from .git_index import GitIndex, IndexEntry, read_git_index
+from .git_objects import find_git_dir
+from .ignore_rules import LUMEN_IGNORE_FILE, IgnoreMatcher, matcher_for_root
+from .index_workers import content_hash, map_shards, normalize_whitespace, text_shard_worker
+from .match_memo import match_memo, next_generation
+from .project_catalog import ProjectCatalog
+from .recent_files import recent_files
+from .tokenizer import family_for_path, query_streams
+from .winnowing import WinnowingIndex
+
+# Directory listings changed this recently are not reused: a change in the
+# same timestamp tick would leave the modification time as it was
+LISTING_RACE_NS = 2 * 1_000_000_000
+
 
 class FileAnalyzer:
     """
@@ -47,18 +65,27 @@ class FileAnalyzer:
         '.cargo', '.gem', '.npm'
     }
     
-    def __init__(self, max_workers: int = 4):
+    def __init__(self, max_workers: int = 4, discovery_workers: int = 16, respect_ignore_files: bool = True):
         """Initialize the file analyzer with thread pool."""
         self.max_workers = max_workers
+        self.discovery_workers = discovery_workers  # Directory scans in flight (I/O bound)
+        self.respect_ignore_files = respect_ignore_files  # .gitignore, .git/info/exclude, .lumenignore
+        self.use_git_index = True       # Take tracked files from .git/index instead of the walk
+        self._git_indexes = {}          # git directory -> GitIndex, reread when the index changes
+        self._tracked = {}              # project root -> (GitIndex, tracked files under the root)
+        self._tracked_user = {}         # project root -> (tracked files, filter state, user files)
+        self._tracked_stats = {}        # project root -> (tracked files, lstat of those present) of the last walk
+        self._listings = {}             # directory -> (mtime_ns, entries) of the last listing
         self.max_file_size = 10 * 1024 * 1024  # 10MB max file size
-        
-    def is_user_file(self, file_path: str) -> bool:
+    
+    def is_user_file(self, file_path: str, entry: os.DirEntry = None) -> bool:
         """
         Determine if a file is user-built (not a library/dependency).
         
         Args:
             file_path: Path to the file
-            
+            entry: Directory entry of the file, if it was listed
+        
         Returns:
             bool: True if it's a user-built file
         """
@@ -66,8 +93,9 @@ class FileAnalyzer:
             path = Path(file_path)
             
             # Check file size first (fastest check)
-            if os.path.getsize(file_path) > self.max_file_size:
-                print(f"Skipping large file: {os.path.basename(file_path)} ({os.path.getsize(file_path):,} bytes)")
+            size = entry.stat().st_size if entry is not None else os.path.getsize(file_path)
+            if size > self.max_file_size:
+                print(f"Skipping large file: {os.path.basename(file_path)} ({size:,} bytes)")
                 return False
             
             # Check if any parent directory indicates a library
@@ -76,17 +104,17 @@ class FileAnalyzer:
                     return False
                 if part.startswith('.') and part in self.IGNORED_DIRECTORIES:
                     return False
-                    
+            
             # Check file extension
             if path.suffix.lower() in self.IGNORED_EXTENSIONS:
                 return False
-                
+            
             # Check directory name
             if path.parent.name.lower() in self.IGNORED_DIRECTORIES:
                 return False
-                
-            return True
             
+            return True
+        
         except (OSError, IOError):
             # Skip files that can't be accessed
             return False
@@ -97,28 +125,321 @@ class FileAnalyzer:
         
         Args:
             project_path: Root path of the project
-            
+        
         Returns:
             List of file paths for user-built files
         """
         user_files = []
-        project_path = Path(project_path)
         
         try:
-            for root, dirs, files in os.walk(project_path):
-                # Skip ignored directories
-                dirs[:] = [d for d in dirs if d not in self.IGNORED_DIRECTORIES]
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if self.is_user_file(file_path):
-                        user_files.append(file_path)
-                        
+            for file_path in self.iter_user_files(project_path):
+                user_files.append(file_path)
+                if len(user_files) % 10000 == 0:
+                    print(f"Discovered {len(user_files):,} files so far...")
+        
         except Exception as e:
             print(f"Error discovering files: {e}")
-            
+        
         return sorted(user_files)
     
+    def iter_user_files(self, project_path: str):
+        """
+        Stream the user-built files of a project directory as they are found.
+        
+        Directories are listed with os.scandir on a thread pool, so many
+        listings are in flight at once (which is what network mounts and
+        large checkouts need), and file types come from the directory
+        entries instead of one stat per file. Ignored and library
+        directories are never entered, nor are directories excluded by the
+        project's .gitignore files, .git/info/exclude or .lumenignore files.
+        Files are yielded in no particular order, with the same filtering as
+        is_user_file() plus those ignore files.
+        
+        In a git repository the tracked files come straight from the index
+        (tracked files are never ignored, as in git, except by .lumenignore)
+        and the walk only looks for untracked ones. Tracked files deleted from
+        the work tree are left out, which takes one lstat per tracked file.
+        Directories whose modification time is unchanged since the last walk
+        are not listed again, so re-linking or refreshing costs one stat per
+        directory.
+        
+        Args:
+            project_path: Root path of the project
+        
+        Yields:
+            Paths of user-built files
+        """
+        root = str(Path(project_path))
+        
+        # The root's own components filter every file, as in is_user_file()
+        for part in Path(root).parts:
+            if part.lower() in self.LIBRARY_INDICATORS or (part.startswith('.') and part in self.IGNORED_DIRECTORIES):
+                return
+        
+        tracked = self.tracked_files(root) if self.use_git_index else None
+        if tracked:
+            stats = self._stat_tracked(tracked)
+            self._tracked_stats[root] = (tracked, stats)
+            yield from (file_path for file_path in self._tracked_user_files(root, tracked) if file_path in stats)
+        else:
+            tracked = {}
+        
+        results = queue.Queue()
+        stopped = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.discovery_workers, thread_name_prefix="discover")
+        
+        def scan(directory: str, matcher: IgnoreMatcher):
+            files, subdirectories = [], []
+            if not stopped.is_set():
+                parent_ignored = os.path.basename(directory).lower() in self.IGNORED_DIRECTORIES
+                entries = self._list_directory(directory)
+                
+                # The directory's own ignore files apply to its entries
+                if self.respect_ignore_files:
+                    matcher = matcher.child(directory, {entry.name for entry in entries})
+                
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            # Symlinked directories are not followed, as with os.walk
+                            if (not entry.is_symlink() and entry.name not in self.IGNORED_DIRECTORIES and
+                                    entry.name.lower() not in self.LIBRARY_INDICATORS and
+                                    not matcher.is_ignored(entry.path, True)):
+                                subdirectories.append(entry.path)
+                        elif (entry.path not in tracked and not parent_ignored and
+                              not matcher.is_ignored(entry.path, False) and self._is_user_entry(entry)):
+                            files.append(entry.path)
+                    except OSError:
+                        continue  # Skip entries that can't be accessed
+            
+            # Report this listing before scanning its subdirectories, so their
+            # results always reach the queue after the count that announces them
+            results.put((files, len(subdirectories)))
+            for subdirectory in subdirectories:
+                try:
+                    executor.submit(scan, subdirectory, matcher)
+                except RuntimeError:
+                    break  # Consumer stopped and the pool shut down
+        
+        try:
+            executor.submit(scan, root, matcher_for_root(root) if self.respect_ignore_files else IgnoreMatcher())
+            outstanding = 1
+            while outstanding:
+                files, subdirectory_count = results.get()
+                outstanding += subdirectory_count - 1
+                yield from files
+        finally:
+            stopped.set()
+            executor.shutdown(wait=False)
+    
+    def _list_directory(self, directory: str) -> List[os.DirEntry]:
+        """
+        List a directory, reusing the last listing while it is unchanged.
+        
+        Adding, removing or renaming an entry updates the directory's
+        modification time. Entries keep their cached stat data, so sizes of
+        files modified in place may be stale until the directory changes.
+        
+        Args:
+            directory: Directory path
+        
+        Returns:
+            Directory entries (empty for unreadable directories, which are
+            skipped as with os.walk)
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            cached = self._listings.get(directory)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            
+            with os.scandir(directory) as listing:
+                entries = list(listing)
+        except OSError:
+            return []
+        
+        if time.time_ns() - mtime > LISTING_RACE_NS:
+            self._listings[directory] = (mtime, entries)
+        return entries
+    
+    def tracked_files(self, project_path: str) -> Optional[Dict[str, IndexEntry]]:
+        """
+        Get the files of a project tracked in its repository's index.
+        
+        Args:
+            project_path: Root path of the project
+        
+        Returns:
+            Dictionary of file path -> index entry of the tracked regular files
+            under the project root, or None if the project is not in a git
+            repository with a readable index
+        """
+        root = str(Path(project_path))
+        found = self._git_index(root)
+        if found is None:
+            return None
+        index, prefix = found
+        cached = self._tracked.get(root)
+        if cached is not None and cached[0] is index:
+            return cached[1]
+        
+        # Index paths are relative to the working tree; keep those under the root
+        tracked = {}
+        for path, entry in index.entries.items():
+            if path.startswith(prefix):
+                tracked[root + os.sep + path[len(prefix):].replace('/', os.sep)] = entry
+        self._tracked[root] = (index, tracked)
+        return tracked
+    
+    def _git_index(self, root: str) -> Optional[Tuple[GitIndex, str]]:
+        """Get the index of a project's repository (read again only when it changed) and the root's path in it."""
+        try:
+            found = find_git_dir(root)
+            if found is None:
+                return None
+            work_tree, git_dir = found
+            parts = Path(root).resolve().relative_to(work_tree).parts
+            stat = os.stat(git_dir / 'index')
+        except (OSError, ValueError):
+            return None
+        
+        index = self._git_indexes.get(git_dir)
+        if index is None or index.signature != (stat.st_mtime_ns, stat.st_size):
+            index = read_git_index(git_dir)
+            if index is None:
+                return None
+            self._git_indexes[git_dir] = index
+        return index, '/'.join(parts) + '/' if parts else ''
+    
+    def _tracked_user_files(self, root: str, tracked: Dict[str, IndexEntry]) -> List[str]:
+        """
+        Filter tracked files as the walk filters directory entries.
+        
+        Sizes come from the index, so no file is opened or stat'ed. The result
+        is reused until the index or a .lumenignore file changes.
+        
+        Args:
+            root: Root path of the project
+            tracked: Tracked files from tracked_files()
+        
+        Returns:
+            Paths of tracked user-built files
+        """
+        lumen_files = []
+        if self.respect_ignore_files:
+            lumen_files = [file_path for file_path in tracked if file_path.endswith(os.sep + LUMEN_IGNORE_FILE)]
+            root_lumen_file = os.path.join(root, LUMEN_IGNORE_FILE)
+            if root_lumen_file not in tracked and os.path.exists(root_lumen_file):
+                lumen_files.append(root_lumen_file)
+        
+        def signature(file_path: str) -> Optional[Tuple[int, int]]:
+            try:
+                stat = os.stat(file_path)
+                return stat.st_mtime_ns, stat.st_size
+            except OSError:
+                return None
+        
+        state = (self.max_file_size, [(file_path, signature(file_path)) for file_path in lumen_files])
+        cached = self._tracked_user.get(root)
+        if cached is not None and cached[0] is tracked and cached[1] == state:
+            return cached[2]
+        
+        lumen_directories = {os.path.dirname(file_path) for file_path in lumen_files}
+        directories = {}  # directory -> (matcher for its entries, whether it is excluded)
+        
+        def directory_state(directory: str) -> Tuple[IgnoreMatcher, bool]:
+            state = directories.get(directory)
+            if state is None:
+                if directory == root:
+                    matcher, excluded = IgnoreMatcher(), False
+                else:
+                    matcher, excluded = directory_state(os.path.dirname(directory))
+                    name = os.path.basename(directory)
+                    excluded = (excluded or name in self.IGNORED_DIRECTORIES or
+                                name.lower() in self.LIBRARY_INDICATORS or matcher.is_ignored(directory, True))
+                if directory in lumen_directories and not excluded:
+                    matcher = matcher.child(directory, (LUMEN_IGNORE_FILE,))
+                state = directories[directory] = (matcher, excluded)
+            return state
+        
+        root_ignored = os.path.basename(root).lower() in self.IGNORED_DIRECTORIES
+        user_files = []
+        for file_path, entry in tracked.items():
+            directory = os.path.dirname(file_path)
+            matcher, excluded = directory_state(directory)
+            if excluded or (directory == root and root_ignored) or matcher.is_ignored(file_path, False):
+                continue
+            if os.path.splitext(file_path)[1].lower() in self.IGNORED_EXTENSIONS:
+                continue
+            if entry.size > self.max_file_size:
+                print(f"Skipping large file: {os.path.basename(file_path)} ({entry.size:,} bytes)")
+                continue
+            user_files.append(file_path)
+        
+        self._tracked_user[root] = (tracked, state, user_files)
+        return user_files
+    
+    @staticmethod
+    def _stat_tracked(tracked: Dict[str, IndexEntry]) -> Dict[str, os.stat_result]:
+        """lstat each tracked file (as git does); files deleted from the work tree are left out."""
+        stats = {}
+        for file_path in tracked:
+            try:
+                stats[file_path] = os.lstat(file_path)
+            except OSError:
+                pass
+        return stats
+    
+    def modified_files(self, project_path: str, deleted: Optional[List[str]] = None) -> Optional[List[str]]:
+        """
+        Find the tracked files of a project that differ from the index.
+        
+        Compares each file's size and modification time with the stat data
+        in the index, as git status does, without reading the file. Right
+        after a walk of the project (see iter_user_files) the stats it took
+        are used instead of taking them again.
+        
+        Args:
+            project_path: Root path of the project
+            deleted: Optional list to add the tracked files missing from the
+                work tree to
+        
+        Returns:
+            Paths of modified tracked files (deleted ones are not included),
+            or None if the project is not in a git repository with a
+            readable index
+        """
+        root = str(Path(project_path))
+        found = self._git_index(root)
+        tracked = self.tracked_files(root)
+        if found is None or tracked is None:
+            return None
+        
+        cached = self._tracked_stats.pop(root, None)
+        stats = cached[1] if cached is not None and cached[0] is tracked else self._stat_tracked(tracked)
+        
+        index = found[0]
+        modified = []
+        for file_path, entry in tracked.items():
+            stat = stats.get(file_path)
+            if stat is None:
+                if deleted is not None:
+                    deleted.append(file_path)
+            elif index.is_modified(entry, stat):
+                modified.append(file_path)
+        return modified
+    
+    def _is_user_entry(self, entry: os.DirEntry) -> bool:
+        """Apply the per-file checks of is_user_file() to a directory entry."""
+        if os.path.splitext(entry.name)[1].lower() in self.IGNORED_EXTENSIONS:
+            return False
+        
+        size = entry.stat().st_size
+        if size > self.max_file_size:
+            print(f"Skipping large file: {entry.name} ({size:,} bytes)")
+            return False
+        return True
+    
     def get_file_size(self, file_path: str) -> int:
         """Get file size in bytes."""
         try:
@@ -132,7 +453,7 @@ class FileAnalyzer:
         
         Args:
             file_paths: List of file paths
-            
+        
         Returns:
             Dictionary with size categories as keys
         """
@@ -150,7 +471,7 @@ class FileAnalyzer:
                 categories['medium'].append(file_path)
             else:
                 categories['large'].append(file_path)
-                
+        
         return categories
 
 
@@ -162,34 +483,86 @@ class TextComparator:
     def __init__(self):
         """Initialize the text comparator."""
         self.file_hashes = {}
-        self.normalized_content = {}
-        
-    def normalize_text(self, text: str) -> str:
+        self.indexed_files = []  # Normalized text comes from the shared content store
+        self.winnowing_index = WinnowingIndex()
+        self.indexed_project = None
+        self.generation = next_generation()  # Taken anew whenever the indexed files change
+    
+    def clear(self):
+        """Drop all indexed content."""
+        self.file_hashes = {}
+        self.indexed_files = []
+        self.winnowing_index.clear()
+        self.indexed_project = None
+        self.generation = next_generation()
+    
+    def normalize_text(self, text: str, family: str = 'plain') -> str:
         """
-        Normalize text by removing whitespace and newlines for comparison.
+        Normalize text by removing whitespace, newlines and comments for comparison.
         
         Args:
             text: Raw text content
-            
+            family: Language family whose comments are removed
+        
         Returns:
             Normalized text
         """
-        # Remove all whitespace and newlines, convert to lowercase
-        normalized = re.sub(r'\s+', '', text.lower())
-        return normalized
+        # Remove all whitespace, newlines and comments, convert to lowercase
+        return normalize_whitespace(text, family)
     
-    def create_content_hash(self, content: str) -> str:
+    def create_content_hash(self, content: str, family: str = 'plain') -> str:
         """
         Create a hash of normalized content for fast lookup.
         
         Args:
             content: Text content
-            
+            family: Language family whose comments are ignored
+        
         Returns:
             Hash string
         """
-        normalized = self.normalize_text(content)
-        return hashlib.md5(normalized.encode()).hexdigest()
+        return content_hash(self.normalize_text(content, family))
+    
+    def query_forms(self, copied_text: str) -> List[str]:
+        """
+        Normalize copied text once per way the indexed files could read it.
+        
+        Args:
+            copied_text: Text that was copied
+        
+        Returns:
+            Distinct normalized forms, one per comment syntax that changes the text
+        """
+        forms = []
+        for stream in query_streams(copied_text, self.winnowing_index.families):
+            form = stream.compact()
+            if form and form not in forms:
+                forms.append(form)
+        return forms
+    
+    def normalized_content(self, file_path: str) -> str:
+        """
+        Get the normalized text of an indexed file.
+        
+        Derived lazily from the shared content store, so it is only kept in
+        memory once substring matching actually needs it.
+        
+        Args:
+            file_path: Path to the file
+        
+        Returns:
+            Normalized text ('' if the file cannot be read)
+        """
+        family = family_for_path(file_path)
+        normalized = project_content_store.derived(
+            file_path, 'whitespace', lambda text: self.normalize_text(text, family)
+        )
+        if normalized is None:
+            try:
+                normalized = self.normalize_text(read_text(file_path), family)
+            except OSError:
+                normalized = ''
+        return normalized
     
     def index_file_content(self, file_path: str, content: str):
         """
@@ -199,45 +572,104 @@ class TextComparator:
             file_path: Path to the file
             content: File content
         """
-        normalized = self.normalize_text(content)
-        content_hash = self.create_content_hash(content)
+        content_hash = self.create_content_hash(content, family_for_path(file_path))
+        
+        self.file_hashes[content_hash] = file_path
+        self.indexed_files.append(file_path)
+        self.winnowing_index.add_file(file_path, content)
+        self.generation = next_generation()
+    
+    def add_indexed_entry(self, file_path: str, content_hash: str,
+                          fingerprints: array, fingerprint_lines: array):
+        """
+        Add a file prepared by index_text_shard (e.g. in a worker process).
         
+        Args:
+            file_path: Path to the file
+            content_hash: Hash of the normalized content
+            fingerprints: Winnowed fingerprints of the content
+            fingerprint_lines: Line number of each fingerprint
+        """
         self.file_hashes[content_hash] = file_path
-        self.normalized_content[file_path] = normalized
+        self.indexed_files.append(file_path)
+        self.winnowing_index.add_fingerprints(file_path, fingerprints, fingerprint_lines)
+        self.generation = next_generation()
     
-    def find_matching_files(self, copied_text: str, threshold: float = 0.8) -> List[Tuple[str, float]]:
+    def find_matching_files(self, copied_text: str, threshold: float = 0.8,
+                            deadline_ms: Optional[float] = None) -> MatchResults:
         """
         Find files that match the copied text.
         
+        Files are visited recently opened first, then those sharing winnowing
+        fingerprints with the text, then the rest; with a deadline the
+        matches found when time runs out are returned, flagged as partial.
+        
         Args:
             copied_text: Text that was copied
             threshold: Minimum similarity threshold (0.0 to 1.0)
-            
+            deadline_ms: Time budget in milliseconds (None: no limit)
+        
         Returns:
-            List of (file_path, similarity_score) tuples
+            MatchResults list of (file_path, similarity_score) tuples
         """
+        deadline = Deadline(deadline_ms)
         if not copied_text.strip():
-            return []
-            
-        normalized_query = self.normalize_text(copied_text)
+            return MatchResults()
+        
+        query_forms = self.query_forms(copied_text)
+        if not query_forms:
+            return MatchResults()
         
         # First try exact hash match
-        query_hash = self.create_content_hash(copied_text)
-        if query_hash in self.file_hashes:
-            return [(self.file_hashes[query_hash], 1.0)]
+        for normalized_query in query_forms:
+            query_hash = content_hash(normalized_query)
+            if query_hash in self.file_hashes:
+                return MatchResults([(self.file_hashes[query_hash], 1.0)])
+        
+        # Likeliest files first, so a search cut short has looked there
+        candidates = self.winnowing_index.candidate_files(copied_text)
+        candidate_set = set(candidates)
+        visit_order = recent_files.prioritize(
+            candidates + [file_path for file_path in self.indexed_files if file_path not in candidate_set]
+        )
         
         # Then try substring matching
         matches = []
-        for file_path, normalized_content in self.normalized_content.items():
-            if normalized_query in normalized_content:
+        for file_path in visit_order:
+            if deadline.expired():
+                break
+            
+            normalized_content = self.normalized_content(file_path)
+            found = [len(query) for query in query_forms if query in normalized_content]
+            if found:
                 # Calculate similarity score based on length ratio
-                similarity = len(normalized_query) / len(normalized_content)
+                similarity = max(found) / len(normalized_content)
                 if similarity >= threshold:
                     matches.append((file_path, similarity))
         
         # Sort by similarity score (descending)
         matches.sort(key=lambda x: x[1], reverse=True)
-        return matches[:5]  # Return top 5 matches
+        return MatchResults(matches[:5], partial=deadline.reached)  # Return top 5 matches
+    
+    def find_similar_files(self, copied_text: str,
+                           threshold: float = 0.3) -> List[Tuple[str, float, List[Tuple[int, int]]]]:
+        """
+        Find files containing edited copies of the copied text.
+        
+        Uses winnowed token fingerprints, so renamed variables, reformatting
+        and partial selections still match.
+        
+        Args:
+            copied_text: Text that was copied
+            threshold: Minimum share of the text's fingerprints found in a file
+        
+        Returns:
+            List of (file_path, similarity_score, matched line ranges) tuples
+        """
+        if not copied_text.strip():
+            return []
+        
+        return self.winnowing_index.search(copied_text, threshold)
 
 
 class ProjectLinker:
@@ -262,32 +694,44 @@ class ProjectLinker:
         self.text_comparator = TextComparator()
         self.linked_projects = {}
         self.current_project = None  # Don't auto-load any project
+        self.validated_projects = set()  # Projects whose files were validated this session
         
         self._load_linked_projects()
         self._validate_and_clean_projects()
     
     def _load_linked_projects(self):
-        """Load existing linked projects from storage."""
+        """
+        Open the catalog of linked projects.
+        
+        Projects are stored in an SQLite database (see ProjectCatalog) and
+        written as they change. The first time, the projects of an existing
+        projects.json are imported; the JSON file itself is left as it is.
+        """
+        db_path = self.storage_path / "projects.db"
+        is_new = not db_path.exists()
+        try:
+            self.linked_projects = ProjectCatalog(str(db_path))
+        except sqlite3.Error as e:
+            print(f"Error opening project catalog: {e}")
+            self.linked_projects = ProjectCatalog(":memory:")
+            return
+        
         projects_file = self.storage_path / "projects.json"
-        if projects_file.exists():
+        if is_new and projects_file.exists():
             try:
-                with open(projects_file, 'r') as f:
-                    self.linked_projects = json.load(f)
+                imported = self.linked_projects.import_json(str(projects_file))
+                print(f"Imported {imported} linked projects from {projects_file}")
             except Exception as e:
-                print(f"Error loading linked projects: {e}")
-                self.linked_projects = {}
-    
-    def _save_linked_projects(self):
-        """Save linked projects to storage."""
-        projects_file = self.storage_path / "projects.json"
-        try:
-            with open(projects_file, 'w') as f:
-                json.dump(self.linked_projects, f, indent=2)
-        except Exception as e:
-            print(f"Error saving linked projects: {e}")
+                print(f"Error importing linked projects: {e}")
     
     def _validate_and_clean_projects(self):
-        """Validate and clean corrupted or problematic projects."""
+        """
+        Validate and clean corrupted or problematic projects.
+        
+        Only checks each project as a whole, so startup does not depend on
+        project sizes; files are validated when a project is first selected
+        (see _validate_project_files).
+        """
         projects_to_remove = []
         
         for project_name, project_data in self.linked_projects.items():
@@ -300,29 +744,11 @@ class ProjectLinker:
                     continue
                 
                 # Check if files list is reasonable (not too many huge files)
-                files = project_data.get("files", [])
-                if len(files) > 10000:  # Suspiciously large number of files
-                    print(f"Removing project '{project_name}' - too many files ({len(files)})")
+                file_count = self.linked_projects.file_count(project_name)
+                if file_count > 10000:  # Suspiciously large number of files
+                    print(f"Removing project '{project_name}' - too many files ({file_count})")
                     projects_to_remove.append(project_name)
-                    continue
-                
-                # Check for corrupted file data
-                valid_files = []
-                for file_path in files:
-                    try:
-                        if os.path.exists(file_path) and self.file_analyzer.is_user_file(file_path):
-                            valid_files.append(file_path)
-                    except:
-                        continue  # Skip problematic files
-                
-                # Update with cleaned file list
-                project_data["files"] = valid_files
-                
-                # Reset indexed status to force re-indexing with new file filter
-                project_data["indexed"] = False
-                
-                print(f"Cleaned project '{project_name}': {len(files)} -> {len(valid_files)} files")
-                
+            
             except Exception as e:
                 print(f"Error validating project '{project_name}': {e}")
                 projects_to_remove.append(project_name)
@@ -332,9 +758,62 @@ class ProjectLinker:
             del self.linked_projects[project_name]
         
         if projects_to_remove:
-            self._save_linked_projects()
             print(f"Removed {len(projects_to_remove)} problematic projects")
     
+    def _validate_project_files(self, project_name: str):
+        """
+        Drop files of a project that were deleted or no longer pass the file filter.
+        
+        Files are checked a directory at a time with one listing each.
+        Directories whose modification time is the one recorded at the last
+        validation are skipped, since creating, deleting or renaming a file
+        changes it.
+        
+        Args:
+            project_name: Name of the project to validate
+        """
+        try:
+            project_data = self.linked_projects[project_name]
+            files = project_data.get("files", [])
+            validated = project_data.get("validated_directories", {})
+            
+            by_directory = {}
+            for file_path in files:
+                by_directory.setdefault(os.path.dirname(file_path), []).append(file_path)
+            
+            removed = set()
+            directory_mtimes = {}
+            now = time.time_ns()
+            for directory, directory_files in by_directory.items():
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                    if validated.get(directory) != mtime:
+                        with os.scandir(directory) as listing:
+                            entries = {entry.name: entry for entry in listing}
+                        for file_path in directory_files:
+                            entry = entries.get(os.path.basename(file_path))
+                            if entry is None or entry.is_dir() or not self.file_analyzer.is_user_file(file_path, entry):
+                                removed.add(file_path)
+                except OSError:
+                    removed.update(directory_files)  # Directory deleted along with its files
+                    continue
+                
+                # Changed too recently to tell later changes apart (see LISTING_RACE_NS)
+                if now - mtime > LISTING_RACE_NS:
+                    directory_mtimes[directory] = mtime
+            
+            if removed:
+                project_data["files"] = [file_path for file_path in files if file_path not in removed]
+                project_data["indexed"] = False
+                print(f"Cleaned project '{project_name}': {len(files)} -> {len(project_data['files'])} files")
+            
+            self.validated_projects.add(project_name)
+            if directory_mtimes != validated:
+                project_data["validated_directories"] = directory_mtimes
+        
+        except Exception as e:
+            print(f"Error validating files of project '{project_name}': {e}")
+    
     def link_project(self, project_name: str, project_path: str) -> bool:
         """
         Link a project directory to Lumen.
@@ -342,7 +821,7 @@ class ProjectLinker:
         Args:
             project_name: Name for the project
             project_path: Path to the project directory
-            
+        
         Returns:
             bool: True if successful
         """
@@ -371,25 +850,73 @@ class ProjectLinker:
             
             # Store project data
             self.linked_projects[project_name] = project_data
-            self._save_linked_projects()
+            self.validated_projects.add(project_name)
             
             # Auto-select this project as current
             self.current_project = project_name
             
             print(f"Successfully linked project '{project_name}' with {len(user_files)} files")
             return True
-            
+        
         except Exception as e:
             print(f"Error linking project: {e}")
             return False
     
+    def refresh_project(self, project_name: str) -> Optional[Dict[str, Optional[int]]]:
+        """
+        Re-discover the files of a linked project.
+        
+        Tracked files come from the git index and unchanged directories are
+        not listed again (see FileAnalyzer.iter_user_files), and modified
+        files are found from their stat data without reading them.
+        
+        Args:
+            project_name: Name of the project to refresh
+        
+        Returns:
+            Dictionary with the number of 'files' and of 'added', 'removed',
+            'modified' and 'deleted' files, or None if the project is not
+            linked. 'removed' counts every file no longer found (deleted or
+            now ignored); 'deleted' counts the tracked files of the project
+            missing from the work tree. 'modified' and 'deleted' are None
+            outside git repositories.
+        """
+        project_data = self.linked_projects.get(project_name)
+        if not project_data:
+            return None
+        
+        start_time = time.time()
+        old_files = set(project_data["files"])
+        files = self.file_analyzer.discover_user_files(project_data["path"])
+        deleted = []
+        modified = self.file_analyzer.modified_files(project_data["path"], deleted)
+        
+        new_files = set(files)
+        changes = {
+            'files': len(files),
+            'added': len(new_files - old_files),
+            'removed': len(old_files - new_files),
+            'modified': len(modified) if modified is not None else None,
+            'deleted': len(old_files.intersection(deleted)) if modified is not None else None
+        }
+        
+        project_data["files"] = files
+        if changes['added'] or changes['removed'] or modified or modified is None:
+            # Index the text comparator again on the next search
+            project_data["indexed"] = False
+            if self.text_comparator.indexed_project == project_name:
+                self.text_comparator.indexed_project = None
+        
+        print(f"Refreshed project '{project_name}' in {time.time() - start_time:.3f}s: {changes}")
+        return changes
+    
     def remove_project(self, project_name: str) -> bool:
         """
         Remove a linked project.
         
         Args:
             project_name: Name of the project to remove
-            
+        
         Returns:
             bool: True if successful
         """
@@ -399,7 +926,6 @@ class ProjectLinker:
             
             # Remove project data
             del self.linked_projects[project_name]
-            self._save_linked_projects()
             
             # Clear current project if it was removed
             if self.current_project == project_name:
@@ -407,7 +933,7 @@ class ProjectLinker:
             
             print(f"Successfully removed project '{project_name}'")
             return True
-            
+        
         except Exception as e:
             print(f"Error removing project: {e}")
             return False
@@ -422,7 +948,7 @@ class ProjectLinker:
         
         Args:
             project_name: Name of the project to select
-            
+        
         Returns:
             bool: True if successful
         """
@@ -432,11 +958,15 @@ class ProjectLinker:
         self.current_project = project_name
         print(f"Selected project '{project_name}' - indexing disabled for performance")
         
+        # Validate lazily, once per session, instead of at startup
+        if project_name not in self.validated_projects:
+            self._validate_project_files(project_name)
+        
         # DON'T auto-index - let it be lazy loaded only when needed
         # This prevents infinite loading on large projects
         # if not self.linked_projects[project_name].get("indexed", False):
         #     self._index_project_files(project_name)
-            
+        
         return True
     
     def _index_project_files(self, project_name: str):
@@ -451,37 +981,63 @@ class ProjectLinker:
             
             print(f"Indexing files for project '{project_name}'...")
             
-            for file_path in project_data["files"]:
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    self.text_comparator.index_file_content(file_path, content)
-                except Exception as e:
-                    print(f"Error indexing file {file_path}: {e}")
+            self.text_comparator.clear()
+            
+            # Bring the project's stored contents up to date (unchanged files aren't read again)
+            project_content_store.load(project_name, project_data["files"])
             
-            # Mark as indexed
+            # Workers hash and fingerprint shards of files
+            winnowing = self.text_comparator.winnowing_index
+            worker = text_shard_worker(winnowing.kgram, winnowing.window)
+            file_details = []
+            for _, entries in map_shards(worker, project_data["files"]):
+                for entry in entries:
+                    self.text_comparator.add_indexed_entry(*entry)
+                    file_path, file_hash = entry[:2]
+                    mtime, size = project_content_store.stat(file_path) or (None, None)
+                    file_details.append((file_path, size, mtime, file_hash))
+            
+            self.text_comparator.indexed_project = project_name
+            
+            # Mark as indexed, recording what each file was indexed from
+            self.linked_projects.update_file_details(project_name, file_details)
             project_data["indexed"] = True
-            self._save_linked_projects()
             
             print(f"Successfully indexed {len(project_data['files'])} files")
-            
+        
         except Exception as e:
             print(f"Error indexing project files: {e}")
     
-    def find_source_files(self, copied_text: str) -> List[Tuple[str, float]]:
+    def find_source_files(self, copied_text: str, mode: str = "exact",
+                          deadline_ms: Optional[float] = None) -> List[Tuple]:
         """
         Find source files that match copied text.
         
         Args:
             copied_text: Text that was copied
-            
+            mode: "exact" for hash/substring matching, "winnow" for
+                edit-tolerant fingerprint matching
+            deadline_ms: Time budget for "exact" matching (None: no limit)
+        
         Returns:
-            List of (file_path, similarity_score) tuples
+            List of (file_path, similarity_score) tuples, or for "winnow"
+            (file_path, similarity_score, matched line ranges) tuples
         """
         if not self.current_project:
             return []
         
-        return self.text_comparator.find_matching_files(copied_text)
+        # Index lazily the first time the current project is searched
+        if self.text_comparator.indexed_project != self.current_project:
+            self._index_project_files(self.current_project)
+        
+        def find():
+            if mode == "winnow":
+                return self.text_comparator.find_similar_files(copied_text)
+            return self.text_comparator.find_matching_files(copied_text, deadline_ms=deadline_ms)
+        
+        # Complete results for the same copy and index are reused (see MatchMemo)
+        return match_memo.memoized('source_files', copied_text, find, project_name=self.current_project,
+                                   generation=self.text_comparator.generation, args=(mode,))
     
     def get_project_summary(self, project_name: str = None) -> str:
         """
@@ -489,7 +1045,7 @@ class ProjectLinker:
         
         Args:
             project_name: Name of the project (uses current if None)
-            
+        
         Returns:
             Project summary string
         """
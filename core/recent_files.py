@@ -0,0 +1,75 @@
+"""
+Files the user recently opened, for prioritizing deadline-bounded matching.
+Files opened in the project manager or picked in the clipboard popup are
+remembered most-recent-first; matchers visit them before the rest so a
+search cut short by its deadline has still looked where a copy most likely
+came from.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+# Files remembered; older ones are forgotten
+MAX_RECENT_FILES = 50
+
+
+class RecentFiles:
+    """Bounded most-recently-opened list of file paths."""
+    
+    def __init__(self, max_files: int = MAX_RECENT_FILES):
+        """
+        Initialize an empty list.
+        
+        Args:
+            max_files: Number of files to remember
+        """
+        self.max_files = max_files
+        self._files = OrderedDict()  # file_path -> None, most recent last
+        self._lock = threading.Lock()
+    
+    def touch(self, file_path: str):
+        """Record that a file was opened."""
+        if not file_path:
+            return
+        
+        with self._lock:
+            self._files[file_path] = None
+            self._files.move_to_end(file_path)
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+    
+    def paths(self) -> List[str]:
+        """Get the remembered files, most recently opened first."""
+        with self._lock:
+            return list(reversed(self._files))
+    
+    def ranks(self) -> Dict[str, int]:
+        """Get how recently each remembered file was opened (higher is more recent)."""
+        with self._lock:
+            return {file_path: rank for rank, file_path in enumerate(self._files, 1)}
+    
+    def prioritize(self, file_paths: Iterable[str]) -> List[str]:
+        """
+        Order files so recently opened ones come first.
+        
+        Args:
+            file_paths: Files in their default order
+        
+        Returns:
+            Recently opened files among them (most recent first), then the
+            others in their original order
+        """
+        file_paths = list(file_paths)
+        recent = self.paths()
+        if not recent:
+            return file_paths
+        
+        available = set(file_paths)
+        first = [file_path for file_path in recent if file_path in available]
+        chosen = set(first)
+        return first + [file_path for file_path in file_paths if file_path not in chosen]
+
+
+# Create singleton instance
+recent_files = RecentFiles()
@@ -0,0 +1,93 @@
+"""
+64-bit fingerprints for the code detection indexes.
+Lines are hashed with C-level checksums and token windows with a
+Rabin-Karp polynomial rolling hash, so no per-window digest is computed.
+"""
+
+import zlib
+from typing import Dict, List, Sequence
+
+MASK64 = (1 << 64) - 1
+
+# Odd multiplier for the polynomial hash and a mixer for spreading token bits
+ROLLING_BASE = 0x100000001B3
+MIX_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# Salt so windows of different widths can share one table
+WIDTH_SALT = 0xC2B2AE3D27D4EB4F
+
+
+def hash_bytes64(data: bytes) -> int:
+    """
+    Hash a byte string to a 64-bit integer.
+    
+    Args:
+        data: Bytes to hash
+    
+    Returns:
+        Unsigned 64-bit fingerprint
+    """
+    combined = (zlib.crc32(data) << 32) | zlib.adler32(data)
+    return (combined * MIX_MULTIPLIER) & MASK64
+
+
+def hash_text64(text: str) -> int:
+    """Hash a string (e.g. a stripped line) to a 64-bit integer."""
+    return hash_bytes64(text.encode('utf-8', errors='ignore'))
+
+
+def hash_tokens(tokens: Sequence[str], cache: Dict[str, int] = None) -> List[int]:
+    """
+    Hash each token, reusing hashes of tokens already seen.
+    
+    Args:
+        tokens: Token strings
+        cache: Optional token -> hash dictionary shared across calls
+    
+    Returns:
+        List of 64-bit token hashes
+    """
+    if cache is None:
+        cache = {}
+    
+    hashes = []
+    for token in tokens:
+        token_hash = cache.get(token)
+        if token_hash is None:
+            token_hash = hash_text64(token)
+            cache[token] = token_hash
+        hashes.append(token_hash)
+    return hashes
+
+
+def rolling_window_hashes(values: Sequence[int], width: int) -> List[int]:
+    """
+    Hash every window of `width` consecutive values with a rolling hash.
+    
+    Each window hash is derived from the previous one in O(1), so hashing
+    all windows costs one multiply-add per value instead of one digest
+    per window.
+    
+    Args:
+        values: Token hashes
+        width: Number of tokens per window
+    
+    Returns:
+        List where item i is the hash of values[i:i + width]
+    """
+    count = len(values)
+    if width <= 0 or count < width:
+        return []
+    
+    power = pow(ROLLING_BASE, width, 1 << 64)
+    salt = (width * WIDTH_SALT) & MASK64
+    
+    window_hash = 0
+    for value in values[:width]:
+        window_hash = (window_hash * ROLLING_BASE + value) & MASK64
+    
+    hashes = [window_hash ^ salt]
+    for i in range(width, count):
+        window_hash = (window_hash * ROLLING_BASE + values[i] - values[i - width] * power) & MASK64
+        hashes.append(window_hash ^ salt)
+    return hashes
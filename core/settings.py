@@ -18,6 +18,20 @@ class Settings:
             "extended_timeout": 60.0,  # Extended timeout in seconds (for counter=1)
             "check_interval": 0.5,    # Clipboard check interval in seconds
             "preserve_clipboard": True,  # Whether to preserve clipboard content when popup is dismissed
+            "detection_deadline_ms": 100,  # Time budget for matching copied text to files (0: no limit)
+            "cross_project_detection": False,  # Also detect copies from linked projects other than the current one
+        },
+        "context": {
+            "margin_lines": 5,         # Lines of surrounding code added around a matched region
+            "max_region_lines": 200,   # Largest enclosing function/region sent instead of the bare match
+        },
+        "index_cache": {
+            "memory_budget_mb": 512,   # Memory kept for indexes of recently used projects
+            "spill_to_disk": True,     # Write evicted indexes to disk instead of dropping them
+        },
+        "history": {
+            "enabled": False,          # Also match copies against past versions of files in git history
+            "max_commits": 50,         # Commits back from HEAD whose file versions are indexed
         }
     }
     
@@ -64,7 +78,7 @@ class Settings:
             category: The settings category (e.g., 'clipboard')
             key: The setting key name
             default: Default value if setting doesn't exist
-            
+        
         Returns:
             The setting value or default if not found
         """
@@ -128,6 +142,87 @@ class Settings:
     def preserve_clipboard(self, value):
         """Set whether to preserve clipboard content when popup is dismissed."""
         self.set('clipboard', 'preserve_clipboard', bool(value))
+    
+    @property
+    def detection_deadline_ms(self):
+        """Get the time budget for matching copied text to files (milliseconds, None for no limit)."""
+        value = self.get('clipboard', 'detection_deadline_ms', 100)
+        return float(value) if value else None
+    
+    @detection_deadline_ms.setter
+    def detection_deadline_ms(self, value):
+        """Set the time budget for matching copied text to files."""
+        self.set('clipboard', 'detection_deadline_ms', float(value or 0))
+    
+    @property
+    def cross_project_detection(self):
+        """Get whether copied text is matched against every linked project."""
+        return self.get('clipboard', 'cross_project_detection', False)
+    
+    @cross_project_detection.setter
+    def cross_project_detection(self, value):
+        """Set whether copied text is matched against every linked project."""
+        self.set('clipboard', 'cross_project_detection', bool(value))
+    
+    @property
+    def context_margin_lines(self):
+        """Get the number of lines included around a matched code region."""
+        return self.get('context', 'margin_lines', 5)
+    
+    @context_margin_lines.setter
+    def context_margin_lines(self, value):
+        """Set the number of lines included around a matched code region."""
+        self.set('context', 'margin_lines', int(value))
+    
+    @property
+    def context_max_region_lines(self):
+        """Get the largest enclosing function/region included as context (lines)."""
+        return self.get('context', 'max_region_lines', 200)
+    
+    @context_max_region_lines.setter
+    def context_max_region_lines(self, value):
+        """Set the largest enclosing function/region included as context."""
+        self.set('context', 'max_region_lines', int(value))
+    
+    @property
+    def index_cache_budget_mb(self):
+        """Get the memory budget for indexes of recently used projects (MB)."""
+        return self.get('index_cache', 'memory_budget_mb', 512)
+    
+    @index_cache_budget_mb.setter
+    def index_cache_budget_mb(self, value):
+        """Set the memory budget for indexes of recently used projects."""
+        self.set('index_cache', 'memory_budget_mb', float(value))
+    
+    @property
+    def index_cache_spill_to_disk(self):
+        """Get whether evicted project indexes are written to disk."""
+        return self.get('index_cache', 'spill_to_disk', True)
+    
+    @index_cache_spill_to_disk.setter
+    def index_cache_spill_to_disk(self, value):
+        """Set whether evicted project indexes are written to disk."""
+        self.set('index_cache', 'spill_to_disk', bool(value))
+    
+    @property
+    def history_detection_enabled(self):
+        """Get whether copied text is also matched against past file versions."""
+        return self.get('history', 'enabled', False)
+    
+    @history_detection_enabled.setter
+    def history_detection_enabled(self, value):
+        """Set whether copied text is also matched against past file versions."""
+        self.set('history', 'enabled', bool(value))
+    
+    @property
+    def history_max_commits(self):
+        """Get the number of commits whose file versions are indexed."""
+        return self.get('history', 'max_commits', 50)
+    
+    @history_max_commits.setter
+    def history_max_commits(self, value):
+        """Set the number of commits whose file versions are indexed."""
+        self.set('history', 'max_commits', int(value))
 
 
 # Create a singleton instance
@@ -0,0 +1,272 @@
+"""
+Corpus-level longest-common-substring search over normalized project files.
+Sampled k-gram anchors are indexed once for the whole corpus; a query looks
+up each of its k-grams and extends hits along their diagonal, so matching
+costs time linear in the query rather than in the size of the project.
+"""
+
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from .deadline import Deadline
+from .gram_filters import GramBloomFilters
+from .postings import PostingsIndex
+from .rolling_hash import hash_text64
+
+# Separator between files in the concatenated corpus; stripped from queries
+FILE_SEPARATOR = '\x00'
+
+
+class SubstringIndex:
+    """
+    Seed-and-extend index answering "longest common substring with each file".
+    
+    Every `stride`-th k-gram of the concatenated corpus is indexed. Any
+    common substring of at least `seed_length + stride - 1` characters
+    contains one of those anchors, and the query side checks all of its
+    own k-grams, so such matches are always found.
+    """
+    
+    def __init__(self, seed_length: int = 12, stride: int = 8, max_seed_postings: int = 64):
+        """
+        Initialize an empty substring index.
+        
+        Args:
+            seed_length: Characters per indexed k-gram
+            stride: Distance between indexed k-grams in the corpus
+            max_seed_postings: Seeds occurring more often than this are skipped
+        """
+        self.seed_length = seed_length
+        self.stride = stride
+        self.max_seed_postings = max_seed_postings
+        
+        self.corpus = ''
+        self.file_paths = []          # file_id -> file_path
+        self.file_starts = array('I')  # file_id -> offset of the file in the corpus
+        self.file_lengths = array('I')  # file_id -> normalized length
+        self.seeds = PostingsIndex()  # k-gram hash -> (file ids, corpus offsets)
+        self.gram_filters = GramBloomFilters()  # file_id -> Bloom filter of its n-grams
+    
+    @property
+    def min_match_length(self) -> int:
+        """Shortest common substring the anchors are guaranteed to find."""
+        return self.seed_length + self.stride - 1
+    
+    def __len__(self) -> int:
+        return len(self.file_paths)
+    
+    def build(self, normalized_files: Dict[str, str]):
+        """
+        Build the index over normalized file contents.
+        
+        Args:
+            normalized_files: Dictionary of file_path -> normalized content
+        """
+        parts = []
+        offset = 0
+        k = self.seed_length
+        
+        self.file_paths = []
+        self.file_starts = array('I')
+        self.file_lengths = array('I')
+        self.seeds = PostingsIndex()
+        self.gram_filters = GramBloomFilters()
+        
+        for file_path, normalized in normalized_files.items():
+            normalized = normalized.replace(FILE_SEPARATOR, '')
+            file_id = len(self.file_paths)
+            
+            self.file_paths.append(file_path)
+            self.file_starts.append(offset)
+            self.file_lengths.append(len(normalized))
+            self.gram_filters.add_file(normalized)
+            
+            anchors = array('I', range(offset, offset + len(normalized) - k + 1, self.stride))
+            hashes = array('Q', [hash_text64(normalized[p - offset:p - offset + k]) for p in anchors])
+            self.seeds.extend(hashes, file_id, anchors)
+            
+            parts.append(normalized)
+            offset += len(normalized) + len(FILE_SEPARATOR)
+        
+        self.seeds.freeze()
+        self.corpus = FILE_SEPARATOR.join(parts)
+    
+    @classmethod
+    def merge(cls, segments: List['SubstringIndex']) -> 'SubstringIndex':
+        """
+        Combine indexes built over disjoint sets of files into one.
+        
+        Corpora are concatenated and seed postings shifted, so nothing is
+        re-hashed.
+        
+        Args:
+            segments: Indexes with the same seed parameters
+        
+        Returns:
+            Index over all files of the segments, in order
+        """
+        if len(segments) == 1:
+            return segments[0]
+        
+        first = segments[0] if segments else cls()
+        merged = cls(first.seed_length, first.stride, first.max_seed_postings)
+        parts = []
+        offset = 0
+        
+        for segment in segments:
+            if not len(segment):
+                continue
+            
+            merged.seeds.extend_index(segment.seeds, len(merged.file_paths), offset)
+            merged.file_paths.extend(segment.file_paths)
+            merged.file_starts.extend(start + offset for start in segment.file_starts)
+            merged.file_lengths.extend(segment.file_lengths)
+            merged.gram_filters.extend(segment.gram_filters)
+            
+            parts.append(segment.corpus)
+            offset += len(segment.corpus) + len(FILE_SEPARATOR)
+        
+        merged.seeds.freeze()
+        merged.corpus = FILE_SEPARATOR.join(parts)
+        return merged
+    
+    def memory_usage(self) -> int:
+        """Get the approximate bytes held by the corpus and seed postings."""
+        return (
+            len(self.corpus) + self.seeds.memory_usage() + self.gram_filters.memory_usage() +
+            sum(len(path) for path in self.file_paths) +
+            (len(self.file_starts) + len(self.file_lengths)) * 4
+        )
+    
+    def file_text(self, file_id: int) -> str:
+        """Get the normalized content of one file from the corpus."""
+        start = self.file_starts[file_id]
+        return self.corpus[start:start + self.file_lengths[file_id]]
+    
+    def file_id_at(self, corpus_offset: int) -> int:
+        """Get the id of the file containing a corpus offset."""
+        return bisect_right(self.file_starts, corpus_offset) - 1
+    
+    def _extend(self, query: str, query_pos: int, corpus_pos: int) -> Tuple[int, int]:
+        """
+        Extend a seed hit in both directions along its diagonal.
+        
+        Comparisons are done on slices with a galloping search, so the
+        extension runs at C speed rather than one character per step.
+        
+        Args:
+            query: Normalized query
+            query_pos: Query offset of the seed
+            corpus_pos: Corpus offset of the seed
+        
+        Returns:
+            Tuple of (query start, match length)
+        """
+        corpus = self.corpus
+        
+        # Forward: largest n with query[q:q+n] == corpus[c:c+n]
+        limit = min(len(query) - query_pos, len(corpus) - corpus_pos)
+        forward = _common_run(query, query_pos, corpus, corpus_pos, limit, 1)
+        
+        # Backward: largest n with query[q-n:q] == corpus[c-n:c]
+        limit = min(query_pos, corpus_pos)
+        backward = _common_run(query, query_pos, corpus, corpus_pos, limit, -1)
+        
+        return query_pos - backward, backward + forward
+    
+    def longest_common_substrings(self, query: str, candidate_files: Optional[set] = None,
+                                  deadline: Optional[Deadline] = None) -> Dict[int, Tuple[int, int, int]]:
+        """
+        Find the longest substring the query shares with each file.
+        
+        Args:
+            query: Normalized query text
+            candidate_files: Optional set of file ids to restrict the search to
+                (e.g. the survivors of gram_filters.candidates)
+            deadline: Optional deadline; when it passes, the best substrings
+                extended so far are returned
+        
+        Returns:
+            Dictionary of file_id -> (match length, query start, file offset)
+            for files sharing at least min_match_length characters
+        """
+        query = query.replace(FILE_SEPARATOR, '')
+        k = self.seed_length
+        if len(query) < k or not len(self.seeds):
+            return {}
+        
+        seed_positions = defaultdict(list)
+        for i in range(len(query) - k + 1):
+            seed_positions[hash_text64(query[i:i + k])].append(i)
+        
+        hits = []
+        for seed_hash, (file_ids, offsets) in self.seeds.lookup_many(seed_positions).items():
+            if len(file_ids) > self.max_seed_postings:
+                continue  # Boilerplate seed - too common to be worth extending
+            for query_pos in seed_positions[seed_hash]:
+                for file_id, corpus_pos in zip(file_ids, offsets):
+                    if candidate_files is None or file_id in candidate_files:
+                        hits.append((query_pos, file_id, corpus_pos))
+        
+        # Process hits in query order so each diagonal is extended only once
+        hits.sort()
+        covered = {}  # (file_id, diagonal) -> query offset the last extension reached
+        best = {}
+        
+        for count, (query_pos, file_id, corpus_pos) in enumerate(hits):
+            if deadline is not None and count % 256 == 0 and deadline.expired():
+                break
+            
+            diagonal = (file_id, corpus_pos - query_pos)
+            if covered.get(diagonal, -1) > query_pos:
+                continue
+            
+            start, length = self._extend(query, query_pos, corpus_pos)
+            covered[diagonal] = start + length
+            
+            if file_id not in best or length > best[file_id][0]:
+                file_offset = corpus_pos - (query_pos - start) - self.file_starts[file_id]
+                best[file_id] = (length, start, file_offset)
+        
+        return best
+
+
+def _common_run(a: str, a_pos: int, b: str, b_pos: int, limit: int, direction: int) -> int:
+    """
+    Length of the common run of a and b from the given offsets.
+    
+    Args:
+        a, b: Strings to compare
+        a_pos, b_pos: Offsets to start from
+        limit: Maximum run length to consider
+        direction: 1 to compare forwards, -1 to compare backwards
+    
+    Returns:
+        Number of equal characters in the run
+    """
+    def equal(n: int) -> bool:
+        if direction > 0:
+            return a[a_pos:a_pos + n] == b[b_pos:b_pos + n]
+        return a[a_pos - n:a_pos] == b[b_pos - n:b_pos]
+    
+    # Gallop to find an upper bound, then binary search inside it
+    low, step = 0, 16
+    while low < limit:
+        high = min(limit, low + step)
+        if not equal(high):
+            break
+        low = high
+        step *= 2
+    else:
+        return limit
+    
+    high = min(limit, low + step)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if equal(mid):
+            low = mid
+        else:
+            high = mid - 1
+    return low
@@ -0,0 +1,304 @@
+"""
+Single-pass lexical tokenizer shared by the detection and matching indexes.
+Source text is split once into a token stream that keeps each token's
+offset in the original text, skipping whitespace and the comments of the
+file's language family. Every normalized form the indexes compare (word
+sequences, identifiers, whitespace-free text, winnowing tokens) is derived
+from that stream, so queries and files normalize identically and matches
+map back to exact source offsets.
+"""
+
+import os
+import re
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate, chain, repeat
+from typing import Dict, List, Optional, Set, Tuple
+
+# Token kinds
+WORD = 1
+NUMBER = 2
+STRING = 3
+SYMBOL = 4
+
+# Comment syntax of each language family; files of other types keep everything
+FAMILY_COMMENTS = {
+    'c': r'//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)',
+    'hash': r'#[^\n]*',
+    'sql': r'--[^\n]*|/\*[\s\S]*?(?:\*/|\Z)',
+    'css': r'/\*[\s\S]*?(?:\*/|\Z)',
+    'markup': r'<!--[\s\S]*?(?:-->|\Z)',
+    'plain': None
+}
+
+FAMILY_EXTENSIONS = {
+    'c': ('.c', '.h', '.cc', '.cpp', '.cxx', '.hpp', '.cs', '.java', '.kt', '.kts', '.scala',
+          '.js', '.jsx', '.mjs', '.ts', '.tsx', '.go', '.rs', '.swift', '.dart', '.php', '.m'),
+    'hash': ('.py', '.pyw', '.rb', '.sh', '.bash', '.zsh', '.pl', '.r', '.yaml', '.yml',
+             '.toml', '.cfg', '.conf', '.mk', '.cmake', '.dockerfile'),
+    'sql': ('.sql', '.lua', '.hs'),
+    'css': ('.css', '.scss', '.less'),
+    'markup': ('.html', '.htm', '.xml', '.svg', '.vue', '.xaml')
+}
+
+EXTENSION_FAMILIES = {ext: family for family, exts in FAMILY_EXTENSIONS.items() for ext in exts}
+
+# Strings never span lines: a copy that starts inside a multi-line string
+# (a docstring, a template literal) is then still read like the file it
+# came from, from its first complete line on
+_STRING = r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|`(?:[^`\\\n]|\\.)*`'
+
+# Characters dropped from the whitespace-free forms
+_QUOTES_AND_SEPARATORS = str.maketrans('', '', '"\';,')
+_WHITESPACE = re.compile(r'\s+')
+_WORD_PARTS = re.compile(r'\w+')
+
+# Identifiers too generic to say anything about a file
+_LITERAL_WORDS = {'true', 'false', 'null', 'undefined'}
+
+
+def _compile_family(family: str) -> 're.Pattern':
+    """Compile the token pattern of a language family."""
+    comment = FAMILY_COMMENTS[family]
+    return re.compile(
+        r'\s*(?:'                                  # whitespace, skipped in the same step
+        f'({comment or "(?!)"})'                   # group 1: comments, skipped
+        r'|((?:[^\W\d]|\$)[\w$]*)'                 # group 2: words
+        r'|(\d[\w.]*)'                             # group 3: numbers
+        f'|({_STRING})'                            # group 4: strings
+        r'|([^\s\w]))'                             # group 5: symbols
+    )
+
+
+_FAMILY_PATTERNS = {family: _compile_family(family) for family in FAMILY_COMMENTS}
+
+# Group index of a match -> token kind (group 1 is a comment)
+_GROUP_KINDS = (None, None, WORD, NUMBER, STRING, SYMBOL)
+
+
+def family_for_path(file_path: str) -> str:
+    """
+    Get the language family of a file from its extension.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        Family name (a key of FAMILY_COMMENTS)
+    """
+    name = os.path.basename(file_path).lower()
+    if name in ('dockerfile', 'makefile'):
+        return 'hash'
+    return EXTENSION_FAMILIES.get(os.path.splitext(name)[1], 'plain')
+
+
+class TokenStream:
+    """
+    Tokens of one text with their kinds and source offsets.
+    
+    Token texts are kept as they appear in the source; the normalized forms
+    are derived on demand and are the same for a query and for the file it
+    was copied from, whenever both are tokenized with the same family.
+    """
+    
+    def __init__(self, text: str, family: str = 'plain'):
+        """
+        Tokenize a text.
+        
+        Args:
+            text: Source text
+            family: Language family whose comments are skipped
+        """
+        self.text = text
+        self.family = family
+        self.tokens = []            # token texts, as in the source
+        self.kinds = array('B')     # token kinds
+        self.starts = array('I')    # token offsets in the source text
+        
+        add_token, add_kind, add_start = self.tokens.append, self.kinds.append, self.starts.append
+        for match in _FAMILY_PATTERNS[family].finditer(text):
+            group = match.lastindex
+            if group != 1:
+                add_token(match.group(group))
+                add_kind(_GROUP_KINDS[group])
+                add_start(match.start(group))
+        
+        self._newlines = None
+    
+    def __len__(self) -> int:
+        return len(self.tokens)
+    
+    def signature(self) -> Tuple[Tuple[int, int], ...]:
+        """Get a key that is equal for streams holding the same tokens of one text."""
+        return tuple(zip(self.starts, map(len, self.tokens)))
+    
+    def line_of(self, offset: int) -> int:
+        """Get the 1-based line number of a source offset."""
+        if self._newlines is None:
+            self._newlines = array('I', (match.start() for match in re.finditer('\n', self.text)))
+        return bisect_right(self._newlines, offset - 1) + 1 if offset else 1
+    
+    def token_lines(self) -> array:
+        """Get the line number each token starts on."""
+        starts = self.starts
+        newlines_between = map(self.text.count, repeat('\n'), chain((0,), starts), starts)
+        return array('I', accumulate(newlines_between, initial=1))[1:]
+    
+    def code_lines(self) -> Dict[int, str]:
+        """
+        Get each line's tokens joined by single spaces.
+        
+        Lines are keyed by the line their tokens start on, so comments and
+        differences in spacing do not change a line's form.
+        
+        Returns:
+            Dictionary of line number -> joined tokens, for lines with tokens
+        """
+        if not self.tokens:
+            return {}
+        
+        # Join tokens with a newline where a new line starts, then split
+        lines = self.token_lines()
+        separators = ['\n' if line != previous else ' ' for previous, line in zip(lines, lines[1:])]
+        joined = ''.join(chain.from_iterable(zip(self.tokens, chain(separators, ('',)))))
+        line_numbers = [lines[0]] + [line for previous, line in zip(lines, lines[1:]) if line != previous]
+        return dict(zip(line_numbers, joined.split('\n')))
+    
+    def words(self) -> List[str]:
+        """Get the lowercased words of the text, including those inside strings."""
+        # Symbols hold no word characters, so words never run across tokens
+        return _WORD_PARTS.findall(' '.join(self.tokens).lower())
+    
+    def word_tokens(self) -> array:
+        """Get the index of the token each of words() comes from."""
+        word_tokens = array('I')
+        for index, token in enumerate(self.tokens):
+            word_tokens.extend([index] * len(_WORD_PARTS.findall(token)))
+        return word_tokens
+    
+    def identifier_counts(self, min_length: int = 4) -> Dict[str, int]:
+        """
+        Count the lowercased identifiers of the text.
+        
+        Args:
+            min_length: Shortest identifier kept
+        
+        Returns:
+            Dictionary of identifier -> occurrences, without literals like
+            'true' or 'null'
+        """
+        # Strings never span lines, so each line of the joined tokens is one token
+        pattern = r'^(?:[^\W\d]|\$)[\w$]{%d,}$' % max(0, min_length - 1)
+        counts = Counter(re.findall(pattern, '\n'.join(self.tokens).lower(), re.MULTILINE))
+        for literal in _LITERAL_WORDS:
+            counts.pop(literal, None)
+        return dict(counts)
+    
+    def token_forms(self, drop_separators: bool) -> List[str]:
+        """
+        Get each token lowercased and without whitespace.
+        
+        Args:
+            drop_separators: Whether to also drop quotes, semicolons and commas
+        
+        Returns:
+            Normalized form of each token (possibly empty), in order
+        """
+        forms = []
+        for token, kind in zip(self.tokens, self.kinds):
+            form = token.lower()
+            if kind == STRING:
+                form = _WHITESPACE.sub('', form)
+            if drop_separators:
+                form = form.translate(_QUOTES_AND_SEPARATORS)
+            forms.append(form)
+        return forms
+    
+    def compact(self, drop_separators: bool = False) -> str:
+        """
+        Get the text lowercased with all whitespace and comments removed.
+        
+        Args:
+            drop_separators: Whether to also drop quotes, semicolons and commas
+        
+        Returns:
+            Whitespace-free normalized text
+        """
+        # Only strings hold whitespace, so joining first gives the same text as token_forms()
+        compact = _WHITESPACE.sub('', ''.join(self.tokens).lower())
+        return compact.translate(_QUOTES_AND_SEPARATORS) if drop_separators else compact
+    
+    def compact_range_to_source(self, start: int, length: int,
+                                drop_separators: bool = False) -> Optional[Tuple[int, int]]:
+        """
+        Map a range of the compact text back to the source text.
+        
+        Args:
+            start: Offset of the range in compact()
+            length: Length of the range
+            drop_separators: Whether compact() dropped separators
+        
+        Returns:
+            (start, end) offsets in the source text of the tokens covering
+            the range, or None if the range is outside the text
+        """
+        end = start + max(1, length)
+        position = 0
+        source_start = None
+        for index, form in enumerate(self.token_forms(drop_separators)):
+            position += len(form)
+            if source_start is None and position > start:
+                source_start = self.starts[index]
+            if source_start is not None and position >= end:
+                return source_start, self.starts[index] + len(self.tokens[index])
+        
+        if source_start is None:
+            return None
+        return source_start, len(self.text)
+
+
+def tokenize(text: str, family: str = 'plain') -> TokenStream:
+    """
+    Tokenize text with the comment syntax of a language family.
+    
+    Args:
+        text: Source text
+        family: Language family (see FAMILY_COMMENTS)
+    
+    Returns:
+        Token stream of the text
+    """
+    return TokenStream(text, family)
+
+
+def tokenize_file(file_path: str, text: str) -> TokenStream:
+    """Tokenize a file's text with the family of its extension."""
+    return TokenStream(text, family_for_path(file_path))
+
+
+def query_streams(text: str, families: Optional[Set[str]] = None) -> List[TokenStream]:
+    """
+    Tokenize copied text once for each distinct way a file could have tokenized it.
+    
+    The language a copy came from is unknown, so it is tokenized with the
+    comment syntax of every family the indexed files use; families that
+    read it the same way are collapsed, so text without comment markers
+    yields a single stream.
+    
+    Args:
+        text: Copied text
+        families: Families of the indexed files (default: all families)
+    
+    Returns:
+        Distinct token streams, the plain (no comments) reading first
+    """
+    streams = []
+    seen = set()
+    for family in ['plain'] + sorted(set(families or FAMILY_COMMENTS) - {'plain'}):
+        stream = TokenStream(text, family)
+        signature = stream.signature()
+        if signature not in seen:
+            seen.add(signature)
+            streams.append(stream)
+    return streams
@@ -0,0 +1,295 @@
+"""
+Winnowing (MOSS-style) fingerprints for edit-tolerant copy detection.
+Code is reduced to a token stream where identifiers and literals are
+abstracted away, so renamed variables, comments and reformatting do not
+change the fingerprints selected from its k-grams.
+"""
+
+import math
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .postings import PostingsIndex
+from .rolling_hash import hash_tokens, rolling_window_hashes
+from .tokenizer import NUMBER, STRING, WORD, TokenStream, family_for_path, query_streams, tokenize_file
+
+# Keywords kept verbatim; every other identifier becomes a placeholder
+KEYWORDS = {
+    'and', 'as', 'assert', 'async', 'await', 'break', 'case', 'catch', 'class',
+    'const', 'continue', 'def', 'default', 'del', 'delete', 'do', 'elif', 'else',
+    'enum', 'except', 'export', 'extends', 'false', 'finally', 'for', 'from',
+    'func', 'function', 'global', 'go', 'if', 'implements', 'import', 'in',
+    'instanceof', 'interface', 'is', 'lambda', 'let', 'new', 'none', 'nonlocal',
+    'not', 'null', 'or', 'package', 'pass', 'private', 'protected', 'public',
+    'raise', 'return', 'self', 'static', 'struct', 'super', 'switch', 'this',
+    'throw', 'throws', 'true', 'try', 'type', 'typeof', 'undefined', 'var',
+    'void', 'while', 'with', 'yield'
+}
+
+
+def fingerprint_tokens(stream: TokenStream) -> Tuple[List[str], array]:
+    """
+    Abstract a token stream for fingerprinting, replacing identifiers and literals.
+    
+    Args:
+        stream: Token stream of the source text
+    
+    Returns:
+        Tuple of (tokens, line number of each token)
+    """
+    tokens = []
+    for token, kind in zip(stream.tokens, stream.kinds):
+        if kind == WORD:
+            word = token.lower()
+            tokens.append(word if word in KEYWORDS else 'V')
+        elif kind == STRING:
+            tokens.append('S')
+        elif kind == NUMBER:
+            tokens.append('N')
+        else:
+            tokens.append(token)
+    
+    return tokens, stream.token_lines()
+
+
+def winnow(hashes: List[int], window: int) -> List[int]:
+    """
+    Select the minimum hash of every window of consecutive k-gram hashes.
+    
+    The rightmost minimum is chosen and each selection is reported once,
+    which guarantees that any shared run of window + k - 1 tokens produces
+    at least one shared fingerprint.
+    
+    Args:
+        hashes: k-gram hashes in order
+        window: Number of consecutive k-grams per window
+    
+    Returns:
+        Indexes into hashes of the selected fingerprints, in order
+    """
+    if not hashes:
+        return []
+    if len(hashes) <= window:
+        minimum = min(hashes)
+        return [max(i for i, value in enumerate(hashes) if value == minimum)]
+    
+    selected = []
+    last = -1
+    for start in range(len(hashes) - window + 1):
+        if last < start:
+            # Previous minimum slid out - rescan the window
+            best = start
+            for i in range(start + 1, start + window):
+                if hashes[i] <= hashes[best]:
+                    best = i
+            last = best
+            selected.append(best)
+        else:
+            i = start + window - 1
+            if hashes[i] <= hashes[last]:
+                last = i
+                selected.append(i)
+    return selected
+
+
+class WinnowingIndex:
+    """Index of winnowed k-gram fingerprints over project files."""
+    
+    def __init__(self, kgram: int = 8, window: int = 5, max_file_share: float = 0.5):
+        """
+        Initialize an empty winnowing index.
+        
+        Args:
+            kgram: Tokens per k-gram
+            window: Winnowing window in k-grams
+            max_file_share: Fingerprints found in more than this share of
+                files are treated as boilerplate and ignored when querying
+        """
+        self.kgram = kgram
+        self.window = window
+        self.max_file_share = max_file_share
+        
+        self.file_paths = []  # file_id -> file_path
+        self.file_ids = {}    # file_path -> file_id
+        self.fingerprints = PostingsIndex()  # fingerprint -> (file ids, line numbers)
+        self.families = set()  # Language families of the indexed files
+        self._token_cache = {}
+    
+    def __len__(self) -> int:
+        return len(self.file_paths)
+    
+    def clear(self):
+        """Drop all indexed files."""
+        self.__init__(self.kgram, self.window, self.max_file_share)
+    
+    def fingerprint(self, stream: TokenStream) -> Tuple[List[int], List[int]]:
+        """
+        Compute the winnowed fingerprints of a tokenized text.
+        
+        Args:
+            stream: Token stream of the source text
+        
+        Returns:
+            Tuple of (fingerprint hashes, line number of each fingerprint)
+        """
+        tokens, lines = fingerprint_tokens(stream)
+        kgram_hashes = rolling_window_hashes(hash_tokens(tokens, self._token_cache), self.kgram)
+        selected = winnow(kgram_hashes, self.window)
+        return [kgram_hashes[i] for i in selected], [lines[i] for i in selected]
+    
+    def add_file(self, file_path: str, content: str):
+        """
+        Fingerprint one file into the index.
+        
+        Args:
+            file_path: Path to the file
+            content: File content
+        """
+        hashes, lines = self.fingerprint(tokenize_file(file_path, content))
+        self.add_fingerprints(file_path, array('Q', hashes), array('I', lines))
+    
+    def add_fingerprints(self, file_path: str, hashes: array, lines: array):
+        """
+        Add fingerprints computed elsewhere (e.g. in a worker process).
+        
+        Args:
+            file_path: Path to the file
+            hashes: Winnowed fingerprints of the file
+            lines: Line number of each fingerprint
+        """
+        file_id = self.file_ids.get(file_path)
+        if file_id is None:
+            file_id = len(self.file_paths)
+            self.file_paths.append(file_path)
+            self.file_ids[file_path] = file_id
+            self.families.add(family_for_path(file_path))
+        
+        self.fingerprints.extend(hashes, file_id, lines)
+    
+    def search(self, text: str, threshold: float = 0.3,
+               limit: int = 5) -> List[Tuple[str, float, List[Tuple[int, int]]]]:
+        """
+        Find files sharing fingerprints with a text.
+        
+        Each query fingerprint is weighted by its inverse document frequency,
+        so structure shared by many files (error handling, imports) counts
+        for little. Work is proportional to the number of query fingerprints
+        and their postings, not to the size of the indexed corpus.
+        
+        Args:
+            text: Copied text
+            threshold: Minimum IDF-weighted share of the query's fingerprints
+                a file must contain
+            limit: Maximum number of files to return
+        
+        Returns:
+            List of (file_path, score, matched line ranges) tuples, sorted by score
+        """
+        results = []
+        for file_id, (score, lines) in self._score_files(text).items():
+            if score >= threshold:
+                regions = merge_line_ranges(lines)
+                results.append((self.file_paths[file_id], min(1.0, score), regions))
+        
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:limit]
+    
+    def candidate_files(self, text: str) -> List[str]:
+        """
+        List the files sharing fingerprints with a text, most shared weight first.
+        
+        A cheap first pass for exhaustive matchers: a file containing a long
+        enough copy of the text shares at least one of its fingerprints.
+        
+        Args:
+            text: Copied text
+        
+        Returns:
+            Paths of the files sharing any distinctive fingerprint
+        """
+        ranked = sorted(self._score_files(text).items(), key=lambda item: item[1][0], reverse=True)
+        return [self.file_paths[file_id] for file_id, _ in ranked]
+    
+    def _score_files(self, text: str) -> Dict[int, Tuple[float, List[int]]]:
+        """
+        Score each file by the share of the query's fingerprint weight it contains.
+        
+        The copied text is fingerprinted under each comment syntax of the
+        indexed files and every file keeps its best score.
+        
+        Args:
+            text: Copied text
+        
+        Returns:
+            Dictionary of file_id -> (score, lines of the shared fingerprints)
+        """
+        self.fingerprints.freeze()
+        
+        scores = {}
+        for stream in query_streams(text, self.families):
+            query_weight, file_weights, matched_lines = self._weigh_files(stream)
+            if query_weight <= 0:
+                continue
+            for file_id, weight in file_weights.items():
+                score = weight / query_weight
+                if file_id not in scores or score > scores[file_id][0]:
+                    scores[file_id] = (score, matched_lines[file_id])
+        return scores
+    
+    def _weigh_files(self, stream: TokenStream) -> Tuple[float, Dict[int, float], Dict[int, List[int]]]:
+        """
+        Weigh each file by the IDF of the query fingerprints it contains.
+        
+        Args:
+            stream: Token stream of the copied text
+        
+        Returns:
+            Tuple of (total query weight, file_id -> shared weight,
+            file_id -> lines of the shared fingerprints)
+        """
+        query_hashes, _ = self.fingerprint(stream)
+        query_hashes = set(query_hashes)
+        total_files = len(self.file_paths)
+        if not query_hashes or not total_files:
+            return 0.0, {}, {}
+        
+        max_files = max(1, int(total_files * self.max_file_share))
+        unseen_weight = math.log((total_files + 1) / 1.5)
+        postings = self.fingerprints.lookup_many(query_hashes)
+        
+        query_weight = unseen_weight * (len(query_hashes) - len(postings))
+        file_weights = defaultdict(float)
+        matched_lines = defaultdict(list)
+        
+        for file_ids, lines in postings.values():
+            matched_files = set(file_ids)
+            weight = math.log((total_files + 1) / (len(matched_files) + 0.5))
+            query_weight += weight
+            if len(matched_files) > max_files and total_files > 2:
+                continue  # Boilerplate shared across the project
+            for file_id in matched_files:
+                file_weights[file_id] += weight
+            for file_id, line in zip(file_ids, lines):
+                matched_lines[file_id].append(line)
+        
+        return query_weight, file_weights, matched_lines
+
+
+def merge_line_ranges(lines: List[int], gap: int = 3, min_hits: int = 2) -> List[Tuple[int, int]]:
+    """
+    Merge matched line numbers into (first_line, last_line) ranges.
+    
+    Ranges backed by fewer than min_hits fingerprints are dropped unless
+    nothing else matched, since isolated hits are usually coincidental.
+    """
+    ranges = []
+    for line in sorted(lines):
+        if ranges and line - ranges[-1][1] <= gap:
+            ranges[-1][1] = line
+            ranges[-1][2] += 1
+        else:
+            ranges.append([line, line, 1])
+    
+    dense = [r for r in ranges if r[2] >= min_hits] or ranges
+    return [(first, last) for first, last, _ in dense]
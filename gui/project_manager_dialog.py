@@ -8,6 +8,7 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton,
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QIcon, QSyntaxHighlighter, QTextCharFormat, QColor
 from core.project_linker import project_linker
+from core.recent_files import recent_files
 from utils.file_summarizer import project_summarizer
 from utils.file_dependency_analyzer import file_dependency_analyzer
 from .dependency_graph_widget import DependencyGraphWidget
@@ -857,6 +858,7 @@ class ProjectManagerDialog(QDialog):
             return
         
         self.current_selected_file = file_path
+        recent_files.touch(file_path)
         self.summarize_button.setEnabled(True)
         self.display_file_details(file_path)
         
@@ -1133,22 +1135,22 @@ class ProjectManagerDialog(QDialog):
             QMessageBox.information(self, "Info", "No project selected to refresh.")
             return
         
-        project_data = project_linker.linked_projects[project_linker.current_project]
-        
         # Re-discover files
-        old_file_count = len(project_data["files"])
-        new_files = project_linker.file_analyzer.discover_user_files(project_data["path"])
-        project_data["files"] = new_files
-        project_linker._save_linked_projects()
+        changes = project_linker.refresh_project(project_linker.current_project)
+        if changes is None:
+            return
         
         # Reload file tree
         self.load_project_files()
         
-        new_file_count = len(new_files)
-        if new_file_count != old_file_count:
-            self.status_label.setText(f"Refreshed: {new_file_count} files found ({new_file_count - old_file_count:+d} change)")
+        new_file_count = changes['files']
+        modified = f", {changes['modified']} modified" if changes['modified'] else ""
+        deleted = f", {changes['deleted']} deleted" if changes['deleted'] else ""
+        if changes['added'] or changes['removed']:
+            self.status_label.setText(f"Refreshed: {new_file_count} files found "
+                                      f"(+{changes['added']} / -{changes['removed']}{deleted}{modified})")
         else:
-            self.status_label.setText(f"Refreshed: {new_file_count} files found (no change)")
+            self.status_label.setText(f"Refreshed: {new_file_count} files found (no change{modified})")
     
     
     def closeEvent(self, event):
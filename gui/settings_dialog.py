@@ -15,7 +15,7 @@ class SettingsDialog(QDialog):
         """Initialize the settings dialog."""
         super().__init__(parent)
         self.init_ui()
-        
+    
     def init_ui(self):
         """Set up the dialog UI components."""
         self.setWindowTitle("Settings")
@@ -60,12 +60,24 @@ class SettingsDialog(QDialog):
         self.preserve_clipboard_checkbox.setChecked(settings.preserve_clipboard)
         clipboard_layout.addRow("", self.preserve_clipboard_checkbox)
         
+        # Cross-project detection checkbox
+        self.cross_project_checkbox = QCheckBox("Detect copied code from all linked projects")
+        self.cross_project_checkbox.setChecked(settings.cross_project_detection)
+        clipboard_layout.addRow("", self.cross_project_checkbox)
+        
+        # History detection checkbox
+        self.history_detection_checkbox = QCheckBox("Detect copies of past file versions from git history")
+        self.history_detection_checkbox.setChecked(settings.history_detection_enabled)
+        clipboard_layout.addRow("", self.history_detection_checkbox)
+        
         # Add help text
         help_text = QLabel(
             "Initial timeout: How long the popup appears after first clipboard copy\n"
             "Extended timeout: How long the popup remains after pressing copy again\n"
             "Check interval: How frequently the application checks for clipboard changes\n"
-            "Preserve clipboard: Keep clipboard content after popup is closed (prevents auto-clearing)"
+            "Preserve clipboard: Keep clipboard content after popup is closed (prevents auto-clearing)\n"
+            "All linked projects: Also match copies against projects other than the current one\n"
+            "Git history: Also match copies against versions of files in recent commits"
         )
         help_text.setWordWrap(True)
         help_text.setStyleSheet("color: #666; font-size: 11px;")
@@ -90,7 +102,7 @@ class SettingsDialog(QDialog):
         
         layout.addLayout(button_layout)
         self.setLayout(layout)
-        
+    
     def save_settings(self):
         """Save the settings and close the dialog."""
         # Save settings
@@ -98,6 +110,8 @@ class SettingsDialog(QDialog):
         settings.extended_timeout = self.extended_timeout_spinner.value()
         settings.check_interval = self.check_interval_spinner.value()
         settings.preserve_clipboard = self.preserve_clipboard_checkbox.isChecked()
+        settings.cross_project_detection = self.cross_project_checkbox.isChecked()
+        settings.history_detection_enabled = self.history_detection_checkbox.isChecked()
         
         # Accept the dialog (closes it)
         self.accept()
\ No newline at end of file
@@ -28,6 +28,9 @@ from utils.plot import PlotThread, PlotWindow, CustomEvent
 from .project_manager_dialog import ProjectManagerDialog
 from core.project_manager import project_manager
 from utils.instant_code_detector import instant_detector
+from core.recent_files import recent_files
+from core.deadline import MatchResults
+from core.history_index import project_history
 
 
 
@@ -527,12 +530,30 @@ class TextWindow(QMainWindow):
         instant_matches = []
         
         try:
-            # Refresh detector if project changed
+            # Refresh detector if project changed (rebuilds in the background)
             instant_detector.refresh_if_needed()
-            
+            if instant_detector.is_building():
+                stats = instant_detector.get_stats()
+                print(f"Instant index still building ({stats['progress']:.0%}) - using files indexed so far")
+
             # Try instant detection on clipboard content
             if hasattr(self, 'searchText') and self.searchText:
-                all_matches = instant_detector.instant_detect_multiple(self.searchText)
+                if settings.cross_project_detection:
+                    # Label files of other linked projects with their project
+                    project_matches = instant_detector.instant_detect_all_projects(
+                        self.searchText, deadline_ms=settings.detection_deadline_ms
+                    )
+                    all_matches = MatchResults(
+                        [(path, name if project == instant_detector.current_project else f"{name} ({project})", conf)
+                         for project, path, name, conf in project_matches],
+                        partial=project_matches.partial
+                    )
+                else:
+                    all_matches = instant_detector.instant_detect_multiple(
+                        self.searchText, deadline_ms=settings.detection_deadline_ms
+                    )
+                if all_matches.partial:
+                    print(f"Instant detection stopped at its {settings.detection_deadline_ms:.0f} ms deadline - showing best matches so far")
                 
                 # Filter out matches below 95% confidence
                 instant_matches = [(path, name, conf) for path, name, conf in all_matches if conf >= 0.95]
@@ -545,6 +566,15 @@ class TextWindow(QMainWindow):
                     print(f"Found {len(all_matches)} matches, but all below 95% confidence threshold")
                 else:
                     print("No instant code matches found")
+                
+                # Past versions of files, reported alongside the current tree
+                if settings.history_detection_enabled:
+                    project_history.refresh_if_needed()
+                    for file_path, commit_sha, summary, score in project_history.search(self.searchText):
+                        file_name = os.path.basename(file_path)
+                        print(f"  - {file_name} matches as of commit {commit_sha[:8]} ({summary}) - {score:.0%}")
+                        if score >= 0.95 and all(path != file_path for path, _, _ in instant_matches):
+                            instant_matches.append((file_path, f"{file_name} @ {commit_sha[:8]}", score))
             
         except Exception as e:
             print(f"Error in instant detection: {e}")
@@ -676,6 +706,8 @@ class TextWindow(QMainWindow):
             self.current_project_context_requested = project_context_requested
             self.current_chat_history_requested = chat_history_requested
             self.current_selected_file_path = selected_file_path
+            if selected_file_path:
+                recent_files.touch(selected_file_path)
             
             # Handle edit mode - route to diff viewer instead of regular chat
             if edit_mode_requested and selected_file_path:
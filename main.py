@@ -4,6 +4,12 @@ import logging
 
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Fork the index worker processes while this is still a single-threaded
+# process without Qt (see core.index_workers.start_worker_pool)
+from core.index_workers import start_worker_pool
+start_worker_pool()
+
 from PyQt5.QtWidgets import QApplication
 
 # Initialize logging before importing other modules
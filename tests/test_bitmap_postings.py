@@ -0,0 +1,130 @@
+"""Tests for compressed file-set postings and bit-sliced counters (core/bitmap_postings.py)."""
+
+import random
+from array import array
+
+import pytest
+
+from core.bitmap_postings import (
+    MIN_FILES_FOR_STOP_KEYS, BitmapPostings, BitSlicedCounter, bitmap_from_ids, bitmap_ids, popcount
+)
+
+
+def test_bitmap_helpers_round_trip():
+    ids = [0, 3, 64, 65, 1000]
+    bitmap = bitmap_from_ids(ids)
+    assert bitmap_ids(bitmap) == ids
+    assert popcount(bitmap) == len(ids)
+    assert bitmap_ids(0) == []
+
+
+def build_postings(file_keys, max_doc_share=0.5):
+    postings = BitmapPostings(max_doc_share)
+    for file_id, keys in enumerate(file_keys):
+        postings.add_file(file_id, keys)
+    return postings
+
+
+def test_freeze_turns_dense_sets_into_bitmaps_and_keeps_sparse_arrays():
+    # 64 files: 'dense' in 3 of them (3 * 32 > 64 bits), 'sparse' in 1
+    file_keys = [set() for _ in range(64)]
+    for file_id in (1, 30, 63):
+        file_keys[file_id].add('dense')
+    file_keys[7].add('sparse')
+    postings = build_postings(file_keys)
+    postings.freeze()
+    
+    assert isinstance(postings._postings['dense'], int)
+    assert isinstance(postings._postings['sparse'], array)
+    assert postings.file_ids('dense') == [1, 30, 63]
+    assert postings.file_ids('sparse') == [7]
+    assert postings.bitmap('dense') == bitmap_from_ids([1, 30, 63])
+    assert postings.bitmap('sparse') == 1 << 7
+    assert postings.doc_freq('dense') == 3
+    assert postings.bitmap('missing') == 0 and postings.file_ids('missing') == []
+
+
+def test_freeze_drops_stop_keys():
+    total = MIN_FILES_FOR_STOP_KEYS * 2
+    file_keys = [{'common', f'own_{i}'} | ({'half'} if i % 2 else set()) for i in range(total)]
+    postings = build_postings(file_keys)
+    postings.freeze()
+    
+    assert 'common' not in postings                 # In every file
+    assert 'half' in postings                       # In exactly half: kept
+    assert postings.stop_keys == 1
+    assert len(postings) == total + 1
+
+
+def test_small_projects_keep_every_key():
+    postings = build_postings([{'common'} for _ in range(MIN_FILES_FOR_STOP_KEYS - 1)])
+    postings.freeze()
+    assert 'common' in postings
+    assert postings.stop_keys == 0
+
+
+def test_frozen_copy_is_independent():
+    postings = build_postings([{'a', 'b'}, {'a'}, {'b'}])
+    frozen = postings.frozen_copy()
+    
+    postings.add_file(3, ['a', 'c'])
+    assert postings.file_ids('a') == [0, 1, 3]
+    assert frozen.file_ids('a') == [0, 1]
+    assert 'c' not in frozen
+    assert frozen.total_files == 3
+    
+    # Freezing the original (bitmaps now) leaves the copy's containers alone
+    postings.freeze()
+    postings.add_file(4, ['a'])
+    assert postings.file_ids('a') == [0, 1, 3, 4]
+    assert frozen.file_ids('a') == [0, 1]
+
+
+def count_into(counter, counts):
+    """Add each file's count to the counter, one key bitmap at a time."""
+    for round_number in range(max(counts.values())):
+        counter.add(bitmap_from_ids(f for f, n in counts.items() if n > round_number))
+
+
+# File id -> number of query identifiers the file contains
+COUNTS = {0: 1, 1: 2, 2: 3, 3: 4, 4: 5, 5: 9, 7: 2, 70: 3, 200: 4}
+
+
+def expected(predicate):
+    return bitmap_from_ids(f for f, n in COUNTS.items() if predicate(n))
+
+
+def test_counter_with_two_planes_saturates_at_four():
+    counter = BitSlicedCounter(bits=2)
+    count_into(counter, COUNTS)
+    
+    assert counter.exactly(1) == expected(lambda n: n == 1)
+    assert counter.exactly(2) == expected(lambda n: n == 2)
+    assert counter.exactly(3) == expected(lambda n: n == 3)
+    assert counter.exactly(4) == 0                  # Not representable: saturated
+    assert counter.at_least(4) == expected(lambda n: n >= 4)
+    assert counter.at_least(3) == expected(lambda n: n >= 3)
+    assert counter.at_least(1) == counter.touched == expected(lambda n: n >= 1)
+    assert counter.exactly(0) == 0
+
+
+@pytest.mark.parametrize('bits', [1, 2, 3])
+def test_counter_matches_plain_counts(bits):
+    rng = random.Random(bits)
+    counts = {file_id: rng.randint(1, 10) for file_id in rng.sample(range(300), 80)}
+    counter = BitSlicedCounter(bits=bits)
+    count_into(counter, counts)
+    limit = 1 << bits
+    
+    for count in range(1, limit):
+        assert counter.exactly(count) == bitmap_from_ids(f for f, n in counts.items() if n == count)
+    for count in range(1, limit + 1):
+        assert counter.at_least(count) == bitmap_from_ids(f for f, n in counts.items() if n >= count)
+
+
+def test_adding_a_bitmap_several_times():
+    counter = BitSlicedCounter(bits=2)
+    counter.add(0b101, times=2)
+    counter.add(0b100)
+    assert counter.exactly(2) == 0b001
+    assert counter.exactly(3) == 0b100
@@ -0,0 +1,108 @@
+"""Tests for the compiled code indicator check (utils/smart_context_matcher.py)."""
+
+import random
+import re
+
+import pytest
+
+from utils.smart_context_matcher import CodeMatcher
+
+# The check as it was before the indicators were compiled into one pattern
+OLD_CODE_PATTERNS = [
+    r'\w+\s*\(.*?\)',           # Function calls
+    r'\w+\s*=\s*\w+',           # Variable assignments
+    r'{\s*\w+.*?}',             # Object literals
+    r'\[\s*\w+.*?\]',           # Array literals
+    r'<\w+.*?/?>',              # HTML/JSX tags
+    r'\w+\.\w+\(',              # Method calls
+    r'\/\/.*|\/\*.*?\*\/',      # Comments
+]
+
+
+def old_has_code_indicators(code_indicators, text):
+    text_lower = text.lower()
+    for keyword in code_indicators['keywords']:
+        if keyword in text_lower:
+            return True
+    for symbol in code_indicators['symbols']:
+        if symbol in text:
+            return True
+    for ext in code_indicators['extensions']:
+        if ext in text_lower:
+            return True
+    for pattern in OLD_CODE_PATTERNS:
+        if re.search(pattern, text, re.DOTALL):
+            return True
+    return False
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return CodeMatcher()
+
+
+SNIPPETS = [
+    # Code
+    'def total(orders):\n    return sum(o.price for o in orders)',
+    'const [count, setCount] = useState(0);',
+    'SELECT name FROM users WHERE id = 42',
+    'items.map(item => item.id)',
+    'x=1',
+    'print ("hi")',
+    '<div className="app">',
+    '/* note */',
+    'see http://example.com',
+    '{ key: value }',
+    'matrix[ row ]',
+    'obj.method(',
+    'a && b',
+    'std::vector<int> v;',
+    'open main.py please',
+    'Result: OK (3 tests)',
+    'cost (approx',
+    'foo (bar) baz',
+    '[x',
+    '{a',
+    '<b',
+    'A = B',
+    'ÉTAT = Über',
+    # Prose and logs
+    'Thanks for the quick reply, see you tomorrow.',
+    'The meeting moved to Tuesday afternoon',
+    'INFO 2024-05-01 12:00:01 worker started',
+    'Hello world',
+    'Please review the attached notes.',
+    'Lorem ipsum dolor sit amet, consectetur adipiscing elit',
+    '',
+    '   \n\t ',
+    '( unmatched opener',
+    '(((((((',
+    'ends with a word before an opener x(',
+    'Café crème brûlée',
+    '100% done',
+    'why? because!',
+]
+
+
+@pytest.mark.parametrize('text', SNIPPETS)
+def test_same_verdict_as_the_old_pattern_loop(matcher, text):
+    assert matcher.has_code_indicators(text) == old_has_code_indicators(matcher.code_indicators, text)
+
+
+def test_snippets_cover_both_verdicts(matcher):
+    verdicts = {matcher.has_code_indicators(text) for text in SNIPPETS}
+    assert verdicts == {True, False}
+
+
+def test_same_verdict_on_random_text(matcher):
+    rng = random.Random(12)
+    alphabet = 'abxyzAQ _\n\t()[]{}<>=./*!-:;,"\'$?&|+0'
+    for _ in range(3000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert matcher.has_code_indicators(text) == old_has_code_indicators(matcher.code_indicators, text), text
+
+
+def test_min_indicators_counts_occurrences(matcher):
+    assert matcher.has_code_indicators('x = 1', min_indicators=1)
+    assert not matcher.has_code_indicators('x = 1', min_indicators=3)
+    assert matcher.has_code_indicators('def f(): return x == y', min_indicators=3)
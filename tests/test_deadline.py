@@ -0,0 +1,39 @@
+"""Tests for deadline-bounded matching helpers (core/deadline.py, core/recent_files.py)."""
+
+import time
+
+from core.deadline import Deadline, MatchResults
+from core.recent_files import RecentFiles
+
+
+def test_deadline_without_budget_never_expires():
+    deadline = Deadline()
+    assert not deadline.expired()
+    assert deadline.remaining_ms() is None
+
+
+def test_deadline_stays_reached_once_expired():
+    deadline = Deadline(1)
+    time.sleep(0.01)
+    assert deadline.expired()
+    assert deadline.reached
+    assert deadline.remaining_ms() == 0.0
+    assert deadline.expired()
+
+
+def test_match_results_is_a_list_with_a_partial_flag():
+    results = MatchResults([('a.py', 0.9)], partial=True)
+    assert results == [('a.py', 0.9)]
+    assert results.partial
+    assert not MatchResults().partial
+
+
+def test_recent_files_come_first_most_recent_first():
+    recent = RecentFiles(max_files=2)
+    recent.touch('a.py')
+    recent.touch('b.py')
+    recent.touch('c.py')    # 'a.py' is forgotten
+    recent.touch('b.py')
+    
+    assert recent.paths() == ['b.py', 'c.py']
+    assert recent.prioritize(['a.py', 'c.py', 'd.py', 'b.py']) == ['b.py', 'c.py', 'a.py', 'd.py']
@@ -0,0 +1,238 @@
+"""Tests for reading git objects and indexing file history (core/git_objects.py, core/history_index.py)."""
+
+import os
+import shutil
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from core import history_index
+from core.git_objects import (
+    OBJ_OFS_DELTA, OBJ_REF_DELTA, GitError, GitRepository, TreeFiles, find_git_dir, head_commit
+)
+from core.history_index import HistoryIndex, ProjectHistory
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+GIT_ENV = {
+    'GIT_AUTHOR_NAME': 'Test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+    'GIT_COMMITTER_NAME': 'Test', 'GIT_COMMITTER_EMAIL': 'test@example.com',
+    'GIT_CONFIG_NOSYSTEM': '1', 'HOME': os.devnull,
+}
+
+
+def git(repo, *args) -> str:
+    result = subprocess.run(['git', '-C', str(repo), *args], check=True, capture_output=True,
+                            env={**os.environ, **GIT_ENV})
+    return result.stdout.decode()
+
+
+def functions(names):
+    return ''.join(
+        f"def {name}(items, limit):\n"
+        f"    selected = [item for item in items if item.score > limit]\n"
+        f"    selected.sort(key=lambda item: (item.rank, item.name))\n"
+        f"    return {{item.name: item.score for item in selected[:{len(name)}]}}\n\n"
+        for name in names
+    )
+
+
+BASE_NAMES = [f'helper_{i}' for i in range(40)]
+
+LEGACY = '''def legacy_parser(stream, delimiter):
+    fields = []
+    buffer = ''
+    for char in stream:
+        if char == delimiter:
+            fields.append(buffer.strip())
+            buffer = ''
+        else:
+            buffer += char
+    return fields
+
+'''
+
+
+def commit(repo, message, files):
+    for name, content in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', message)
+    return git(repo, 'rev-parse', 'HEAD').strip()
+
+
+def all_objects(repo):
+    """Object ids of the repository, from git itself."""
+    listing = git(repo, 'cat-file', '--batch-all-objects', '--batch-check=%(objectname) %(objecttype)')
+    return [line.split() for line in listing.splitlines()]
+
+
+def delta_types(repo):
+    """Pack object types (6: offset delta, 7: reference delta) of the packed deltas."""
+    types = set()
+    for pack_index in (repo / '.git' / 'objects' / 'pack').glob('*.idx'):
+        data = pack_index.with_suffix('.pack').read_bytes()
+        for line in git(repo, 'verify-pack', '-v', str(pack_index)).splitlines():
+            fields = line.split()
+            if len(fields) >= 7 and fields[1] in ('blob', 'tree', 'commit'):
+                types.add((data[int(fields[4])] >> 4) & 7)
+    return types
+
+
+@pytest.fixture(scope='module')
+def history_repo(tmp_path_factory):
+    """
+    Repository whose older commits are packed as deltas and whose newest
+    commit is loose.
+    
+    Returns:
+        (repository path, {name: commit id})
+    """
+    repo = tmp_path_factory.mktemp('history')
+    git(repo, 'init', '-q')
+    commits = {
+        'v1': commit(repo, 'Add parser', {'lib/core.py': LEGACY + functions(BASE_NAMES), 'README': 'v1\n'}),
+        'v2': commit(repo, 'Add more helpers', {'lib/core.py': LEGACY + functions(BASE_NAMES + ['extra'])}),
+        'v3': commit(repo, 'Drop legacy parser', {'lib/core.py': functions(BASE_NAMES + ['extra'])}),
+    }
+    git(repo, 'gc', '-q', '--aggressive')
+    commits['v4'] = commit(repo, 'Touch readme', {'README': 'v4\n'})
+    return repo, commits
+
+
+def test_find_git_dir(history_repo):
+    repo, _ = history_repo
+    work_tree, git_dir = find_git_dir(str(repo / 'lib'))
+    assert work_tree == repo.resolve()
+    assert git_dir == repo.resolve() / '.git'
+
+
+def test_fixture_has_packed_deltas_and_loose_objects(history_repo):
+    repo, commits = history_repo
+    assert delta_types(repo) == {OBJ_OFS_DELTA}
+    assert (repo / '.git' / 'objects' / commits['v4'][:2] / commits['v4'][2:]).is_file()
+
+
+def test_every_object_reads_like_git_cat_file(history_repo):
+    repo, _ = history_repo
+    repository = GitRepository(str(repo))
+    for sha, object_type in all_objects(repo):
+        read_type, content = repository.read_object(sha)
+        assert read_type.decode() == object_type
+        expected = subprocess.run(['git', '-C', str(repo), 'cat-file', object_type, sha],
+                                  check=True, capture_output=True).stdout
+        assert content == expected, sha
+
+
+def test_reference_deltas_resolve(tmp_path, history_repo):
+    repo, _ = history_repo
+    copy = tmp_path / 'ref-deltas'
+    shutil.copytree(repo, copy)
+    # Without offset deltas, pack-objects stores every delta by its base's id
+    git(copy, '-c', 'repack.useDeltaBaseOffset=false', 'repack', '-adfq')
+    assert delta_types(copy) == {OBJ_REF_DELTA}
+    
+    repository = GitRepository(str(copy))
+    for sha, object_type in all_objects(copy):
+        assert repository.read_object(sha)[0].decode() == object_type
+
+
+def test_history_and_trees(history_repo):
+    repo, commits = history_repo
+    repository = GitRepository(str(repo))
+    history = repository.history(10)
+    
+    assert [sha for sha, _ in history] == [commits[name] for name in ('v4', 'v3', 'v2', 'v1')]
+    assert history[1][1]['summary'] == 'Drop legacy parser'
+    assert history[0][1]['parents'] == [commits['v3']]
+    
+    files = TreeFiles(repository).files(history[-1][1]['tree'])
+    assert set(files) == {'README', 'lib/core.py'}
+    assert repository.read_object(files['README']) == (b'blob', b'v1\n')
+
+
+def test_missing_object_raises(history_repo):
+    repo, _ = history_repo
+    with pytest.raises(GitError):
+        GitRepository(str(repo)).read_object('0' * 40)
+
+
+def test_not_a_repository(tmp_path):
+    with pytest.raises(GitError):
+        GitRepository(str(tmp_path))
+
+
+def test_history_index_finds_removed_code(history_repo):
+    repo, commits = history_repo
+    core_path = str(repo / 'lib' / 'core.py')
+    index = HistoryIndex()
+    assert index.build('history', str(repo), [core_path, str(repo / 'README')], max_commits=10)
+    
+    assert index.commits_indexed == 4
+    results = index.search(LEGACY.replace('fields', 'parts').replace('buffer', 'current'))
+    assert results
+    file_path, commit_sha, summary, score = results[0]
+    assert file_path == core_path
+    assert commit_sha == commits['v2']    # Newest commit with the version
+    assert summary == 'Add more helpers'
+    assert score >= 0.5
+
+
+def test_head_commit(history_repo, tmp_path):
+    repo, commits = history_repo
+    assert head_commit(str(repo / 'lib')) == commits['v4']
+    assert head_commit(str(tmp_path)) is None
+
+
+@pytest.fixture
+def current_project(tmp_path, monkeypatch):
+    """Repository linked as the current project of a stand-in project linker."""
+    repo = tmp_path / 'current'
+    repo.mkdir()
+    git(repo, 'init', '-q')
+    commit(repo, 'Add parser', {'lib/core.py': LEGACY + functions(BASE_NAMES)})
+    linker = SimpleNamespace(current_project='current', linked_projects={
+        'current': {'path': str(repo), 'files': [str(repo / 'lib' / 'core.py')]}
+    })
+    monkeypatch.setattr(history_index, 'project_linker', linker)
+    return repo
+
+
+def refresh(history):
+    history.refresh_if_needed()
+    assert history.builder.wait(10)
+
+
+def test_new_commits_are_indexed_when_head_moves(current_project):
+    history = ProjectHistory()
+    refresh(history)
+    first_index = history.index
+    assert first_index.commits_indexed == 1
+    
+    refresh(history)  # HEAD unchanged: nothing to build
+    assert history.index is first_index
+    
+    new_head = commit(current_project, 'Drop legacy parser', {'lib/core.py': functions(BASE_NAMES)})
+    refresh(history)
+    assert history.index.head == new_head
+    assert history.index.commits_indexed == 2
+    assert history.search(LEGACY)
+
+
+def test_failed_build_is_retried(current_project, monkeypatch):
+    history = ProjectHistory()
+    real_build = HistoryIndex.build
+    
+    def failing_build(*args, **kwargs):
+        raise GitError("Packfile is corrupt")
+    
+    monkeypatch.setattr(HistoryIndex, 'build', failing_build)
+    refresh(history)
+    assert history.index.project_name is None
+    
+    monkeypatch.setattr(HistoryIndex, 'build', real_build)
+    refresh(history)
+    assert history.index.project_name == 'current'
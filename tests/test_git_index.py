@@ -0,0 +1,133 @@
+"""Tests for reading the git index (core/git_index.py)."""
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from core.git_index import GitIndex, IndexEntry, read_git_index
+from core.git_objects import GitError
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+# Paths sharing long prefixes, so version 4 prefix compression is exercised
+FILES = [
+    'README.md', 'main.py', 'src/app/models/user.py', 'src/app/models/user_profile.py',
+    'src/app/views.py', 'src/lib/util.py', 'tools/build.sh', 'docs/guide/ünïcode.md',
+]
+
+
+def git(repo, *args):
+    subprocess.run(['git', '-C', str(repo), *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, 'init', '-q')
+    for name in FILES:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f'{name}\n')
+    (tmp_path / 'tools' / 'build.sh').chmod(0o755)
+    git(tmp_path, 'add', '-A')
+    return tmp_path
+
+
+def index_of(repo) -> GitIndex:
+    return GitIndex(Path(repo) / '.git' / 'index')
+
+
+def check_entries(repo, index):
+    assert set(index.entries) == set(FILES)
+    for name, entry in index.entries.items():
+        stat = os.stat(repo / name)
+        assert entry.size == stat.st_size
+        assert entry.mtime_seconds == stat.st_mtime_ns // 1_000_000_000
+    assert index.entries['tools/build.sh'].mode == 0o100755
+    assert index.entries['main.py'].mode == 0o100644
+
+
+@pytest.mark.parametrize('version', [2, 4])
+def test_index_versions(repo, version):
+    git(repo, 'update-index', '--index-version', str(version))
+    assert (repo / '.git' / 'index').read_bytes()[4:8] == version.to_bytes(4, 'big')
+    check_entries(repo, index_of(repo))
+
+
+def test_version_4_matches_version_2(repo):
+    git(repo, 'update-index', '--index-version', '2')
+    entries_v2 = index_of(repo).entries
+    git(repo, 'update-index', '--index-version', '4')
+    assert index_of(repo).entries == entries_v2
+
+
+def test_skip_worktree_entries_are_left_out(repo):
+    # Extended flags need (and get) index version 3
+    git(repo, 'update-index', '--skip-worktree', 'main.py')
+    assert (repo / '.git' / 'index').read_bytes()[4:8] == (3).to_bytes(4, 'big')
+    assert 'main.py' not in index_of(repo).entries
+    assert 'README.md' in index_of(repo).entries
+
+
+def test_unmerged_entries_are_left_out(repo):
+    blob = subprocess.run(['git', '-C', str(repo), 'hash-object', '-w', 'main.py'],
+                          check=True, capture_output=True).stdout.decode().strip()
+    subprocess.run(['git', '-C', str(repo), 'update-index', '--index-info'], check=True,
+                   input=f'0 {"0" * 40}\tmain.py\n100644 {blob} 1\tmain.py\n100644 {blob} 2\tmain.py\n'.encode())
+    stages = subprocess.run(['git', '-C', str(repo), 'ls-files', '--stage', 'main.py'],
+                            check=True, capture_output=True).stdout.decode().split('\n')
+    assert [line.split()[2] for line in stages if line] == ['1', '2']
+    assert 'main.py' not in index_of(repo).entries
+
+
+def test_split_index_is_rejected(repo):
+    git(repo, 'update-index', '--split-index')
+    with pytest.raises(GitError):
+        index_of(repo)
+    assert read_git_index(repo / '.git') is None
+
+
+def test_corrupt_or_missing_index(tmp_path):
+    (tmp_path / 'index').write_bytes(b'DIRX' + bytes(40))
+    with pytest.raises(GitError):
+        GitIndex(tmp_path / 'index')
+    (tmp_path / 'index').write_bytes(b'DIRC' + (2).to_bytes(4, 'big') + (5).to_bytes(4, 'big') + bytes(24))
+    with pytest.raises(GitError):
+        GitIndex(tmp_path / 'index')
+    assert read_git_index(tmp_path / 'missing') is None
+
+
+def fake_stat(size, mtime_ns):
+    return SimpleNamespace(st_size=size, st_mtime_ns=mtime_ns)
+
+
+def test_is_modified_compares_size_and_mtime(repo):
+    index = index_of(repo)
+    index.mtime = 2_000 * 1_000_000_000            # Index written well after the entry
+    entry = IndexEntry(1_000, 500, 10, 0o100644)
+    
+    assert not index.is_modified(entry, fake_stat(10, 1_000 * 1_000_000_000 + 500))
+    assert index.is_modified(entry, fake_stat(11, 1_000 * 1_000_000_000 + 500))
+    assert index.is_modified(entry, fake_stat(10, 1_001 * 1_000_000_000 + 500))
+    assert index.is_modified(entry, fake_stat(10, 1_000 * 1_000_000_000 + 501))
+    # Sizes are recorded modulo 2**32
+    assert not index.is_modified(entry._replace(size=10), fake_stat(2 ** 32 + 10, 1_000 * 1_000_000_000 + 500))
+
+
+def test_racily_clean_entries_count_as_modified(repo):
+    index = index_of(repo)
+    entry = IndexEntry(1_000, 500, 10, 0o100644)
+    stat = fake_stat(10, 1_000 * 1_000_000_000 + 500)
+    
+    index.mtime = 1_000 * 1_000_000_000 + 500       # Same instant as the index
+    assert index.is_modified(entry, stat)
+    index.mtime = 1_000 * 1_000_000_000 + 900       # Same second, index later
+    assert not index.is_modified(entry, stat)
+    index.mtime = 1_000 * 1_000_000_000 + 100       # File written after the index
+    assert index.is_modified(entry, stat)
+    index.mtime = 999 * 1_000_000_000
+    assert index.is_modified(entry, stat)
+
@@ -0,0 +1,106 @@
+"""Tests for the per-file n-gram Bloom filters (core/gram_filters.py)."""
+
+import random
+
+import pytest
+
+from core import gram_filters
+from core.gram_filters import GRAM_LENGTH, MAX_QUERY_GRAMS, GramBloomFilters
+
+PATHS = [pytest.param(False, id='python')]
+if gram_filters.HAS_NUMPY:
+    PATHS.append(pytest.param(True, id='numpy'))
+
+
+@pytest.fixture(params=PATHS)
+def use_numpy(request, monkeypatch):
+    monkeypatch.setattr(gram_filters, 'HAS_NUMPY', request.param)
+    return request.param
+
+
+def random_text(rng, length, alphabet='abcdefghijklmnop(){}=;.'):
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+@pytest.fixture(scope='module')
+def files():
+    rng = random.Random(5)
+    return [random_text(rng, rng.randint(20, 3000)) for _ in range(40)] + ['', 'ab', 'naïve_größe=名前']
+
+
+def build(files):
+    filters = GramBloomFilters()
+    for text in files:
+        filters.add_file(text)
+    return filters
+
+
+@pytest.mark.parametrize('window', [GRAM_LENGTH, 12, 40])
+def test_files_sharing_a_window_are_never_rejected(files, use_numpy, window):
+    filters = build(files)
+    rng = random.Random(window)
+    for _ in range(200):
+        file_id = rng.randrange(len(files))
+        text = files[file_id]
+        if len(text) < window:
+            continue
+        start = rng.randrange(len(text) - window + 1)
+        query = random_text(rng, rng.randint(0, 30)) + text[start:start + window] + random_text(rng, rng.randint(0, 30))
+        assert file_id in filters.candidates(query, window)
+
+
+def test_long_queries_are_sampled_without_false_negatives(files, use_numpy):
+    filters = build(files)
+    rng = random.Random(3)
+    window = 300
+    long_files = [file_id for file_id, text in enumerate(files) if len(text) >= window]
+    for file_id in long_files:
+        text = files[file_id]
+        start = rng.randrange(len(text) - window + 1)
+        query = random_text(rng, 2000) + text[start:start + window] + random_text(rng, 2000)
+        assert len(query) - GRAM_LENGTH + 1 > MAX_QUERY_GRAMS * 2   # Sampled
+        assert file_id in filters.candidates(query, window)
+
+
+def test_non_ascii_windows_are_found(files, use_numpy):
+    filters = build(files)
+    assert len(files) - 1 in filters.candidates('xx_größe=名前yy', 8)
+
+
+def test_files_without_the_query_grams_are_rejected(use_numpy):
+    rng = random.Random(9)
+    files = [random_text(rng, 500, alphabet='abcdef') for _ in range(20)]
+    filters = build(files)
+    
+    query = random_text(rng, 200, alphabet='uvwxyz')
+    assert filters.candidates(query, 20) == []
+    
+    # A window shared with one file only keeps (at most a few) others
+    window = files[7][100:140]
+    survivors = filters.candidates('zz' + window + 'zz', len(window))
+    assert 7 in survivors
+    assert len(survivors) <= 2
+
+
+def test_short_windows_cannot_filter(files, use_numpy):
+    filters = build(files)
+    assert filters.candidates('xyz', 3) == list(range(len(files)))
+    assert GramBloomFilters().candidates('abcdefgh', 8) == []
+
+
+def test_numpy_and_python_filters_agree(files, monkeypatch):
+    if not gram_filters.HAS_NUMPY:
+        pytest.skip("NumPy is not installed")
+    with_numpy = build(files)
+    monkeypatch.setattr(gram_filters, 'HAS_NUMPY', False)
+    without_numpy = build(files)
+    assert with_numpy.blocks == without_numpy.blocks
+    assert with_numpy.block_counts == without_numpy.block_counts
+
+
+def test_extended_filters_answer_like_one_set(files, use_numpy):
+    whole = build(files)
+    merged = build(files[:10])
+    merged.extend(build(files[10:]))
+    query = files[3][50:90] + files[25][10:50]
+    assert merged.candidates(query, 16) == whole.candidates(query, 16)
@@ -0,0 +1,164 @@
+"""Tests for gitignore-style rules used during discovery (core/ignore_rules.py)."""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from core.ignore_rules import IgnoreMatcher, IgnoreRules, matcher_for_root, parse_pattern
+
+
+def rules(*lines):
+    return IgnoreRules('/base', lines)
+
+
+@pytest.mark.parametrize('line', ['', '   ', '# comment', '/'])
+def test_blank_lines_and_comments_are_skipped(line):
+    assert parse_pattern(line) is None
+
+
+def test_escaped_markers_are_literal():
+    assert rules('\\#notes').match('#notes', False) is True
+    assert rules('\\!bang').match('!bang', False) is True
+    assert rules('trailing\\ ').match('trailing ', False) is True
+
+
+def test_unanchored_pattern_matches_at_any_depth():
+    assert rules('*.log').match('a.log', False) is True
+    assert rules('*.log').match('deep/er/a.log', False) is True
+    assert rules('*.log').match('a.log.txt', False) is None
+
+
+def test_slash_anchors_pattern_to_its_directory():
+    assert rules('/top.txt').match('top.txt', False) is True
+    assert rules('/top.txt').match('sub/top.txt', False) is None
+    assert rules('sub/top.txt').match('sub/top.txt', False) is True
+    assert rules('sub/top.txt').match('x/sub/top.txt', False) is None
+
+
+def test_directory_only_patterns():
+    assert rules('build/').match('build', True) is True
+    assert rules('build/').match('src/build', True) is True
+    assert rules('build/').match('build', False) is None
+
+
+def test_double_star():
+    assert rules('**/tmp').match('tmp', True) is True
+    assert rules('**/tmp').match('a/b/tmp', False) is True
+    assert rules('docs/**/*.md').match('docs/x.md', False) is True
+    assert rules('docs/**/*.md').match('docs/a/b/x.md', False) is True
+    assert rules('docs/**/*.md').match('other/docs/x.md', False) is None
+    assert rules('out/**').match('out/a/b.js', False) is True
+    assert rules('out/**').match('out', True) is None
+
+
+def test_star_and_question_mark_stay_within_one_component():
+    assert rules('a*z').match('a/z', False) is None
+    assert rules('a?z').match('a/z', False) is None
+    assert rules('a?z').match('abz', False) is True
+    assert rules('[!a]x').match('bx', False) is True
+    assert rules('[!a]x').match('ax', False) is None
+
+
+def test_last_matching_pattern_wins():
+    assert rules('*.log', '!keep.log').match('keep.log', False) is False
+    assert rules('!keep.log', '*.log').match('keep.log', False) is True
+
+
+def test_deeper_rules_take_precedence(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / '.gitignore').write_text('*.log\n')
+    (tmp_path / 'sub' / '.gitignore').write_text('!*.log\n')
+    root = IgnoreMatcher().child(str(tmp_path), os.listdir(tmp_path))
+    sub = root.child(str(tmp_path / 'sub'), os.listdir(tmp_path / 'sub'))
+    
+    assert root.is_ignored(str(tmp_path / 'a.log'), False)
+    assert not sub.is_ignored(str(tmp_path / 'sub' / 'a.log'), False)
+
+
+def test_lumenignore_takes_precedence_over_gitignore(tmp_path):
+    (tmp_path / '.gitignore').write_text('!data.csv\n')
+    (tmp_path / '.lumenignore').write_text('*.csv\n')
+    matcher = IgnoreMatcher().child(str(tmp_path), os.listdir(tmp_path))
+    assert matcher.is_ignored(str(tmp_path / 'data.csv'), False)
+
+
+def test_directory_without_ignore_files_reuses_its_parents_matcher(tmp_path):
+    matcher = IgnoreMatcher()
+    assert matcher.child(str(tmp_path), []) is matcher
+
+
+# Files and patterns checked against git itself
+GITIGNORE_TREE = {
+    '.gitignore': '*.log\n!keep.log\n/top.txt\nbuild/\ndocs/**/*.md\n**/tmp\nout/**\n',
+    'sub/.gitignore': '!*.log\n*.txt\n',
+    'info/exclude': 'secret*\n',
+}
+
+PATHS = [
+    'a.log', 'keep.log', 'x/a.log', 'sub/a.log', 'sub/deep/b.log',
+    'top.txt', 'x/top.txt', 'sub/top.txt', 'sub/notes.md',
+    'build/a.c', 'src/build/b.c', 'src/build.c',
+    'docs/a.md', 'docs/x/y/b.md', 'docs/a.rst', 'other/docs/a.md',
+    'tmp/a.c', 'x/tmp/b.c', 'out/a/b.js', 'outer.js',
+    'secret.key', 'x/secret.env', 'main.py',
+]
+
+
+def walk_ignored(root):
+    """Paths below root the matchers ignore, walking like discovery does."""
+    ignored = set()
+    
+    def visit(directory, matcher):
+        names = os.listdir(directory)
+        matcher = matcher.child(directory, names)
+        for name in names:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            if name in ('.git', '.gitignore'):
+                continue
+            is_dir = os.path.isdir(path)
+            if matcher.is_ignored(path, is_dir):
+                ignored.update(p for p in PATHS if p == relative or p.startswith(relative + '/'))
+            elif is_dir:
+                visit(path, matcher)
+    
+    visit(root, matcher_for_root(root))
+    return ignored
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+def test_decisions_match_git_check_ignore(tmp_path):
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    subprocess.run(['git', 'init', '-q', str(repo)], check=True)
+    for name, content in GITIGNORE_TREE.items():
+        path = repo / '.git' / name if name.startswith('info/') else repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    for name in PATHS:
+        (repo / name).parent.mkdir(parents=True, exist_ok=True)
+        (repo / name).write_text('x\n')
+    
+    result = subprocess.run(['git', '-C', str(repo), 'check-ignore', '--stdin'],
+                            input='\n'.join(PATHS).encode(), capture_output=True)
+    expected = set(result.stdout.decode().split())
+    
+    assert walk_ignored(str(repo)) == expected
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+def test_rules_above_the_project_root_apply(tmp_path):
+    repo = tmp_path / 'repo'
+    (repo / 'pkg').mkdir(parents=True)
+    subprocess.run(['git', 'init', '-q', str(repo)], check=True)
+    (repo / '.gitignore').write_text('pkg/generated/\n*.tmp\n')
+    (repo / '.git' / 'info' / 'exclude').write_text('/pkg/local.cfg\n')
+    
+    root = str(repo / 'pkg')
+    matcher = matcher_for_root(root)
+    assert matcher.is_ignored(os.path.join(root, 'generated'), True)
+    assert matcher.is_ignored(os.path.join(root, 'a.tmp'), False)
+    assert matcher.is_ignored(os.path.join(root, 'local.cfg'), False)
+    assert not matcher.is_ignored(os.path.join(root, 'main.py'), False)
@@ -0,0 +1,75 @@
+"""Tests for the resident per-project index cache (core/index_cache.py)."""
+
+import threading
+
+import pytest
+
+from core.index_cache import ResidentIndexCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResidentIndexCache(str(tmp_path / 'spill'), budget_bytes=100)
+    yield cache
+    cache.wait_for_spills()
+
+
+def test_put_returns_before_evicted_entries_are_written(cache, monkeypatch):
+    release = threading.Event()
+    real_spill = cache._spill
+    
+    def blocked_spill(*args):
+        assert release.wait(5)
+        return real_spill(*args)
+    
+    monkeypatch.setattr(cache, '_spill', blocked_spill)
+    cache.put('context', 'shop', ['shop index'], 80, spill=True)
+    cache.put('context', 'blog', ['blog index'], 80, spill=True)    # Evicts 'shop'
+    
+    assert cache.resident_projects('context') == ['blog']
+    assert not list(cache.spill_path.glob('*.pkl'))
+    
+    release.set()
+    cache.wait_for_spills()
+    assert len(list(cache.spill_path.glob('*.pkl'))) == 1
+
+
+def test_entry_waiting_to_be_spilled_is_taken_back(cache, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(cache, '_spill', lambda *args: release.wait(5))
+    cache.put('context', 'shop', ['shop index'], 80, spill=True)
+    cache.put('context', 'blog', ['blog index'], 80, spill=True)
+    
+    # Handed out from memory, even where disk reads are not allowed
+    assert cache.get('context', 'shop', include_spilled=False) == ['shop index']
+    assert cache.resident_projects('context') == ['shop']
+    release.set()
+
+
+def test_spilled_entry_loads_back_from_disk(cache):
+    cache.put('instant', 'shop', {'tables': [1, 2, 3]}, 80, spill=True)
+    cache.put('instant', 'blog', {'tables': []}, 80, spill=True)
+    cache.wait_for_spills()
+    
+    assert cache.get('instant', 'shop', include_spilled=False) is None
+    assert cache.get('instant', 'shop') == {'tables': [1, 2, 3]}
+    assert cache.spill_hits == 1
+
+
+def test_discard_forgets_spilled_entries(cache):
+    cache.put('instant', 'shop', 'shop index', 80, spill=True)
+    cache.put('instant', 'blog', 'blog index', 80, spill=True)
+    cache.discard('instant', 'shop')
+    cache.wait_for_spills()
+    
+    assert cache.get('instant', 'shop') is None
+    assert not list(cache.spill_path.glob('*.pkl'))
+
+
+def test_current_projects_are_never_evicted(cache):
+    cache.set_current('instant', 'shop')
+    cache.put('instant', 'shop', 'shop index', 80)
+    cache.put('context', 'blog', 'blog index', 80)
+    
+    assert cache.resident_projects('instant') == ['shop']
+    assert cache.resident_projects('context') == ['blog']
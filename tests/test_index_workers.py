@@ -0,0 +1,82 @@
+"""Tests for sharded index construction (core/index_workers.py)."""
+
+import builtins
+import os
+from collections import Counter
+
+import pytest
+
+from core import index_workers
+from core.content_store import project_content_store
+from core.index_workers import (
+    MIN_FILES_FOR_PROCESSES, cache_context_shard, index_instant_shard, map_shards, pool_context,
+    start_worker_pool, text_shard_worker
+)
+
+FILE_COUNT = MIN_FILES_FOR_PROCESSES + 16
+
+
+@pytest.fixture
+def project(tmp_path):
+    paths = []
+    for i in range(FILE_COUNT):
+        path = tmp_path / f'module_{i}.py'
+        path.write_text(
+            f"def compute_total_{i}(orders, discount_rate):\n"
+            f"    subtotal = sum(order.price * order.quantity for order in orders)\n"
+            f"    return subtotal - subtotal * discount_rate + {i}\n"
+        )
+        paths.append(str(path))
+    yield paths
+    project_content_store.clear('workers-test')
+
+
+@pytest.fixture
+def count_opens(monkeypatch):
+    opened = Counter()
+    real_open = builtins.open
+    
+    def counting_open(file, *args, **kwargs):
+        opened[str(file)] += 1
+        return real_open(file, *args, **kwargs)
+    
+    monkeypatch.setattr(builtins, 'open', counting_open)
+    return opened
+
+
+@pytest.fixture
+def worker_pool():
+    if pool_context() is None:
+        pytest.skip("fork is not available")
+    assert start_worker_pool(max_workers=2)
+    yield
+    pool, index_workers._worker_pool = index_workers._worker_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+WORKERS = [index_instant_shard, cache_context_shard, text_shard_worker(8, 5)]
+
+
+@pytest.mark.parametrize('worker', WORKERS)
+def test_each_file_is_opened_once_per_build(project, count_opens, worker):
+    project_content_store.load('workers-test', project)
+    results = list(map_shards(worker, project, max_workers=1))
+    
+    assert sum(len(shard) for shard, _ in results) == FILE_COUNT
+    assert {path: count_opens[path] for path in project} == {path: 1 for path in project}
+
+
+def test_workers_get_the_contents_with_their_shards(project, worker_pool, count_opens):
+    project_content_store.load('workers-test', project)
+    # Workers can't fall back to reading the files from disk
+    for path in project:
+        os.remove(path)
+    
+    records = [record for _, shard in map_shards(index_instant_shard, project, max_workers=2)
+               for record in shard]
+    
+    assert index_workers._worker_pool is not None
+    assert all(record is not None for record in records)
+    assert len(records) == FILE_COUNT
+    assert {path: count_opens[path] for path in project} == {path: 1 for path in project}
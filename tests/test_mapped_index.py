@@ -0,0 +1,107 @@
+"""Tests for mmap-loaded binary index files (core/mapped_index.py)."""
+
+import random
+from array import array
+
+import pytest
+
+from core.bitmap_postings import BitmapPostings
+from core.mapped_index import (
+    MAGIC, MappedArrays, MappedBitmapPostings, MappedIndexFile, MappedStrings, bitmap_postings_sections,
+    mapped_postings, open_index_file, pack_strings, postings_sections, write_index_file
+)
+from core.postings import PostingsIndex
+
+VERSION = 3
+PATHS = ['/work/shop/app.py', '/work/shop/lib/db.sql', '/work/shop/ünïcode.md', '']
+
+
+@pytest.fixture
+def tables():
+    rng = random.Random(4)
+    lines = PostingsIndex()
+    for file_id in range(len(PATHS)):
+        hashes = array('Q', [rng.getrandbits(64) for _ in range(30)] + [12345, 2 ** 64 - 1])
+        lines.extend(hashes, file_id, array('I', range(len(hashes))))
+    lines.freeze()
+    
+    identifiers = BitmapPostings()
+    for file_id in range(40):
+        identifiers.add_file(file_id, {'common_name', f'own_{file_id}'} | ({'dense_name'} if file_id % 3 else set()))
+    identifiers.add_file(40, ['rare_name'])
+    identifiers.freeze()
+    return lines, identifiers
+
+
+@pytest.fixture
+def index_path(tmp_path, tables):
+    lines, identifiers = tables
+    path_offsets, path_data = pack_strings(PATHS)
+    sections = {'paths.offsets': path_offsets, 'paths.data': path_data,
+                'fingerprints.offsets': array('Q', [0, 2, 2, 5, 6]),
+                'fingerprints.values': array('Q', [7, 8, 9, 10, 11, 12])}
+    sections.update(postings_sections('lines', lines))
+    sections.update(bitmap_postings_sections('identifiers', identifiers))
+    path = tmp_path / 'shop.idx'
+    write_index_file(path, VERSION, sections, {'total_files': 41, 'names': ['ß']})
+    return path
+
+
+def test_round_trip_through_mmap(index_path, tables):
+    lines, identifiers = tables
+    mapped = open_index_file(index_path, VERSION)
+    assert mapped is not None
+    assert mapped.metadata == {'total_files': 41, 'names': ['ß']}
+    
+    assert list(MappedStrings(mapped.section('paths.offsets'), mapped.section('paths.data'))) == PATHS
+    
+    mapped_lines = mapped_postings(mapped, 'lines')
+    assert len(mapped_lines) == len(lines)
+    for key in list(lines.keys) + [1, 2 ** 63]:
+        expected, found = lines.lookup(key), mapped_lines.lookup(key)
+        if expected is None:
+            assert found is None
+        else:
+            assert [list(values) for values in found] == [list(values) for values in expected]
+    assert set(mapped_lines.lookup_many(lines.keys)) == set(lines.keys)
+    
+    mapped_identifiers = MappedBitmapPostings(mapped, 'identifiers', identifiers.total_files, identifiers.stop_keys)
+    assert len(mapped_identifiers) == len(identifiers)
+    for key in list(identifiers) + ['common_name', 'missing']:
+        assert (key in mapped_identifiers) == (key in identifiers)
+        assert mapped_identifiers.bitmap(key) == identifiers.bitmap(key)
+        assert mapped_identifiers.file_ids(key) == identifiers.file_ids(key)
+        assert mapped_identifiers.doc_freq(key) == identifiers.doc_freq(key)
+    
+    fingerprints = MappedArrays({path: i for i, path in enumerate(PATHS)},
+                                mapped.section('fingerprints.offsets'), mapped.section('fingerprints.values'))
+    assert [list(fingerprints[path]) for path in PATHS] == [[7, 8], [], [9, 10, 11], [12]]
+
+
+def test_sections_are_aligned(index_path):
+    mapped = MappedIndexFile(index_path)
+    for _, offset, _ in mapped._sections.values():
+        assert offset % 8 == 0
+
+
+def test_stale_version_or_missing_file(index_path, tmp_path):
+    assert open_index_file(index_path, VERSION + 1) is None
+    assert open_index_file(tmp_path / 'missing.idx', VERSION) is None
+
+
+def test_bad_magic_is_rejected(index_path):
+    data = bytearray(index_path.read_bytes())
+    data[:len(MAGIC)] = b'NOTMAGIC'
+    index_path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        MappedIndexFile(index_path)
+    assert open_index_file(index_path, VERSION) is None
+
+
+def test_truncated_files_are_rejected(index_path):
+    data = index_path.read_bytes()
+    for length in (0, 4, 20, 60, len(data) // 2, len(data) - 20):
+        index_path.write_bytes(data[:length])
+        with pytest.raises(ValueError):
+            MappedIndexFile(index_path)
+        assert open_index_file(index_path, VERSION) is None
@@ -0,0 +1,96 @@
+"""Tests for resolving traceback file references (core/path_index.py)."""
+
+import pytest
+
+from core.path_index import (
+    AMBIGUOUS_CONFIDENCE, PathSuffixIndex, extract_path_references, path_components
+)
+
+ROOT = '/home/dev/shop'
+FILES = [
+    f'{ROOT}/app.py',
+    f'{ROOT}/src/models/user.py',
+    f'{ROOT}/src/views/user.py',
+    f'{ROOT}/src/views/__init__.py',
+    f'{ROOT}/src/models/__init__.py',
+    f'{ROOT}/lib/__init__.py',
+    f'{ROOT}/tests/__init__.py',
+    f'{ROOT}/web/src/App.tsx',
+    f'{ROOT}/README.md',
+]
+
+
+@pytest.fixture
+def index():
+    return PathSuffixIndex(FILES)
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/home/dev/shop/src/models/user.py', [f'{ROOT}/src/models/user.py']),   # The project's own path
+    ('src/models/user.py', [f'{ROOT}/src/models/user.py']),                  # Relative
+    ('./src/views/user.py', [f'{ROOT}/src/views/user.py']),
+    ('models/user.py', [f'{ROOT}/src/models/user.py']),
+    ('app.py', [f'{ROOT}/app.py']),
+    ('/ci/build/workspace/src/views/user.py', [f'{ROOT}/src/views/user.py']),  # Another machine's root
+    ('/opt/deploy/app.py', [f'{ROOT}/app.py']),
+    ('C:\\Users\\dev\\shop\\src\\models\\user.py', [f'{ROOT}/src/models/user.py']),  # Windows separators
+    ('src\\views\\user.py', [f'{ROOT}/src/views/user.py']),
+    ('D:/agent/_work/1/s/web/src/app.tsx', [f'{ROOT}/web/src/App.tsx']),      # Case-folded
+])
+def test_resolves_to_the_longest_matching_suffix(index, path, expected):
+    files, matched = index.resolve(path)
+    assert files == expected
+    assert matched >= 1
+
+
+def test_ambiguous_basenames_resolve_to_every_candidate(index):
+    files, matched = index.resolve('/other/checkout/user.py')
+    assert sorted(files) == [f'{ROOT}/src/models/user.py', f'{ROOT}/src/views/user.py']
+    assert matched == 1
+    
+    # A shared directory narrows it down as far as it goes
+    files, matched = index.resolve('/elsewhere/views/__init__.py')
+    assert files == [f'{ROOT}/src/views/__init__.py']
+    assert matched == 2
+
+
+def test_unknown_files_do_not_resolve(index):
+    assert index.resolve('/ci/src/missing.py') == ([], 0)
+    assert index.resolve('') == ([], 0)
+
+
+def test_path_components():
+    assert path_components('C:\\a\\.\\b//c.py') == ['c.py', 'b', 'a']
+    assert path_components('/Src/App.TSX') == ['app.tsx', 'src']
+
+
+def test_extract_references_from_tracebacks_and_compiler_output():
+    text = (
+        'Traceback (most recent call last):\n'
+        '  File "/ci/build/my project/app.py", line 7, in <module>\n'
+        '  File "C:\\build\\src\\models\\user.py", line 12, in load\n'
+        'src/views/user.py:40:5: error: bad type\n'
+        'web\\src\\App.tsx(45,3): error TS2322\n'
+        'src/views/user.py:40:5: error: bad type\n'
+    )
+    assert extract_path_references(text) == [
+        ('/ci/build/my project/app.py', 7),
+        ('C:\\build\\src\\models\\user.py', 12),
+        ('src/views/user.py', 40),
+        ('web\\src\\App.tsx', 45),
+    ]
+
+
+def test_resolve_references(index):
+    text = (
+        'File "/ci/shop/src/models/user.py", line 3\n'
+        'user.py:9\n'
+        '__init__.py:1\n'              # Four candidates: says too little
+        'C:\\ci\\app.py:21\n'
+    )
+    resolved = index.resolve_references(text)
+    assert resolved == {
+        f'{ROOT}/src/models/user.py': (1.0, [3, 9]),
+        f'{ROOT}/src/views/user.py': (AMBIGUOUS_CONFIDENCE, [9]),
+        f'{ROOT}/app.py': (1.0, [21]),
+    }
@@ -0,0 +1,152 @@
+"""Tests for the SQLite catalog of linked projects (core/project_catalog.py)."""
+
+import json
+
+import pytest
+
+from core.project_catalog import ProjectCatalog
+
+PROJECT = {
+    'path': '/work/shop',
+    'linked_at': 1700000000.5,
+    'summaries': {'/work/shop/app.py': {'summary': 'Entry point'}},
+    'files': ['/work/shop/app.py', '/work/shop/lib/db.sql', '/work/shop/README'],
+    'indexed': True,
+    'git': {'head': 'abc123', 'index': [1, 2]},
+}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'projects.db')
+
+
+def test_round_trip_through_the_database(db_path):
+    catalog = ProjectCatalog(db_path)
+    catalog['shop'] = PROJECT
+    catalog.close()
+    
+    reopened = ProjectCatalog(db_path)
+    record = reopened['shop']
+    assert list(reopened) == ['shop']
+    assert record['path'] == PROJECT['path']
+    assert record['linked_at'] == PROJECT['linked_at']
+    assert record['summaries'] == PROJECT['summaries']
+    assert record['files'] == sorted(PROJECT['files'])
+    assert record['indexed'] is True
+    assert record['git'] == PROJECT['git']
+    assert dict(record) == {**PROJECT, 'name': 'shop', 'files': sorted(PROJECT['files'])}
+    assert reopened.file_count('shop') == 3
+    reopened.close()
+
+
+def test_record_writes_go_through(db_path):
+    catalog = ProjectCatalog(db_path)
+    catalog['shop'] = PROJECT
+    record = catalog['shop']
+    record['files'] = ['/work/shop/app.py', '/work/shop/new.py']
+    record['indexed'] = False
+    record['summaries'] = {}
+    del record['git']
+    catalog.close()
+    
+    record = ProjectCatalog(db_path)['shop']
+    assert record['files'] == ['/work/shop/app.py', '/work/shop/new.py']
+    assert record['indexed'] is False
+    assert record['summaries'] == {}
+    assert 'git' not in record
+    with pytest.raises(KeyError):
+        del record['files']
+
+
+def test_in_place_edits_do_not_change_the_record(db_path):
+    catalog = ProjectCatalog(db_path)
+    catalog['shop'] = PROJECT
+    record = catalog['shop']
+    record['files'].append('/work/shop/lost.py')
+    record['summaries']['/work/shop/lost.py'] = {'summary': 'Lost'}
+    record['git']['head'] = 'def456'
+    
+    # What is read matches what a reopened catalog reads
+    assert '/work/shop/lost.py' not in record['files']
+    assert '/work/shop/lost.py' not in record['summaries']
+    assert record['git'] == PROJECT['git']
+    
+    files = record['files']
+    files.append('/work/shop/kept.py')
+    record['files'] = files
+    summaries = record['summaries']
+    summaries['/work/shop/kept.py'] = {'summary': 'Kept'}
+    record['summaries'] = summaries
+    summaries['/work/shop/kept.py']['summary'] = 'Edited after assigning'
+    catalog.close()
+    
+    record = ProjectCatalog(db_path)['shop']
+    assert record['files'] == sorted(PROJECT['files'] + ['/work/shop/kept.py'])
+    assert record['summaries']['/work/shop/kept.py'] == {'summary': 'Kept'}
+    assert '/work/shop/lost.py' not in record['summaries']
+    assert record['git'] == PROJECT['git']
+
+
+def test_file_details_and_languages(db_path):
+    catalog = ProjectCatalog(db_path)
+    catalog['shop'] = PROJECT
+    catalog.update_file_details('shop', [('/work/shop/app.py', 120, 1700000001.0, 'h1')])
+    
+    details = catalog.file_details('shop')
+    assert tuple(details['/work/shop/app.py']) == (120, 1700000001.0, 'h1', 'hash')
+    assert tuple(details['/work/shop/lib/db.sql']) == (None, None, None, 'sql')
+    assert details['/work/shop/README'][3] == 'plain'
+
+
+def test_replacing_a_project_keeps_its_id_and_unchanged_rows(db_path):
+    catalog = ProjectCatalog(db_path)
+    catalog['shop'] = PROJECT
+    record = catalog['shop']
+    project_id = record.project_id
+    catalog.update_file_details('shop', [('/work/shop/app.py', 120, 1700000001.0, 'h1')])
+    
+    catalog['shop'] = {**PROJECT, 'path': '/moved/shop', 'files': ['/work/shop/app.py', '/work/shop/x.py'],
+                       'indexed': False}
+    
+    assert catalog['shop'] is record
+    assert record.project_id == project_id
+    assert record['path'] == '/moved/shop'
+    assert record['indexed'] is False
+    assert record['files'] == ['/work/shop/app.py', '/work/shop/x.py']
+    details = catalog.file_details('shop')
+    assert tuple(details['/work/shop/app.py'])[:3] == (120, 1700000001.0, 'h1')
+    assert set(details) == {'/work/shop/app.py', '/work/shop/x.py'}
+
+
+def test_deleting_a_project_removes_its_rows(db_path):
+    catalog = ProjectCatalog(db_path)
+    catalog['shop'] = PROJECT
+    catalog['blog'] = {'path': '/work/blog', 'files': ['/work/blog/post.md']}
+    del catalog['shop']
+    catalog.close()
+    
+    reopened = ProjectCatalog(db_path)
+    assert list(reopened) == ['blog']
+    count, = reopened._connection.execute("SELECT COUNT(*) FROM files").fetchone()
+    assert count == 1
+    count, = reopened._connection.execute("SELECT COUNT(*) FROM index_state").fetchone()
+    assert count == 0
+
+
+def test_import_json(tmp_path, db_path):
+    json_path = tmp_path / 'projects.json'
+    json_path.write_text(json.dumps({
+        'shop': PROJECT,
+        'blog': {'path': '/work/blog', 'files': ['/work/blog/post.md'], 'linked_at': 1.0},
+    }))
+    
+    catalog = ProjectCatalog(db_path)
+    assert catalog.import_json(str(json_path)) == 2
+    catalog.close()
+    
+    reopened = ProjectCatalog(db_path)
+    assert sorted(reopened) == ['blog', 'shop']
+    assert reopened['shop']['git'] == PROJECT['git']
+    assert reopened['blog']['files'] == ['/work/blog/post.md']
+    assert reopened['blog']['summaries'] == {}
@@ -0,0 +1,55 @@
+"""Tests for discovering and refreshing linked project files (core/project_linker.py)."""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from core.project_linker import FileAnalyzer, ProjectLinker
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+FILES = ['main.py', 'src/models.py', 'src/views.py', 'README.md']
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / 'shop'
+    repo.mkdir()
+    subprocess.run(['git', 'init', '-q', str(repo)], check=True)
+    for name in FILES:
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f'# {name}\n')
+        os.utime(path, (1_000_000_000, 1_000_000_000))  # Older than the index, so not racily clean
+    subprocess.run(['git', '-C', str(repo), 'add', '-A'], check=True)
+    return repo
+
+
+def test_deleted_tracked_file_is_not_discovered(repo):
+    analyzer = FileAnalyzer()
+    assert analyzer.discover_user_files(str(repo)) == sorted(str(repo / name) for name in FILES)
+    
+    os.remove(repo / 'src' / 'views.py')
+    
+    files = analyzer.discover_user_files(str(repo))
+    assert str(repo / 'src' / 'views.py') not in files
+    assert len(files) == len(FILES) - 1
+    
+    deleted = []
+    assert analyzer.modified_files(str(repo), deleted) == []
+    assert deleted == [str(repo / 'src' / 'views.py')]
+
+
+def test_refresh_reports_deleted_files_separately(repo, tmp_path):
+    linker = ProjectLinker(str(tmp_path / 'storage'))
+    assert linker.link_project('shop', str(repo))
+    
+    os.remove(repo / 'main.py')
+    (repo / 'src' / 'models.py').write_text('# models, edited\n')
+    
+    changes = linker.refresh_project('shop')
+    assert changes == {'files': len(FILES) - 1, 'added': 0, 'removed': 1, 'modified': 1, 'deleted': 1}
+    assert str(repo / 'main.py') not in linker.linked_projects['shop']['files']
+    linker.linked_projects.close()
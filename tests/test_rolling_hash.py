@@ -0,0 +1,60 @@
+"""Tests for the 64-bit fingerprints of the detection indexes (core/rolling_hash.py)."""
+
+import pytest
+
+from core.rolling_hash import (
+    MASK64, ROLLING_BASE, WIDTH_SALT, hash_text64, hash_tokens, rolling_window_hashes
+)
+
+WORDS = 'def total ( orders ) : return sum ( order . price for order in orders )'.split()
+NON_ASCII = 'naïve = café ( größe ) ; π = 3.14 ; 名前 = "東京" ; ß ñ é'.split()
+
+
+def hash_from_scratch(values, width):
+    """Hash one window directly from its values, without rolling."""
+    window_hash = 0
+    for value in values:
+        window_hash = (window_hash * ROLLING_BASE + value) & MASK64
+    return window_hash ^ ((width * WIDTH_SALT) & MASK64)
+
+
+@pytest.mark.parametrize('tokens', [WORDS, NON_ASCII], ids=['ascii', 'non-ascii'])
+@pytest.mark.parametrize('width', [1, 2, 3, 4, 7])
+def test_every_window_matches_its_hash_from_scratch(tokens, width):
+    values = hash_tokens(tokens)
+    hashes = rolling_window_hashes(values, width)
+    
+    assert len(hashes) == len(values) - width + 1
+    for i, window_hash in enumerate(hashes):
+        assert window_hash == hash_from_scratch(values[i:i + width], width)
+        assert 0 <= window_hash <= MASK64
+
+
+@pytest.mark.parametrize('width', [len(WORDS) + 1, len(WORDS) * 2, 0, -1])
+def test_windows_longer_than_the_input_give_no_hashes(width):
+    assert rolling_window_hashes(hash_tokens(WORDS), width) == []
+
+
+def test_window_as_long_as_the_input_gives_one_hash():
+    values = hash_tokens(NON_ASCII)
+    assert rolling_window_hashes(values, len(values)) == [hash_from_scratch(values, len(values))]
+
+
+def test_equal_windows_hash_equal_wherever_they_are():
+    values = hash_tokens(['x', 'a', 'b', 'c', 'y', 'a', 'b', 'c'])
+    hashes = rolling_window_hashes(values, 3)
+    assert hashes[1] == hashes[5]
+    assert len(set(hashes)) == len(hashes) - 1
+
+
+def test_widths_are_salted_apart():
+    # The same polynomial salted for another width gives another hash
+    values = hash_tokens(['größe', 'größe'])
+    assert rolling_window_hashes(values, 2)[0] != hash_from_scratch(values, 1)
+
+
+def test_token_hashes_are_cached_and_encoding_aware():
+    cache = {}
+    assert hash_tokens(['名前', 'naïve', '名前'], cache) == [hash_text64('名前'), hash_text64('naïve'), hash_text64('名前')]
+    assert set(cache) == {'名前', 'naïve'}
+    assert hash_text64('naïve') != hash_text64('naive')
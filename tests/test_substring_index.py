@@ -0,0 +1,104 @@
+"""Tests for corpus-level longest-common-substring search (core/substring_index.py)."""
+
+import random
+
+import pytest
+
+from core.substring_index import FILE_SEPARATOR, SubstringIndex
+
+
+def longest_common_substring(a, b):
+    """Length of the longest common substring, by dynamic programming."""
+    best = 0
+    previous = [0] * (len(b) + 1)
+    for i in range(1, len(a) + 1):
+        current = [0] * (len(b) + 1)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                current[j] = previous[j - 1] + 1
+                best = max(best, current[j])
+        previous = current
+    return best
+
+
+def random_text(rng, length, alphabet='abcdefgh(){}=;_'):
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+@pytest.fixture
+def files():
+    rng = random.Random(7)
+    shared = random_text(rng, 90)
+    return {
+        'a.py': random_text(rng, 150) + shared[:40] + random_text(rng, 100),
+        'b.py': random_text(rng, 80) + shared + random_text(rng, 60),
+        'c.py': shared[25:60] + random_text(rng, 200),
+        'd.py': random_text(rng, 30),
+    }
+
+
+def check_match(index, query, file_id, match):
+    """The reported match is really in the query and in the one file."""
+    length, query_start, file_offset = match
+    text = index.file_text(file_id)
+    assert 0 <= file_offset and file_offset + length <= len(text)
+    assert query[query_start:query_start + length] == text[file_offset:file_offset + length]
+    assert FILE_SEPARATOR not in text[file_offset:file_offset + length]
+
+
+def test_finds_the_longest_match_with_each_file(files):
+    index = SubstringIndex(seed_length=8, stride=4)
+    index.build(files)
+    rng = random.Random(11)
+    query = random_text(rng, 20) + files['b.py'][70:190] + random_text(rng, 20)
+    
+    matches = index.longest_common_substrings(query)
+    
+    for file_id, file_path in enumerate(index.file_paths):
+        expected = longest_common_substring(query, files[file_path])
+        if expected >= index.min_match_length:
+            assert matches[file_id][0] == expected, file_path
+            check_match(index, query, file_id, matches[file_id])
+        else:
+            assert file_id not in matches or matches[file_id][0] <= expected
+
+
+def test_matches_never_cross_into_the_next_file(files):
+    index = SubstringIndex(seed_length=8, stride=4)
+    index.build(files)
+    a_end, b_start = files['a.py'][-60:], files['b.py'][:60]
+    
+    # Query spanning the end of one file and the start of the next in the corpus
+    for query in (a_end + b_start, a_end + FILE_SEPARATOR + b_start):
+        matches = index.longest_common_substrings(query)
+        a_id, b_id = index.file_paths.index('a.py'), index.file_paths.index('b.py')
+        assert matches[a_id][0] == longest_common_substring(query, files['a.py'])
+        assert matches[b_id][0] == longest_common_substring(query, files['b.py'])
+        for file_id, match in matches.items():
+            check_match(index, query.replace(FILE_SEPARATOR, ''), file_id, match)
+            assert match[0] <= index.file_lengths[file_id]
+
+
+def test_merged_segments_answer_like_one_index(files):
+    names = sorted(files)
+    whole = SubstringIndex(seed_length=8, stride=4)
+    whole.build(files)
+    segments = []
+    for part in (names[:1], names[1:3], names[3:]):
+        segment = SubstringIndex(seed_length=8, stride=4)
+        segment.build({name: files[name] for name in part})
+        segments.append(segment)
+    merged = SubstringIndex.merge(segments)
+    
+    query = files['c.py'][:50] + files['a.py'][140:200]
+    assert merged.corpus == whole.corpus
+    assert merged.file_paths == whole.file_paths
+    assert merged.longest_common_substrings(query) == whole.longest_common_substrings(query)
+
+
+def test_candidate_files_restrict_the_search(files):
+    index = SubstringIndex(seed_length=8, stride=4)
+    index.build(files)
+    query = files['b.py'][70:190]
+    assert set(index.longest_common_substrings(query)) >= {1, 2}
+    assert set(index.longest_common_substrings(query, candidate_files={2})) == {2}
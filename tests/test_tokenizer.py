@@ -0,0 +1,61 @@
+"""Tests for comment stripping per language family (core/tokenizer.py)."""
+
+import pytest
+
+from core.tokenizer import family_for_path, query_streams, tokenize
+
+
+@pytest.mark.parametrize('family, text, words', [
+    ('c', 'int a = 1; // note\n/* block\n x */ b = 2;', ['int', 'a', '1', 'b', '2']),
+    ('hash', 'x = 1  # note\ny = 2', ['x', '1', 'y', '2']),
+    ('sql', 'select a -- note\nfrom t /* block */', ['select', 'a', 'from', 't']),
+    ('css', 'a { color: red; } /* note */', ['a', 'color', 'red']),
+    ('markup', '<p>hi</p><!-- note -->', ['p', 'hi', 'p']),
+])
+def test_comments_of_the_family_are_skipped(family, text, words):
+    assert tokenize(text, family).words() == words
+
+
+def test_plain_text_keeps_comment_markers():
+    assert tokenize('a # b // c', 'plain').words() == ['a', 'b', 'c']
+    assert tokenize('a # b // c', 'plain').compact() == 'a#b//c'
+
+
+def test_comment_markers_inside_strings_are_kept():
+    assert tokenize('b = "//s";', 'c').compact() == 'b="//s";'
+    assert tokenize('y = "#s"', 'hash').compact() == 'y="#s"'
+
+
+def test_unterminated_block_comment_runs_to_the_end():
+    assert tokenize('a = 1; /* open\nb = 2;', 'c').words() == ['a', '1']
+
+
+def test_other_families_markers_are_code():
+    # '#' is not a comment in C-like code, '//' is not one in Python
+    assert tokenize('#include x // y', 'c').words() == ['include', 'x']
+    assert tokenize('a // b # c', 'hash').words() == ['a', 'b']
+
+
+def test_code_lines_skip_comment_only_lines():
+    assert tokenize('a=1\n# note\nb=2', 'hash').code_lines() == {1: 'a = 1', 3: 'b = 2'}
+
+
+@pytest.mark.parametrize('path, family', [
+    ('src/main.c', 'c'),
+    ('app/view.TSX', 'c'),
+    ('tool.py', 'hash'),
+    ('Dockerfile', 'hash'),
+    ('schema.sql', 'sql'),
+    ('style.scss', 'css'),
+    ('page.html', 'markup'),
+    ('README', 'plain'),
+])
+def test_family_for_path(path, family):
+    assert family_for_path(path) == family
+
+
+def test_query_streams_read_text_under_each_family():
+    streams = query_streams('x = 1  # note', {'hash', 'c'})
+    compact = [stream.compact() for stream in streams]
+    assert compact[0] == 'x=1#note'   # Plain reading first
+    assert 'x=1' in compact
@@ -0,0 +1,109 @@
+"""Tests for winnowed fingerprints (core/winnowing.py)."""
+
+import random
+
+from core.tokenizer import tokenize
+from core.winnowing import WinnowingIndex, merge_line_ranges, winnow
+
+ORIGINAL = '''
+def moving_average(values, width):
+    result = []
+    total = 0
+    for index, value in enumerate(values):
+        total += value
+        if index >= width:
+            total -= values[index - width]
+        result.append(total / min(index + 1, width))
+    return result
+'''
+
+# Same code with other identifiers, spacing and comments
+RENAMED = '''
+def rolling_mean(samples, n):   # smooth the series
+    out = []
+    acc = 0
+    for i, s in enumerate(samples):
+        acc += s
+        if i >= n:
+            acc -= samples[i - n]
+        out.append(acc / min(i + 1, n))
+    return out
+'''
+
+REFORMATTED = '''
+def moving_average( values , width ) :
+    result = [ ]
+    total = 0
+    
+    
+    for index , value in enumerate( values ) :
+        total += value
+        if index >= width :
+            total -= values[ index - width ]
+        result.append( total / min( index + 1 , width ) )
+    return result
+'''
+
+UNRELATED = '''
+class Connection:
+    def __init__(self, host, port=5432):
+        self.host = host
+        self.port = port
+        self.socket = None
+    
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+'''
+
+
+def fingerprints(text: str):
+    return WinnowingIndex().fingerprint(tokenize(text, 'hash'))[0]
+
+
+def test_fingerprints_ignore_whitespace_and_comments():
+    assert fingerprints(REFORMATTED) == fingerprints(ORIGINAL)
+
+
+def test_fingerprints_ignore_identifier_names():
+    assert fingerprints(RENAMED) == fingerprints(ORIGINAL)
+
+
+def test_unrelated_code_shares_no_fingerprints():
+    assert not set(fingerprints(UNRELATED)) & set(fingerprints(ORIGINAL))
+
+
+def test_search_finds_renamed_copy_with_its_lines():
+    index = WinnowingIndex()
+    index.add_file('/p/stats.py', ORIGINAL)
+    index.add_file('/p/db.py', UNRELATED)
+    
+    results = index.search(RENAMED)
+    assert results[0][0] == '/p/stats.py'
+    assert results[0][1] >= 0.9
+    first_line, last_line = results[0][2][0]
+    assert 2 <= first_line <= last_line <= 10
+    assert all(path != '/p/db.py' for path, _, _ in results)
+
+
+def test_winnow_selects_a_fingerprint_in_every_window():
+    rng = random.Random(7)
+    hashes = [rng.randrange(50) for _ in range(300)]
+    window = 5
+    selected = winnow(hashes, window)
+    
+    assert selected == sorted(set(selected))
+    for start in range(len(hashes) - window + 1):
+        chosen = [i for i in selected if start <= i < start + window]
+        assert chosen
+        assert min(hashes[i] for i in chosen) == min(hashes[start:start + window])
+
+
+def test_winnow_short_input_picks_rightmost_minimum():
+    assert winnow([3, 1, 2, 1], 5) == [3]
+    assert winnow([], 5) == []
+
+
+def test_merge_line_ranges_drops_isolated_hits():
+    assert merge_line_ranges([10, 11, 13, 40]) == [(10, 13)]
+    assert merge_line_ranges([40]) == [(40, 40)]
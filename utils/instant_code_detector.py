@@ -3,38 +3,179 @@ Instant code detection system for fast popup feedback.
 Uses hash tables and content fingerprints for sub-millisecond detection.
 """
 
-import hashlib
-import re
+import math
+import pickle
 import os
+from array import array
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, List, Optional, Set, Tuple
 from collections import defaultdict
+from pathlib import Path
 from core.project_linker import project_linker
+from core.content_store import project_content_store, read_text
+from core.deadline import Deadline, MatchResults
+from core.recent_files import recent_files
+from core.bitmap_postings import BitmapPostings, BitSlicedCounter, bitmap_ids
+from core.index_cache import resident_index_cache, safe_file_stem
+from core.match_memo import match_memo, next_generation
+from core.mapped_index import (
+    MappedArrays, MappedBitmapPostings, MappedStrings, bitmap_postings_sections, mapped_postings,
+    open_index_file, pack_strings, postings_sections, write_index_file
+)
+from core.background_build import BackgroundBuilder, BuildTicket, BUILD_IDLE, BUILD_READY
+from core.index_workers import (
+    index_file_for_instant_lookup, index_instant_shard, map_shards, word_sequence_hashes
+)
+from core.path_index import PathSuffixIndex
+from core.postings import PostingsIndex
+from core.rolling_hash import hash_text64
+from core.tokenizer import TokenStream, family_for_path, query_streams, tokenize_file
+from core.winnowing import merge_line_ranges
+
+
+# Bump when the layout of the persisted index changes
+INDEX_FORMAT_VERSION = 6
+
+
+def inverse_document_frequency(doc_freq: int, total_files: int) -> float:
+    """
+    Smoothed IDF weight of a gram found in doc_freq of total_files files.
+    
+    Grams shared by every file (license headers, common imports) weigh
+    close to zero; grams unique to one file weigh the most.
+    """
+    return math.log((total_files + 1) / (doc_freq + 0.5))
+
+
+class LookupTables:
+    """
+    Lookup tables of one project, as published to detection queries.
+    
+    A build fills its own LookupTables and publishes snapshots of it, so
+    queries always read a consistent set of tables while the build goes on.
+    """
+    
+    def __init__(self):
+        """Initialize empty lookup tables."""
+        # Interned file ids used by the postings
+        self.file_paths = []            # file_id -> file_path
+        self.file_ids = {}              # file_path -> file_id
+        
+        self.line_hashes = PostingsIndex()     # hash -> (file ids, line numbers)
+        self.word_sequences = PostingsIndex()  # sequence_hash -> (file ids, start positions)
+        self.identifier_postings = BitmapPostings()  # identifier -> file ids (array or bitmap)
+        self.file_fingerprints = {}     # file_path -> sorted array of line hashes
+        self.families = set()           # Language families of the indexed files
+        self.mapped = None              # MappedIndexFile the tables read from, if loaded
+    
+    def merge_file_record(self, file_path: str, record: Dict[str, object]):
+        """Add one file's index record to the tables."""
+        file_id = self.file_ids.get(file_path)
+        if file_id is None:
+            file_id = len(self.file_paths)
+            self.file_paths.append(file_path)
+            self.file_ids[file_path] = file_id
+            self.families.add(family_for_path(file_path))
+        
+        self.line_hashes.extend(record['line_hashes'], file_id, record['line_numbers'])
+        self.word_sequences.extend(record['sequence_hashes'], file_id, record['sequence_positions'])
+        
+        self.identifier_postings.add_file(file_id, record['identifiers'])
+        
+        # Store file fingerprint
+        self.file_fingerprints[file_path] = array('Q', sorted(set(record['line_hashes'])))
+    
+    def freeze(self):
+        """Sort entries merged since the last freeze into the postings."""
+        self.line_hashes.freeze()
+        self.word_sequences.freeze()
+        self.identifier_postings.freeze(len(self.file_paths))
+    
+    def memory_usage(self) -> int:
+        """Get the approximate bytes held by the tables."""
+        if self.mapped is not None:
+            # Mapped arrays live in the shared page cache; only the path -> id dict is on the heap
+            return sum(len(path) + 64 for path in self.file_ids)
+        
+        return (
+            self.line_hashes.memory_usage() + self.word_sequences.memory_usage() +
+            self.identifier_postings.memory_usage() +
+            sum(len(path) for path in self.file_paths) +
+            sum(len(fingerprint) * 8 for fingerprint in self.file_fingerprints.values())
+        )
+    
+    def snapshot(self) -> 'LookupTables':
+        """
+        Freeze and copy the tables for publishing while merging continues.
+        
+        Postings share their sorted arrays with the copy; only the file list
+        and the identifier postings are duplicated.
+        """
+        copy = LookupTables()
+        copy.file_paths = list(self.file_paths)
+        copy.file_ids = dict(self.file_ids)
+        copy.line_hashes = self.line_hashes.snapshot()
+        copy.word_sequences = self.word_sequences.snapshot()
+        copy.identifier_postings = self.identifier_postings.frozen_copy()
+        copy.families = set(self.families)
+        return copy
 
 
 class InstantCodeDetector:
     """Ultra-fast code detection using multiple lookup strategies."""
     
-    def __init__(self):
-        """Initialize the instant detector."""
+    def __init__(self, storage_path: str = None):
+        """
+        Initialize the instant detector.
+        
+        Args:
+            storage_path: Directory for persisted per-project indexes
+        """
+        if storage_path is None:
+            storage_path = os.path.join(os.path.dirname(__file__), "instant_index")
+        
+        self.storage_path = Path(storage_path)
+        self.storage_path.mkdir(exist_ok=True)
+        
         self.current_project = None
         
-        # Fast lookup tables
-        self.line_hashes = {}           # hash -> (file_path, line_number)
-        self.word_sequences = {}        # sequence_hash -> (file_path, start_pos)
-        self.identifier_files = defaultdict(set)  # identifier -> set of files
-        self.file_fingerprints = {}     # file_path -> set of content hashes
+        # Tables published by the latest build (partial while it runs)
+        self.tables = LookupTables()
+        self.generation = next_generation()  # Taken anew whenever self.tables changes
+        
+        # (mtime, size) each indexed file was built from
+        self.file_stats = {}            # file_path -> (mtime, size)
+        
+        # Index builds run here so the GUI thread never waits for them
+        self.builder = BackgroundBuilder("instant-index")
+        self.max_workers = None         # Worker processes per build (None: one per core)
+        
+        # Path-suffix tries resolving traceback references, per project
+        self.path_indexes = {}          # project_name -> (files list, its length, PathSuffixIndex)
+        
+        # Threads querying the tables of several projects at once
+        self.query_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                             thread_name_prefix="instant-query")
         
         # Performance tracking
         self.last_build_time = 0
         self.total_files = 0
+        self.reindexed_files = 0
     
-    def build_fast_lookup(self, project_name: str) -> bool:
+    def build_fast_lookup(self, project_name: str, ticket: BuildTicket = None) -> bool:
         """
         Build fast lookup tables for instant detection.
         
+        The index saved for the project is loaded first and only files whose
+        mtime or size changed since it was written are re-read and re-hashed,
+        in parallel worker processes for large projects. When run by the
+        background builder, partial tables are published as
+        files are processed.
+        
         Args:
             project_name: Name of the project to index
-            
+            ticket: Ticket of the background build, or None to build synchronously
+        
         Returns:
             True if successful
         """
@@ -42,170 +183,689 @@ class InstantCodeDetector:
             import time
             start_time = time.time()
             
+            if ticket is None:
+                ticket = BuildTicket()
+            
             if project_name not in project_linker.linked_projects:
                 return False
             
             print(f"Building fast lookup tables for project: {project_name}")
             
-            # Clear existing data
-            self.line_hashes.clear()
-            self.word_sequences.clear()
-            self.identifier_files.clear()
-            self.file_fingerprints.clear()
-            
             project_data = project_linker.linked_projects[project_name]
             file_paths = project_data.get("files", [])
-            
-            processed_files = 0
+            file_stats = {}
             
             for file_path in file_paths:
                 try:
+                    stat = os.stat(file_path)
+                    
                     # Skip very large files for instant lookup
-                    if os.path.getsize(file_path) > 500 * 1024:  # 500KB limit for instant lookup
+                    if stat.st_size > 500 * 1024:  # 500KB limit for instant lookup
                         continue
                     
-                    self._index_file_for_instant_lookup(file_path)
-                    processed_files += 1
-                    
-                except Exception as e:
+                    file_stats[file_path] = (stat.st_mtime, stat.st_size)
+                
+                except OSError as e:
                     print(f"Error indexing {file_path} for instant lookup: {e}")
                     continue
             
-            self.current_project = project_name
+            processed_files = len(file_stats)
+            reindexed_files = 0
+            ticket.report(0, processed_files)
+            
+            resident = resident_index_cache.get('instant', project_name)
+            reuse_resident = resident is not None and resident[1] == file_stats
+            saved = None if reuse_resident else self._load_index(project_name)
+            
+            if reuse_resident:
+                # Still in memory from the last time the project was used
+                tables = resident[0]
+            elif saved is not None and saved['file_stats'] == file_stats:
+                # Nothing on disk moved - query the mapped tables as-is
+                tables = saved['tables']
+            else:
+                saved_stats = saved['file_stats'] if saved else {}
+                saved_records = self._load_records(project_name) if saved else {}
+                file_records = {}
+                tables = LookupTables()
+                changed_files = []
+                files_done = 0
+                
+                # Unchanged files: merge the saved records
+                for file_path, file_stat in file_stats.items():
+                    if saved_stats.get(file_path) == file_stat and file_path in saved_records:
+                        record = saved_records[file_path]
+                        file_records[file_path] = record
+                        tables.merge_file_record(file_path, record)
+                        files_done += 1
+                    else:
+                        changed_files.append(file_path)
+                
+                ticket.report(files_done, processed_files)
+                
+                # Changed files: read only them into the shared store (keeping
+                # the project's other stored files), then hash shards of them
+                # in worker processes
+                if changed_files:
+                    project_content_store.load(project_name, changed_files, keep=file_paths)
+                
+                for shard, records in map_shards(index_instant_shard, changed_files, self.max_workers):
+                    if ticket.cancelled:
+                        return False
+                    
+                    for file_path, record in zip(shard, records):
+                        if record is not None:
+                            file_records[file_path] = record
+                            tables.merge_file_record(file_path, record)
+                    
+                    files_done += len(shard)
+                    reindexed_files += len(shard)
+                    ticket.report(files_done, processed_files)
+                    if ticket.should_publish(files_done) and files_done < processed_files:
+                        self._publish(ticket, project_name, tables.snapshot())
+                
+                tables.freeze()
+                self._save_index(project_name, tables, file_stats, file_records)
+            
+            if not ticket.publish(lambda: self._install_tables(project_name, tables, file_stats)):
+                return False
+            
+            # Build the traceback path trie here rather than on the first copy
+            self._path_index(project_name)
+            
             self.total_files = processed_files
+            self.reindexed_files = reindexed_files
             self.last_build_time = time.time() - start_time
             
-            print(f"Fast lookup built: {processed_files} files in {self.last_build_time:.3f}s")
-            print(f"- {len(self.line_hashes)} line hashes")
-            print(f"- {len(self.word_sequences)} word sequences") 
-            print(f"- {len(self.identifier_files)} unique identifiers")
+            print(f"Fast lookup built: {processed_files} files ({reindexed_files} re-indexed) in {self.last_build_time:.3f}s")
+            print(f"- {len(tables.line_hashes)} line hashes")
+            print(f"- {len(tables.word_sequences)} word sequences") 
+            print(f"- {len(tables.identifier_postings)} unique identifiers "
+                  f"({tables.identifier_postings.stop_keys} stop identifiers dropped)")
             
             return True
-            
+        
         except Exception as e:
             print(f"Error building fast lookup: {e}")
             return False
     
-    def _index_file_for_instant_lookup(self, file_path: str):
-        """Index a single file for instant lookup."""
+    def _publish(self, ticket: BuildTicket, project_name: str, tables: LookupTables):
+        """Make partial tables of a running build visible to queries."""
+        def apply():
+            self.current_project = project_name
+            self.tables = tables
+            self.generation = next_generation()
+        
+        ticket.publish(apply)
+    
+    def _install_tables(self, project_name: str, tables: LookupTables, file_stats: Dict[str, Tuple[float, int]]):
+        """Make the finished tables of a build visible to queries and keep them resident."""
+        self.current_project = project_name
+        self.tables = tables
+        self.file_stats = file_stats
+        self.generation = next_generation()
+        
+        # Evicted tables are dropped rather than spilled; the saved index reloads them
+        resident_index_cache.set_current('instant', project_name)
+        resident_index_cache.put('instant', project_name, (tables, file_stats), tables.memory_usage())
+    
+    def start_background_build(self, project_name: str):
+        """
+        Build the lookup tables for a project on a background thread.
+        
+        Returns immediately. Tables still resident from the last time the
+        project was used answer queries at once while the build checks them
+        against the files; otherwise queries answer from the partial tables
+        the build publishes until it completes.
+        
+        Args:
+            project_name: Name of the project to index
+        """
+        self.builder.cancel()  # A superseded build must not publish over the reset
+        self.current_project = project_name
+        resident_index_cache.set_current('instant', project_name)
+        self._clear_tables()
+        
+        resident = resident_index_cache.get('instant', project_name, include_spilled=False)
+        if resident is not None:
+            self.tables, self.file_stats = resident
+            self.generation = next_generation()
+        
+        self.builder.start(project_name, lambda ticket: self.build_fast_lookup(project_name, ticket))
+    
+    def _index_file_for_instant_lookup(self, file_path: str,
+                                       token_cache: Dict[str, int] = None) -> Optional[Dict[str, object]]:
+        """Index a single file for instant lookup (see index_file_for_instant_lookup)."""
+        return index_file_for_instant_lookup(file_path, token_cache)
+    
+    def _word_sequence_hashes(self, words: List[str], include_four: bool,
+                              token_cache: Dict[str, int] = None) -> Tuple[array, array]:
+        """Hash 3-word (and optionally 4-word) windows (see word_sequence_hashes)."""
+        return word_sequence_hashes(words, include_four, token_cache)
+    
+    def _clear_tables(self):
+        """Drop all in-memory lookup tables."""
+        self.tables = LookupTables()
+        self.file_stats = {}
+        self.generation = next_generation()
+    
+    def _index_path(self, project_name: str) -> Path:
+        """Get the path of the persisted lookup tables for a project."""
+        return self.storage_path / f"{safe_file_stem(project_name)}_instant_index.lidx"
+    
+    def _records_path(self, project_name: str) -> Path:
+        """Get the path of the persisted per-file records for a project."""
+        return self.storage_path / f"{safe_file_stem(project_name)}_instant_records.pkl"
+    
+    def _load_pickle(self, path: Path, project_name: str) -> Optional[Dict]:
+        """Load one persisted index file, ignoring missing or stale ones."""
+        if not path.exists():
+            return None
+        
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            if not content.strip():
-                return
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
             
-            lines = content.split('\n')
-            file_hashes = set()
+            if data.get('version') != INDEX_FORMAT_VERSION:
+                return None
             
-            # Index individual lines
-            for line_num, line in enumerate(lines, 1):
-                line_clean = line.strip()
-                if len(line_clean) > 10:  # Only index substantial lines
-                    line_hash = hashlib.md5(line_clean.encode()).hexdigest()[:12]
-                    self.line_hashes[line_hash] = (file_path, line_num)
-                    file_hashes.add(line_hash)
-            
-            # Index word sequences (3-5 word sliding windows)
-            words = re.findall(r'\b\w+\b', content.lower())
-            for i in range(len(words) - 2):
-                # 3-word sequences
-                if i + 2 < len(words):
-                    seq = ' '.join(words[i:i+3])
-                    if len(seq) > 8:  # Only meaningful sequences
-                        seq_hash = hashlib.md5(seq.encode()).hexdigest()[:10]
-                        self.word_sequences[seq_hash] = (file_path, i)
-                
-                # 4-word sequences for better precision
-                if i + 3 < len(words):
-                    seq = ' '.join(words[i:i+4])
-                    seq_hash = hashlib.md5(seq.encode()).hexdigest()[:10]
-                    self.word_sequences[seq_hash] = (file_path, i)
+            return data
+        
+        except Exception as e:
+            print(f"Error loading instant index for {project_name}: {e}")
+            return None
+    
+    def _load_index(self, project_name: str) -> Optional[Dict]:
+        """
+        Map the persisted lookup tables for a project.
+        
+        Nothing is read up front: the postings query the mapped file
+        directly, and only the pages a lookup touches are paged in.
+        
+        Args:
+            project_name: Name of the project
+        
+        Returns:
+            Dictionary with 'file_stats' and 'tables', or None if missing,
+            stale or unreadable
+        """
+        mapped = open_index_file(self._index_path(project_name), INDEX_FORMAT_VERSION)
+        if mapped is None:
+            return None
+        
+        try:
+            metadata = mapped.metadata
+            tables = LookupTables()
+            tables.file_paths = MappedStrings(mapped.section('paths.offsets'), mapped.section('paths.data'))
+            tables.file_ids = {path: file_id for file_id, path in enumerate(tables.file_paths)}
+            tables.line_hashes = mapped_postings(mapped, 'lines')
+            tables.word_sequences = mapped_postings(mapped, 'sequences')
+            tables.identifier_postings = MappedBitmapPostings(
+                mapped, 'identifiers', metadata['identifier_total_files'], metadata['stop_identifiers']
+            )
+            tables.file_fingerprints = MappedArrays(
+                tables.file_ids, mapped.section('fingerprints.offsets'), mapped.section('fingerprints.values')
+            )
+            tables.families = {family_for_path(file_path) for file_path in tables.file_paths}
+            tables.mapped = mapped
             
-            # Index identifiers (function names, variable names, etc.)
-            identifiers = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]{2,}\b', content)
-            for identifier in set(identifiers):  # Unique identifiers only
-                if len(identifier) > 3 and not identifier.lower() in {'true', 'false', 'null', 'undefined'}:
-                    self.identifier_files[identifier.lower()].add(file_path)
+            file_stats = {path: (mtime, size) for path, mtime, size in metadata['file_stats']}
+            return {'file_stats': file_stats, 'tables': tables}
+        
+        except Exception as e:
+            print(f"Error loading instant index for {project_name}: {e}")
+            return None
+    
+    def _load_records(self, project_name: str) -> Dict[str, Dict[str, object]]:
+        """
+        Load the persisted per-file records for a project.
+        
+        Only needed when some files changed and the tables must be re-merged.
+        
+        Args:
+            project_name: Name of the project
+        
+        Returns:
+            Dictionary of file_path -> index record
+        """
+        data = self._load_pickle(self._records_path(project_name), project_name)
+        return data['file_records'] if data else {}
+    
+    def _dump_pickle(self, path: Path, data: Dict):
+        """Write one index file atomically."""
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    
+    def _save_index(self, project_name: str, tables: LookupTables,
+                    file_stats: Dict[str, Tuple[float, int]],
+                    file_records: Dict[str, Dict[str, object]]):
+        """
+        Persist the lookup tables, file stats and per-file records for a project.
+        
+        Args:
+            project_name: Name of the project
+            tables: Frozen lookup tables
+            file_stats: Dictionary of file_path -> (mtime, size) the tables were built from
+            file_records: Dictionary of file_path -> index record
+        """
+        try:
+            self._dump_pickle(self._records_path(project_name), {
+                'version': INDEX_FORMAT_VERSION,
+                'file_records': file_records
+            })
+            path_offsets, path_data = pack_strings(tables.file_paths)
+            fingerprint_offsets = array('Q', [0])
+            fingerprint_values = array('Q')
+            for file_path in tables.file_paths:
+                fingerprint_values.extend(tables.file_fingerprints.get(file_path, ()))
+                fingerprint_offsets.append(len(fingerprint_values))
             
-            # Store file fingerprint
-            self.file_fingerprints[file_path] = file_hashes
+            sections = {
+                'paths.offsets': path_offsets,
+                'paths.data': path_data,
+                'fingerprints.offsets': fingerprint_offsets,
+                'fingerprints.values': fingerprint_values
+            }
+            sections.update(postings_sections('lines', tables.line_hashes))
+            sections.update(postings_sections('sequences', tables.word_sequences))
+            sections.update(bitmap_postings_sections('identifiers', tables.identifier_postings))
             
+            write_index_file(self._index_path(project_name), INDEX_FORMAT_VERSION, sections, {
+                'project': project_name,
+                'file_stats': [[path, mtime, size] for path, (mtime, size) in file_stats.items()],
+                'identifier_total_files': tables.identifier_postings.total_files,
+                'stop_identifiers': tables.identifier_postings.stop_keys
+            })
+        
         except Exception as e:
-            print(f"Error indexing file {file_path}: {e}")
+            print(f"Error saving instant index for {project_name}: {e}")
     
-    def instant_detect_multiple(self, copied_text: str) -> List[Tuple[str, str, float]]:
+    def instant_detect_multiple(self, copied_text: str,
+                                deadline_ms: Optional[float] = None) -> MatchResults:
         """
         Instantly detect multiple possible matches for copied text.
         
+        While a background build is running this answers from the files
+        indexed so far instead of waiting for it. With a deadline, the
+        strategies run cheapest and most confident first and whatever they
+        found when time runs out is returned, flagged as partial. Complete
+        results are remembered, so copying the same text again costs nothing.
+        
         Args:
             copied_text: Text that was copied
+            deadline_ms: Time budget in milliseconds (None: no limit)
+        
+        Returns:
+            MatchResults list of (file_path, file_name, confidence) tuples,
+            sorted by confidence
+        """
+        def detect():
+            return self._detect(copied_text, collect_hits=False, deadline=Deadline(deadline_ms))[0]
+        
+        return self._memoized('instant', copied_text, detect)
+    
+    def instant_detect_spans(self, copied_text: str) -> List[Tuple[str, str, float, List[Tuple[int, int]]]]:
+        """
+        Detect matches for copied text together with the matched line spans.
+        
+        Spans come from the line numbers stored with the line hashes; files
+        matched only by word sequences have their word offsets mapped back
+        to lines.
+        
+        Args:
+            copied_text: Text that was copied
+        
+        Returns:
+            List of (file_path, file_name, confidence, [(first_line, last_line)])
+            tuples sorted by confidence; lines are 1-based and inclusive
+        """
+        def detect():
+            matches, line_hits, sequence_hits = self._detect(copied_text, collect_hits=True)
             
+            results = []
+            for file_path, file_name, confidence in matches:
+                lines = line_hits.get(file_path)
+                if not lines and file_path in sequence_hits:
+                    lines = self._sequence_lines(file_path, sequence_hits[file_path])
+                spans = merge_line_ranges(lines) if lines else []
+                results.append((file_path, file_name, confidence, spans))
+            return results
+        
+        return self._memoized('instant_spans', copied_text, detect)
+    
+    def _memoized(self, stage: str, copied_text: str, detect) -> object:
+        """Reuse the result of a detection stage for the same copy and tables (see MatchMemo)."""
+        return match_memo.memoized(stage, copied_text, detect, project_name=self.current_project,
+                                   generation=self.generation, cacheable=not self.is_building())
+    
+    def _detect(self, copied_text: str, collect_hits: bool,
+                deadline: Deadline = None) -> Tuple[MatchResults, Dict[str, List[int]], Dict[str, List[int]]]:
+        """
+        Score files against copied text with all lookup strategies.
+        
+        Args:
+            copied_text: Text that was copied
+            collect_hits: Whether to collect the positions of matched grams
+            deadline: Deadline to stop at, skipping the remaining strategies
+        
         Returns:
-            List of (file_path, file_name, confidence) tuples, sorted by confidence
+            Tuple of (top matches, file_path -> matched line numbers,
+            file_path -> start word positions of matched sequences)
         """
         if not self.current_project or not copied_text.strip():
-            return []
+            return MatchResults(), {}, {}
         
         # Quick project check
         current_project_linker = project_linker.current_project
         if current_project_linker != self.current_project:
-            return []
+            return MatchResults(), {}, {}
         
         copied_clean = copied_text.strip()
         if len(copied_clean) < 5:
-            return []
+            return MatchResults(), {}, {}
         
-        matches = []
-        file_match_scores = defaultdict(float)  # Track best score per file
+        if deadline is None:
+            deadline = Deadline()
         
-        # Strategy 1: Direct line matching (fastest, highest confidence)
-        lines = copied_clean.split('\n')
-        for line in lines:
-            line_clean = line.strip()
-            if len(line_clean) > 10:
-                line_hash = hashlib.md5(line_clean.encode()).hexdigest()[:12]
-                if line_hash in self.line_hashes:
-                    file_path, line_num = self.line_hashes[line_hash]
-                    file_name = os.path.basename(file_path)
-                    confidence = 0.95
-                    file_match_scores[file_path] = max(file_match_scores[file_path], confidence)
-        
-        # Strategy 2: Word sequence matching (fast, good confidence)
-        words = re.findall(r'\b\w+\b', copied_clean.lower())
-        if len(words) >= 3:
-            for i in range(len(words) - 2):
-                seq = ' '.join(words[i:i+3])
-                if len(seq) > 8:
-                    seq_hash = hashlib.md5(seq.encode()).hexdigest()[:10]
-                    if seq_hash in self.word_sequences:
-                        file_path, pos = self.word_sequences[seq_hash]
-                        confidence = 0.8
-                        file_match_scores[file_path] = max(file_match_scores[file_path], confidence)
-        
-        # Strategy 3: Identifier matching (very fast, lower confidence)
-        identifiers = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]{3,}\b', copied_clean)
-        identifier_scores = defaultdict(int)
-        
-        for identifier in identifiers:
-            if identifier.lower() in self.identifier_files:
-                for file_path in self.identifier_files[identifier.lower()]:
-                    identifier_scores[file_path] += 1
-        
-        # Convert identifier scores to matches
-        for file_path, score in identifier_scores.items():
-            if score >= 2:  # At least 2 identifier matches
-                confidence = min(0.7, 0.3 + (score * 0.1))
-                file_match_scores[file_path] = max(file_match_scores[file_path], confidence)
+        # Read the tables once - a build may publish new tables meanwhile
+        file_match_scores, line_hits, sequence_hits = self._score_tables(
+            self.tables, self.current_project, copied_clean, collect_hits, deadline
+        )
         
         # Convert to list format
+        matches = []
         for file_path, confidence in file_match_scores.items():
             file_name = os.path.basename(file_path)
             matches.append((file_path, file_name, confidence))
         
-        # Sort by confidence (descending) and return top 5
-        matches.sort(key=lambda x: x[2], reverse=True)
-        return matches[:5]
+        # Sort by confidence (descending), recently opened files first on ties, and return top 5
+        recent_ranks = recent_files.ranks()
+        matches.sort(key=lambda x: (x[2], recent_ranks.get(x[0], 0)), reverse=True)
+        return MatchResults(matches[:5], partial=deadline.reached), line_hits, sequence_hits
+    
+    def _score_tables(self, tables: LookupTables, project_name: str, copied_clean: str, collect_hits: bool,
+                      deadline: Deadline) -> Tuple[Dict[str, float], Dict[str, List[int]], Dict[str, List[int]]]:
+        """
+        Run all lookup strategies against one project's tables.
+        
+        Args:
+            tables: Lookup tables to query
+            project_name: Project the tables belong to
+            copied_clean: Stripped copied text
+            collect_hits: Whether to collect the positions of matched grams
+            deadline: Deadline to stop at, skipping the remaining strategies
+        
+        Returns:
+            Tuple of (file_path -> best confidence, file_path -> matched line
+            numbers, file_path -> start word positions of matched sequences)
+        """
+        file_match_scores = defaultdict(float)  # Track best score per file
+        line_hits = defaultdict(list) if collect_hits else None
+        sequence_hits = defaultdict(list) if collect_hits else None
+        
+        # The copy is read with each comment syntax of the indexed files;
+        # files keep their best score over the readings
+        streams = query_streams(copied_clean, tables.families)
+        
+        # Strategies from cheapest and most confident to least
+        strategies = (
+            [lambda: self._match_paths(project_name, copied_clean, file_match_scores, line_hits)] +
+            [lambda stream=stream: self._match_lines(tables, stream, file_match_scores, line_hits)
+             for stream in streams] +
+            [lambda stream=stream: self._match_sequences(tables, stream, file_match_scores, sequence_hits)
+             for stream in streams] +
+            [lambda stream=stream: self._match_identifiers(tables, stream, file_match_scores)
+             for stream in streams]
+        )
+        for strategy in strategies:
+            if deadline.expired():
+                break
+            strategy()
+        
+        return file_match_scores, line_hits, sequence_hits
+    
+    def instant_detect_all_projects(self, copied_text: str,
+                                    deadline_ms: float = None) -> MatchResults:
+        """
+        Detect matches for copied text in every linked project at once.
+        
+        Each project is queried on its own thread, from the tables of the
+        current project, tables still resident, or the project's saved
+        index (mapped, not rebuilt - projects never indexed are skipped).
+        All projects share one deadline: projects that have not answered
+        when it passes are left out and the results are flagged as partial.
+        
+        Args:
+            copied_text: Text that was copied
+            deadline_ms: Time budget in milliseconds (None: no limit)
+        
+        Returns:
+            MatchResults list of (project_name, file_path, file_name, confidence)
+            tuples, sorted by confidence
+        """
+        projects = tuple(project_linker.linked_projects)
+        return match_memo.memoized(
+            'instant_all', copied_text, lambda: self._detect_all_projects(copied_text, projects, deadline_ms),
+            project_name=self.current_project, generation=self.generation, args=projects,
+            cacheable=not self.is_building()
+        )
+    
+    def _detect_all_projects(self, copied_text: str, projects: Tuple[str, ...],
+                             deadline_ms: Optional[float]) -> MatchResults:
+        """Query the given projects in parallel (see instant_detect_all_projects)."""
+        deadline = Deadline(deadline_ms)
+        copied_clean = copied_text.strip()
+        if len(copied_clean) < 5:
+            return MatchResults()
+        
+        futures = {
+            self.query_pool.submit(self._score_project, project_name, copied_clean, deadline): project_name
+            for project_name in projects
+        }
+        
+        remaining_ms = deadline.remaining_ms()
+        done, not_done = wait(futures, timeout=None if remaining_ms is None else remaining_ms / 1000.0)
+        
+        matches = []
+        for future, project_name in futures.items():
+            if future not in done:
+                continue
+            try:
+                file_match_scores = future.result()
+            except Exception as e:
+                print(f"Error detecting matches in {project_name}: {e}")
+                continue
+            for file_path, confidence in file_match_scores.items():
+                matches.append((project_name, file_path, os.path.basename(file_path), confidence))
+        
+        # Sort by confidence (descending); on ties the current project, then
+        # recently opened files come first. Return top 5
+        recent_ranks = recent_files.ranks()
+        matches.sort(key=lambda x: (x[3], x[0] == self.current_project, recent_ranks.get(x[1], 0)),
+                     reverse=True)
+        return MatchResults(matches[:5], partial=bool(not_done) or deadline.reached)
+    
+    def _score_project(self, project_name: str, copied_clean: str, deadline: Deadline) -> Dict[str, float]:
+        """Score the files of one project (see instant_detect_all_projects)."""
+        tables = self._project_tables(project_name)
+        if tables is None:
+            return {}
+        return self._score_tables(tables, project_name, copied_clean, False, deadline)[0]
+    
+    def _project_tables(self, project_name: str) -> Optional[LookupTables]:
+        """
+        Get lookup tables of any linked project without building them.
+        
+        Args:
+            project_name: Name of the project
+        
+        Returns:
+            Lookup tables, or None if the project has no saved index yet
+        """
+        if project_name == self.current_project:
+            return self.tables
+        
+        resident = resident_index_cache.get('instant', project_name, include_spilled=False)
+        if resident is not None:
+            return resident[0]
+        
+        saved = self._load_index(project_name)
+        if saved is None:
+            return None
+        
+        # Mapped tables cost little heap, so keep them for the next copy
+        resident_index_cache.put('instant', project_name, (saved['tables'], saved['file_stats']),
+                                 saved['tables'].memory_usage())
+        return saved['tables']
+    
+    def _match_paths(self, project_name: str, copied_clean: str,
+                     file_match_scores: Dict[str, float], line_hits: Dict[str, List[int]] = None):
+        """Strategy 0: File references of tracebacks and compiler errors (exact, top confidence)."""
+        path_index = self._path_index(project_name)
+        if path_index is None:
+            return
+        
+        for file_path, (confidence, lines) in path_index.resolve_references(copied_clean).items():
+            file_match_scores[file_path] = max(file_match_scores[file_path], confidence)
+            if line_hits is not None:
+                line_hits[file_path].extend(lines)
+    
+    def _path_index(self, project_name: str) -> Optional[PathSuffixIndex]:
+        """
+        Get the path-suffix trie of a project's files, building it when the file list changed.
+        
+        Args:
+            project_name: Name of the project
+        
+        Returns:
+            Trie over the project's files, or None if the project is not linked
+        """
+        project_data = project_linker.linked_projects.get(project_name)
+        if not project_data:
+            return None
+        
+        file_paths = project_data.get("files", [])
+        cached = self.path_indexes.get(project_name)
+        if cached is not None and cached[0] is file_paths and cached[1] == len(file_paths):
+            return cached[2]
+        
+        path_index = PathSuffixIndex(file_paths)
+        self.path_indexes[project_name] = (file_paths, len(file_paths), path_index)
+        return path_index
+    
+    def _match_lines(self, tables: LookupTables, stream: TokenStream,
+                     file_match_scores: Dict[str, float], line_hits: Dict[str, List[int]] = None):
+        """Strategy 1: Direct line matching (fastest, highest confidence)."""
+        line_keys = set()
+        for line_tokens in stream.code_lines().values():
+            if len(line_tokens) > 10:
+                line_keys.add(hash_text64(line_tokens))
+        
+        for file_id, confidence in self._score_postings(tables, tables.line_hashes, line_keys, 0.95, 1,
+                                                        line_hits).items():
+            file_path = tables.file_paths[file_id]
+            file_match_scores[file_path] = max(file_match_scores[file_path], confidence)
+    
+    def _match_sequences(self, tables: LookupTables, stream: TokenStream,
+                         file_match_scores: Dict[str, float], sequence_hits: Dict[str, List[int]] = None):
+        """Strategy 2: Word sequence matching (fast, good confidence)."""
+        words = stream.words()
+        sequence_keys, _ = self._word_sequence_hashes(words, include_four=False)
+        
+        for file_id, confidence in self._score_postings(tables, tables.word_sequences, set(sequence_keys), 0.8, 3,
+                                                        sequence_hits).items():
+            file_path = tables.file_paths[file_id]
+            file_match_scores[file_path] = max(file_match_scores[file_path], confidence)
+    
+    def _match_identifiers(self, tables: LookupTables, stream: TokenStream, file_match_scores: Dict[str, float]):
+        """Strategy 3: Identifier matching (very fast, lower confidence)."""
+        identifier_counts = stream.identifier_counts()
+        
+        # Count matches per file on bitmaps; counts of 4 or more all score 0.7
+        counter = BitSlicedCounter(bits=2)
+        for identifier, count in identifier_counts.items():
+            bitmap = tables.identifier_postings.bitmap(identifier)
+            if bitmap:
+                counter.add(bitmap, min(count, 4))
+        
+        # Convert identifier scores to matches (at least 2 identifier matches)
+        for bitmap, confidence in ((counter.exactly(2), 0.5), (counter.exactly(3), 0.6),
+                                   (counter.at_least(4), 0.7)):
+            for file_id in bitmap_ids(bitmap):
+                file_path = tables.file_paths[file_id]
+                file_match_scores[file_path] = max(file_match_scores[file_path], confidence)
+    
+    def _sequence_lines(self, file_path: str, word_positions: List[int]) -> List[int]:
+        """
+        Map start word positions of matched 3-word sequences to line numbers.
+        
+        Args:
+            file_path: Path to the file
+            word_positions: Word offsets as stored in the word sequence postings
+        
+        Returns:
+            Line numbers covered by the matched sequences
+        """
+        try:
+            stream = tokenize_file(file_path, read_text(file_path))
+        except OSError:
+            return []
+        
+        word_tokens = stream.word_tokens()
+        
+        lines = []
+        for position in word_positions:
+            for word in (position, position + 2):  # First and last word of the window
+                if word < len(word_tokens):
+                    lines.append(stream.line_of(stream.starts[word_tokens[word]]))
+        return lines
+    
+    def _score_postings(self, tables: LookupTables, index: PostingsIndex, keys: Set[int],
+                        max_confidence: float, saturation: int,
+                        hits: Dict[str, List[int]] = None) -> Dict[int, float]:
+        """
+        Score files by the summed IDF of the query grams they contain.
+        
+        A file's confidence is the share of the query's IDF mass it covers,
+        scaled down when the matched grams are too common to be evidence on
+        their own. Evidence saturates at `saturation` grams unique to a file.
+        
+        Args:
+            tables: Tables the index belongs to
+            index: Postings index to query
+            keys: Distinct hashes of the query grams
+            max_confidence: Confidence of a file covering all distinctive grams
+            saturation: Number of unique grams that count as full evidence
+            hits: Optional file_path -> positions dictionary to collect the
+                stored positions of the matched grams into
+        
+        Returns:
+            Dictionary of file_id -> confidence
+        """
+        total_files = max(len(tables.file_paths), 1)
+        file_scores = defaultdict(float)
+        query_weight = 0.0
+        
+        for file_ids, positions in index.lookup_many(keys).values():
+            matched_files = set(file_ids)
+            if hits is not None:
+                for file_id, position in zip(file_ids, positions):
+                    hits[tables.file_paths[file_id]].append(position)
+            idf = inverse_document_frequency(len(matched_files), total_files)
+            query_weight += idf
+            for file_id in matched_files:
+                file_scores[file_id] += idf
+        
+        if query_weight <= 0:
+            return {}
+        
+        evidence = min(1.0, query_weight / (saturation * inverse_document_frequency(1, total_files)))
+        return {
+            file_id: max_confidence * (score / query_weight) * evidence
+            for file_id, score in file_scores.items()
+        }
     
     def instant_detect(self, copied_text: str) -> Optional[Tuple[str, str, float]]:
         """
@@ -213,7 +873,7 @@ class InstantCodeDetector:
         
         Args:
             copied_text: Text that was copied
-            
+        
         Returns:
             Tuple of (file_path, file_name, confidence) or None if no match
         """
@@ -221,40 +881,57 @@ class InstantCodeDetector:
         return matches[0] if matches else None
     
     def is_ready(self) -> bool:
-        """Check if the detector is ready for instant detection."""
+        """Check if the tables of the current project are completely built."""
         return (
             self.current_project is not None and 
-            len(self.line_hashes) > 0 and
-            self.current_project == project_linker.current_project
+            self.current_project == project_linker.current_project and
+            self.builder.state in (BUILD_READY, BUILD_IDLE) and
+            len(self.tables.line_hashes) > 0
         )
     
+    def is_building(self) -> bool:
+        """Check if a background build is running."""
+        return self.builder.is_building()
+    
     def get_stats(self) -> Dict[str, any]:
-        """Get detector statistics."""
+        """Get detector statistics, including the progress of a running build."""
+        tables = self.tables
         return {
             'project': self.current_project,
             'files_indexed': self.total_files,
-            'line_hashes': len(self.line_hashes),
-            'word_sequences': len(self.word_sequences),
-            'identifiers': len(self.identifier_files),
+            'line_hashes': len(tables.line_hashes),
+            'word_sequences': len(tables.word_sequences),
+            'identifiers': len(tables.identifier_postings),
+            'stop_identifiers': tables.identifier_postings.stop_keys,
+            'files_reindexed': self.reindexed_files,
             'build_time_ms': round(self.last_build_time * 1000, 2),
+            'mapped_index_mb': round(tables.mapped.size() / (1024 * 1024), 2) if tables.mapped else 0,
+            'resident_projects': resident_index_cache.resident_projects('instant'),
+            'build_state': self.builder.state,
+            'files_processed': self.builder.files_done,
+            'files_total': self.builder.files_total,
+            'progress': round(self.builder.progress(), 3),
             'ready': self.is_ready()
         }
     
     def refresh_if_needed(self):
-        """Refresh lookup tables if current project changed."""
+        """
+        Refresh lookup tables if current project changed.
+        
+        The rebuild runs in the background, so this returns immediately.
+        """
         current_project_linker = project_linker.current_project
         
         if current_project_linker != self.current_project:
             if current_project_linker:
-                print(f"Project changed to {current_project_linker}, rebuilding fast lookup...")
-                self.build_fast_lookup(current_project_linker)
+                print(f"Project changed to {current_project_linker}, rebuilding fast lookup in background...")
+                self.start_background_build(current_project_linker)
             else:
                 print("No project selected, clearing fast lookup")
+                self.builder.cancel()
                 self.current_project = None
-                self.line_hashes.clear()
-                self.word_sequences.clear()
-                self.identifier_files.clear()
-                self.file_fingerprints.clear()
+                resident_index_cache.set_current('instant', None)
+                self._clear_tables()
 
 
 # Create singleton instance
@@ -1,22 +1,167 @@
 """
 Smart context matching for determining when and what project context to include.
-Uses sliding window algorithm to efficiently match copied code to project files.
+Uses a corpus-level substring index to efficiently match copied code to project files.
+Project files are cached on a background thread; matching uses whatever is cached so far.
 """
 
 import re
 import os
 from typing import Dict, List, Optional, Tuple, Set
 from core.project_linker import project_linker
+from core.content_store import project_content_store, read_text
+from core.background_build import BackgroundBuilder, BuildTicket
+from core.deadline import Deadline, MatchResults
+from core.index_cache import resident_index_cache
+from core.index_workers import cache_context_shard, map_shards, normalize_code
+from core.match_memo import match_memo, next_generation
+from core.recent_files import recent_files
+from core.settings import settings
+from core.substring_index import SubstringIndex
+from core.tokenizer import family_for_path, query_streams, tokenize_file
 from .file_summarizer import project_summarizer
+from .instant_code_detector import instant_detector
+
+# Instant detection confident enough to pick the context file by itself
+INSTANT_CONTEXT_CONFIDENCE = 0.95
+
+# Lines that open a function, class or similar region in common languages
+DEFINITION_PATTERN = re.compile(
+    r'\s*(?:@|'
+    r'(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:def|class|function|interface|struct|impl|fn|func)\b|'
+    r'(?:(?:public|private|protected|static|final|override|virtual)\s+)+[\w<>\[\],\s]*\(|'
+    r'(?:const|let|var)\s+\w+\s*=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*=>|\w+\s*=>))'
+)
+
+
+# Structural code patterns, anchored on their distinctive punctuation:
+# (regex, leading text, word needed before it, closer needed after it).
+# A word before is checked by looking back ('adjacent', or 'spaced' to allow
+# whitespace), which keeps every alternative from starting with \w - those
+# make the regex engine try each one at nearly every position. Checking the
+# closer with one rfind() replaces the lazy `.*?` of the original DOTALL
+# patterns, which rescanned the rest of the text from every opener.
+CODE_STRUCTURE_PATTERNS = [
+    (r'=\s*\w', '=', 'spaced', None),    # Variable assignments
+    (r'\.\w+\(', '.', 'adjacent', None),  # Method calls
+    (r'//', '//', None, None),           # Line comments
+    (r'\(', '(', 'spaced', ')'),          # Function calls
+    (r'\{\s*\w', '{', None, '}'),         # Object literals
+    (r'\[\s*\w', '[', None, ']'),         # Array literals
+    (r'<\w', '<', None, '>'),             # HTML/JSX tags
+    (r'/\*', '/*', None, '*/'),           # Block comments
+]
+
+
+def _word_before(text: str, position: int, allow_space: bool) -> bool:
+    """Check if a word character ends just before a position (optionally before whitespace)."""
+    position -= 1
+    if allow_space:
+        while position >= 0 and text[position].isspace():
+            position -= 1
+    return position >= 0 and (text[position].isalnum() or text[position] == '_')
+
+
+def _literal_alternation(literals: Set[str]) -> str:
+    """
+    Build a regex matching any of the literals, factored into a prefix trie.
+    
+    Shared prefixes are tested once, so each text position costs one step
+    per trie level instead of one per literal.
+    
+    Args:
+        literals: Literal strings to match
+    
+    Returns:
+        Regex source (without capturing groups)
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = {}  # End of a literal
+    
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if '' in node:
+            # A literal ends here; a shorter match is enough to prove presence
+            return ''
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+    
+    return build(trie)
+
+
+def _indent_width(line: str) -> int:
+    """Get the indentation width of a line (tabs count as four spaces)."""
+    expanded = line.expandtabs(4)
+    return len(expanded) - len(expanded.lstrip())
+
+
+def find_enclosing_region(lines: List[str], first: int, last: int,
+                          max_region_lines: int) -> Tuple[int, int]:
+    """
+    Widen a matched line span to the function or class that contains it.
+    
+    The region starts at the nearest definition line above the span that is
+    indented less than the span (plus its decorators) and ends where
+    indentation returns to the definition's level, keeping a closing brace.
+    
+    Args:
+        lines: Lines of the file
+        first: Index of the first matched line (0-based)
+        last: Index of the last matched line (0-based, inclusive)
+        max_region_lines: Regions longer than this are not widened
+    
+    Returns:
+        (first, last) indexes of the region, or the span itself when no
+        enclosing definition fits
+    """
+    anchor = next((lines[i] for i in range(first, last + 1) if lines[i].strip()), '')
+    anchor_indent = _indent_width(anchor)
+    
+    start = None
+    for i in range(first, max(-1, first - max_region_lines), -1):
+        line = lines[i]
+        if line.strip() and DEFINITION_PATTERN.match(line) and not line.lstrip().startswith('@'):
+            if i == first or _indent_width(line) < anchor_indent:
+                start = i
+                break
+    if start is None:
+        return first, last
+    
+    while start > 0 and lines[start - 1].lstrip().startswith('@'):
+        start -= 1  # Keep decorators with their definition
+    
+    definition_indent = _indent_width(lines[start])
+    end = len(lines) - 1
+    for j in range(max(last, start) + 1, len(lines)):
+        line = lines[j]
+        if line.strip() and _indent_width(line) <= definition_indent:
+            end = j if line.lstrip()[0] in '}])' else j - 1
+            break
+    
+    while end > last and not lines[end].strip():
+        end -= 1
+    
+    if end - start + 1 > max_region_lines:
+        return first, last
+    return start, max(end, last)
 
 
 class CodeMatcher:
-    """Efficient code matching using sliding window algorithm."""
+    """Efficient code matching using a corpus-level substring index."""
     
     def __init__(self):
         """Initialize the code matcher."""
-        self.normalized_files = {}  # Cache normalized file contents
+        self.substring_segments = []  # Substring indexes over batches of cached files
+        self.generation = next_generation()  # Taken anew whenever the segments change
+        self.cached_families = set()  # Language families of the cached files
+        self.min_match_length = SubstringIndex().min_match_length
         self.last_project = None
+        self.cache_builder = BackgroundBuilder("context-cache")
+        self.max_workers = None  # Worker processes per build (None: one per core)
         self.code_indicators = {
             # Programming keywords
             'keywords': {
@@ -37,6 +182,28 @@ class CodeMatcher:
                 '.css', '.html', '.json', '.xml', '.yaml', '.yml', '.md'
             }
         }
+        self.compile_code_indicators()
+    
+    def compile_code_indicators(self):
+        """
+        Compile all code indicators into one pattern over lowercased text.
+        
+        Call again after changing `code_indicators`. Keywords, symbols and
+        extensions share a prefix trie tried before the structural patterns,
+        so any match that is not a literal is structural and is told apart
+        by its leading text.
+        """
+        literals = set()
+        for group in ('keywords', 'symbols', 'extensions'):
+            literals.update(indicator.lower() for indicator in self.code_indicators[group])
+        
+        alternatives = [_literal_alternation(literals)]
+        alternatives.extend(regex for regex, _, _, _ in CODE_STRUCTURE_PATTERNS)
+        self._indicator_pattern = re.compile('|'.join(alternatives))
+        self._indicator_literals = literals
+        self._structure_rules = {
+            lead: (word_before, closer) for _, lead, word_before, closer in CODE_STRUCTURE_PATTERNS
+        }
     
     def normalize_code(self, text: str) -> str:
         """
@@ -44,129 +211,197 @@ class CodeMatcher:
         
         Args:
             text: Raw code text
-            
+        
         Returns:
             Normalized text for comparison
         """
-        if not text:
-            return ""
-        
-        # Convert to lowercase
-        normalized = text.lower()
-        
-        # Remove all whitespace and newlines
-        normalized = re.sub(r'\s+', '', normalized)
+        return normalize_code(text)
+    
+    def query_forms(self, query_text: str) -> List[str]:
+        """
+        Normalize a query once per way the cached files could read it.
         
-        # Remove common variations that don't affect logic
-        normalized = re.sub(r'["\']', '', normalized)  # Remove quotes
-        normalized = re.sub(r';+', '', normalized)     # Remove semicolons
-        normalized = re.sub(r',+', '', normalized)     # Remove commas in some contexts
+        Args:
+            query_text: Text to search for
         
-        return normalized
+        Returns:
+            Distinct normalized forms, one per comment syntax that changes the text
+        """
+        forms = []
+        for stream in query_streams(query_text, self.cached_families):
+            form = stream.compact(drop_separators=True)
+            if form not in forms:
+                forms.append(form)
+        return forms
     
-    def has_code_indicators(self, text: str) -> bool:
+    def has_code_indicators(self, text: str, min_indicators: int = 1) -> bool:
         """
         Check if text contains programming-related content.
         
+        All indicators are found in a single pass of one compiled pattern,
+        which stops as soon as enough of them were seen.
+        
         Args:
             text: Text to check
-            
+            min_indicators: Indicator occurrences needed to call the text code
+        
         Returns:
             True if text appears to contain code
         """
-        text_lower = text.lower()
-        
-        # Check for programming keywords
-        for keyword in self.code_indicators['keywords']:
-            if keyword in text_lower:
-                return True
-        
-        # Check for code symbols
-        for symbol in self.code_indicators['symbols']:
-            if symbol in text:
-                return True
-        
-        # Check for file extensions
-        for ext in self.code_indicators['extensions']:
-            if ext in text_lower:
-                return True
-        
-        # Check for code patterns with regex
-        code_patterns = [
-            r'\w+\s*\(.*?\)',           # Function calls
-            r'\w+\s*=\s*\w+',           # Variable assignments
-            r'{\s*\w+.*?}',             # Object literals
-            r'\[\s*\w+.*?\]',           # Array literals
-            r'<\w+.*?/?>',              # HTML/JSX tags
-            r'\w+\.\w+\(',              # Method calls
-            r'\/\/.*|\/\*.*?\*\/',      # Comments
-        ]
-        
-        for pattern in code_patterns:
-            if re.search(pattern, text, re.DOTALL):
+        text = text.lower()  # One copy is cheaper than a case-insensitive scan
+        last_closer = {}  # closer -> offset of its last occurrence
+        found = 0
+        position = 0
+        
+        while True:
+            match = self._indicator_pattern.search(text, position)
+            if match is None:
+                return False
+            
+            matched = match.group()
+            if matched not in self._indicator_literals:
+                rules = self._structure_rules
+                word_before, closer = rules.get(matched[:2]) or rules[matched[0]]
+                
+                if closer is not None and closer not in last_closer:
+                    last_closer[closer] = text.rfind(closer)
+                if ((word_before and not _word_before(text, match.start(), word_before == 'spaced')) or
+                        (closer is not None and last_closer[closer] < match.end())):
+                    # Not code after all; indicators may still overlap it
+                    position = match.start() + 1
+                    continue
+            
+            found += 1
+            if found >= min_indicators:
                 return True
-        
-        return False
+            position = match.end()
     
-    def cache_project_files(self, project_name: str) -> bool:
+    def cache_project_files(self, project_name: str, ticket: BuildTicket = None) -> bool:
         """
         Cache normalized content for all project files.
         
+        A cache still resident from the last time the project was used is
+        reused when no file changed since. Otherwise shards of files are
+        normalized and indexed in worker processes and merged into segments
+        of growing size; when run by the background builder each segment is
+        published as soon as it is ready.
+        
         Args:
             project_name: Name of the project to cache
-            
+            ticket: Ticket of the background build, or None to cache synchronously
+        
         Returns:
             True if successful
         """
         try:
+            if ticket is None:
+                ticket = BuildTicket()
+            
             if project_name not in project_linker.linked_projects:
                 return False
             
             project_data = project_linker.linked_projects[project_name]
-            self.normalized_files = {}
+            file_paths = project_data["files"]
+            file_stats = self._file_stats(file_paths)
             
-            for file_path in project_data["files"]:
-                try:
-                    # Skip very large files for performance
-                    file_size = os.path.getsize(file_path)
-                    if file_size > 1024 * 1024:  # > 1MB
-                        print(f"Skipping large file for context matching: {os.path.basename(file_path)} ({file_size:,} bytes)")
-                        continue
-                    
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    normalized = self.normalize_code(content)
-                    if normalized:  # Only cache non-empty files
-                        self.normalized_files[file_path] = {
-                            'normalized': normalized,
-                            'original': content,
-                            'size': len(content)
-                        }
-                        
-                except Exception as e:
-                    print(f"Error caching file {file_path}: {e}")
-                    continue
+            resident = resident_index_cache.get('context', project_name)
+            if resident is not None and resident[1] == file_stats:
+                # Still cached (in memory or spilled) from the last time the project was used
+                segments = resident[0]
+                ticket.report(len(file_paths), len(file_paths))
+                return ticket.publish(lambda: self._install_cache(project_name, segments))
             
-            self.last_project = project_name
-            print(f"Cached {len(self.normalized_files)} files for project '{project_name}'")
-            return True
+            segments = []
+            pending = []  # Shard indexes not yet merged into a published segment
+            files_done = 0
+            
+            # Bring the project's stored contents up to date (unchanged files aren't read again)
+            project_content_store.load(project_name, file_paths)
+            
+            # Workers normalize shards of files and index each shard
+            for shard, shard_index in map_shards(cache_context_shard, file_paths, self.max_workers):
+                if ticket.cancelled:
+                    return False
+                
+                pending.append(shard_index)
+                
+                files_done += len(shard)
+                ticket.report(files_done, len(file_paths))
+                if ticket.should_publish(files_done) and files_done < len(file_paths):
+                    segments = segments + [SubstringIndex.merge(pending)]
+                    pending = []
+                    ticket.publish(lambda: self._install_cache(project_name, segments))
+            
+            if pending:
+                segments = segments + [SubstringIndex.merge(pending)]
             
+            if not ticket.publish(lambda: self._install_cache(project_name, segments)):
+                return False
+            
+            resident_index_cache.put(
+                'context', project_name, (segments, file_stats),
+                sum(segment.memory_usage() for segment in segments), spill=True
+            )
+            
+            print(f"Cached {self.cached_file_count()} files for project '{project_name}'")
+            return True
+        
         except Exception as e:
             print(f"Error caching project files: {e}")
             return False
     
+    def _file_stats(self, file_paths: List[str]) -> Dict[str, Tuple[float, int]]:
+        """Get the (mtime, size) of each readable file, to validate a resident cache."""
+        file_stats = {}
+        for file_path in file_paths:
+            try:
+                stat = os.stat(file_path)
+                file_stats[file_path] = (stat.st_mtime, stat.st_size)
+            except OSError:
+                continue
+        return file_stats
+    
+    def _install_cache(self, project_name: str, segments: List[SubstringIndex]):
+        """Make cached files visible to matching."""
+        self.last_project = project_name
+        self.substring_segments = segments
+        resident_index_cache.set_current('context', project_name)
+        self.generation = next_generation()
+        self.cached_families = {
+            family_for_path(file_path) for segment in segments for file_path in segment.file_paths
+        }
+    
+    def cached_file_count(self) -> int:
+        """Get the number of files available for matching."""
+        return sum(len(segment) for segment in self.substring_segments)
+    
+    def start_background_cache(self, project_name: str):
+        """
+        Cache a project's files on a background thread.
+        
+        Args:
+            project_name: Name of the project to cache
+        """
+        self.cache_builder.cancel()  # A superseded build must not publish over the reset
+        
+        # Match against the project's resident cache, if any, while the build validates it
+        resident = resident_index_cache.get('context', project_name, include_spilled=False)
+        self._install_cache(project_name, resident[0] if resident is not None else [])
+        self.cache_builder.start(project_name, lambda ticket: self.cache_project_files(project_name, ticket))
+    
     def sliding_window_match(self, query_normalized: str, file_normalized: str, 
                            min_window: int = 10, max_window: int = 100) -> float:
         """
         Use sliding window to find best match between query and file.
         
+        Only used for queries too short for the substring index anchors.
+        
         Args:
             query_normalized: Normalized query text
             file_normalized: Normalized file content
             min_window: Minimum window size
             max_window: Maximum window size
-            
+        
         Returns:
             Best similarity score (0.0 to 1.0)
         """
@@ -200,50 +435,202 @@ class CodeMatcher:
         
         return min(1.0, best_score)
     
-    def find_matching_files(self, query_text: str, threshold: float = 0.2) -> List[Tuple[str, float]]:
+    def find_matching_files(self, query_text: str, threshold: float = 0.2,
+                            deadline_ms: Optional[float] = None) -> MatchResults:
         """
-        Find files that match the query text using sliding window algorithm.
+        Find files that match the query text using the substring index.
+        
+        A file's score is the length of the longest substring it shares with
+        the query relative to the query length, with a bonus when that
+        substring starts at the beginning of the query.
         
         Args:
             query_text: Text to search for
             threshold: Minimum similarity threshold
-            
+            deadline_ms: Time budget in milliseconds (None: no limit)
+        
         Returns:
-            List of (file_path, similarity_score) tuples, sorted by score
+            MatchResults list of (file_path, similarity_score) tuples, sorted
+            by score; partial if the deadline stopped the search
+        """
+        spans = self.find_matching_spans(query_text, threshold, deadline_ms)
+        return MatchResults([(file_path, similarity) for file_path, similarity, _ in spans],
+                            partial=spans.partial)
+    
+    def find_matching_spans(self, query_text: str, threshold: float = 0.2,
+                            deadline_ms: Optional[float] = None) -> MatchResults:
+        """
+        Find matching files together with the line span of each match.
+        
+        Scored like find_matching_files; the matched substring's offset in
+        the normalized file is mapped back to original line numbers. With a
+        deadline, recently opened files are visited first and the best
+        matches found when time runs out are returned, flagged as partial.
+        
+        Args:
+            query_text: Text to search for
+            threshold: Minimum similarity threshold
+            deadline_ms: Time budget in milliseconds (None: no limit)
+        
+        Returns:
+            MatchResults list of (file_path, similarity_score,
+            [(first_line, last_line)]) tuples sorted by score; lines are
+            1-based and inclusive
         """
         current_project = project_linker.current_project
         if not current_project:
-            return []
+            return MatchResults()
+        
+        # Complete matches against the same caches are reused (see MatchMemo)
+        return match_memo.memoized(
+            'context_spans', query_text, lambda: self._find_matching_spans(query_text, threshold, deadline_ms),
+            project_name=current_project, generation=self.generation, args=(threshold,),
+            cacheable=self.last_project == current_project and not self.cache_builder.is_building()
+        )
+    
+    def _find_matching_spans(self, query_text: str, threshold: float,
+                             deadline_ms: Optional[float]) -> MatchResults:
+        """Match the query against the cached files (see find_matching_spans)."""
+        deadline = Deadline(deadline_ms)
+        
+        current_project = project_linker.current_project
         
         # Check if query contains code first (fast check)
         if not self.has_code_indicators(query_text):
-            return []
-        
-        query_normalized = self.normalize_code(query_text)
-        if not query_normalized or len(query_normalized) < 5:
-            return []
+            return MatchResults()
         
-        # Cache files if needed (lazy loading)
-        if self.last_project != current_project or not self.normalized_files:
+        # Cache files if needed (lazy loading, in the background)
+        if self.last_project != current_project:
             print(f"Lazy loading project files for context matching: {current_project}")
-            if not self.cache_project_files(current_project):
-                return []
+            self.start_background_cache(current_project)
         
-        matches = []
+        if self.cache_builder.is_building():
+            print(f"Project files still caching ({self.cache_builder.progress():.0%}) - matching cached files only")
         
-        for file_path, file_data in self.normalized_files.items():
-            similarity = self.sliding_window_match(query_normalized, file_data['normalized'])
+        # Read once - the background build may publish new caches meanwhile
+        segments = self.substring_segments
+        
+        # Match every reading of the query, keeping each file's best match
+        best = {}  # file_path -> (similarity, location)
+        for query_normalized in self.query_forms(query_text):
+            if len(query_normalized) < 5:
+                continue
             
-            if similarity >= threshold:
-                matches.append((file_path, similarity))
+            for file_path, similarity, location in self._match_normalized(
+                    segments, query_normalized, threshold, deadline):
+                if file_path not in best or similarity > best[file_path][0]:
+                    best[file_path] = (similarity, location)
+        
+        matches = [(file_path, similarity, location) for file_path, (similarity, location) in best.items()]
         
         # Sort by similarity score (descending)
         matches.sort(key=lambda x: x[1], reverse=True)
         
-        print(f"Found {len(matches)} code matches for query (top 3 returned)")
+        print(f"Found {len(matches)} code matches for query (top 3 returned)"
+              f"{' - stopped at deadline' if deadline.reached else ''}")
+        
+        # Return top 3 matches, locating each match in the original file
+        results = MatchResults(partial=deadline.reached)
+        for file_path, similarity, location in matches[:3]:
+            spans = [self._normalized_range_to_lines(file_path, *location)] if location else []
+            results.append((file_path, similarity, [span for span in spans if span]))
+        return results
+    
+    def _match_normalized(self, segments: List[SubstringIndex], query_normalized: str,
+                          threshold: float, deadline: Deadline) -> List[Tuple[str, float, Optional[Tuple[int, int]]]]:
+        """
+        Score cached files against one normalized form of a query.
+        
+        Args:
+            segments: Substring indexes to search
+            query_normalized: Normalized query text
+            threshold: Minimum similarity threshold
+            deadline: Deadline to stop at
+        
+        Returns:
+            List of (file_path, similarity_score, (offset, length) of the
+            match in the normalized file, or None) tuples
+        """
+        matches = []
+        query_len = len(query_normalized)
         
-        # Return top 3 matches
-        return matches[:3]
+        if query_len < self.min_match_length:
+            # Too short for the anchors - fall back to scanning each file whose
+            # n-gram filter admits a shared substring as long as sliding_window_match
+            # needs (the whole query, or its smallest 10-character window)
+            window = min(query_len, 10)
+            candidates = {}  # file_path -> (segment, file_id)
+            for segment in segments:
+                for file_id in segment.gram_filters.candidates(query_normalized, window):
+                    candidates[segment.file_paths[file_id]] = (segment, file_id)
+            
+            # Recently opened files first, so a search cut short has looked there
+            for file_path in recent_files.prioritize(candidates):
+                if deadline.expired():
+                    break
+                
+                segment, file_id = candidates[file_path]
+                file_normalized = segment.file_text(file_id)
+                similarity = self.sliding_window_match(query_normalized, file_normalized)
+                
+                if similarity >= threshold:
+                    offset = file_normalized.find(query_normalized)
+                    location = (offset, query_len) if offset >= 0 else None
+                    matches.append((file_path, similarity, location))
+        else:
+            # A file can only reach the threshold through a shared substring of
+            # this length (with the start bonus); no reported match is shorter
+            # than a seed, so the filters only rule out files it would drop
+            required_length = int(threshold * query_len / 1.2)
+            
+            for segment in segments:
+                if deadline.expired():
+                    break
+                
+                window = max(segment.seed_length, required_length)
+                candidate_files = set(segment.gram_filters.candidates(query_normalized, window))
+                if not candidate_files:
+                    continue
+                common = segment.longest_common_substrings(query_normalized, candidate_files, deadline=deadline)
+                
+                for file_id, (length, query_start, file_offset) in common.items():
+                    similarity = length / query_len
+                    if query_start == 0:  # Bonus for matching from start
+                        similarity *= 1.2
+                    similarity = min(1.0, similarity)
+                    
+                    if similarity >= threshold:
+                        matches.append((segment.file_paths[file_id], similarity, (file_offset, length)))
+        
+        return matches
+    
+    def _normalized_range_to_lines(self, file_path: str, start: int,
+                                   length: int) -> Optional[Tuple[int, int]]:
+        """
+        Map a range of a file's normalized text to original line numbers.
+        
+        The file is tokenized again and the range is located through the
+        source offsets of the tokens it covers.
+        
+        Args:
+            file_path: Path to the file
+            start: Offset of the range in the normalized text
+            length: Length of the range
+        
+        Returns:
+            (first_line, last_line) tuple, or None if the file cannot be read
+        """
+        try:
+            stream = tokenize_file(file_path, read_text(file_path))
+        except OSError:
+            return None
+        
+        source_range = stream.compact_range_to_source(start, length, drop_separators=True)
+        if source_range is None:
+            return None
+        
+        source_start, source_end = source_range
+        return stream.line_of(source_start), stream.line_of(max(source_start, source_end - 1))
 
 
 class SmartContextManager:
@@ -260,13 +647,26 @@ class SmartContextManager:
         Args:
             message: User's message
             user_requested_context: Whether user explicitly requested project context
-            
+        
         Returns:
             Tuple of (include_context, context_type, context_content)
             - include_context: Whether to include any context
             - context_type: "full_project" | "specific_file" | "none"
             - context_content: The actual context string to include
         """
+        # The same message asked again reuses its decision (see MatchMemo)
+        current_project = project_linker.current_project
+        matcher = self.code_matcher
+        return match_memo.memoized(
+            'context', message, lambda: self._decide_context(message, user_requested_context),
+            project_name=current_project, generation=matcher.generation,
+            args=(user_requested_context, instant_detector.generation),
+            cacheable=(matcher.last_project == current_project and not matcher.cache_builder.is_building()
+                       and not instant_detector.is_building())
+        )
+    
+    def _decide_context(self, message: str, user_requested_context: bool) -> Tuple[bool, str, str]:
+        """Decide what context to include (see should_include_context)."""
         current_project = project_linker.current_project
         
         print(f"Smart context check - Project: {current_project}, User requested: {user_requested_context}")
@@ -282,28 +682,61 @@ class SmartContextManager:
             context_content = self._build_full_project_context(current_project)
             return True, "full_project", context_content
         
-        # Case 2: Check for code matches
+        # Case 2: Check for code matches, first in the instant index, whose
+        # line hashes give the matched spans without rescanning the file
         print("Checking for code matches...")
-        matching_files = self.code_matcher.find_matching_files(message)
+        instant_match = self._instant_match(message, current_project)
+        if instant_match is not None:
+            file_path, _, confidence, spans = instant_match
+            print(f"Found instant match: {os.path.basename(file_path)} (confidence: {confidence:.2f}, lines: {spans})")
+            context_content = self._build_file_context(file_path, confidence, spans)
+            return True, "specific_file", context_content
+        
+        matching_files = self.code_matcher.find_matching_spans(message)
         if matching_files:
             # Found code match - include specific file context
             best_match = matching_files[0]  # Highest scoring match
-            file_path, similarity = best_match
-            print(f"Found code match: {os.path.basename(file_path)} (similarity: {similarity:.2f})")
-            context_content = self._build_file_context(file_path, similarity)
+            file_path, similarity, spans = best_match
+            print(f"Found code match: {os.path.basename(file_path)} (similarity: {similarity:.2f}, lines: {spans})")
+            context_content = self._build_file_context(file_path, similarity, spans)
             return True, "specific_file", context_content
         
         # Case 3: No match and no user request - no context
         print("No code matches found - no context added")
         return False, "none", ""
     
+    def _instant_match(self, message: str,
+                       current_project: str) -> Optional[Tuple[str, str, float, List[Tuple[int, int]]]]:
+        """
+        Get the best instant detection match for a message, if it is confident and located.
+        
+        Args:
+            message: User's message
+            current_project: Name of the current project
+        
+        Returns:
+            (file_path, file_name, confidence, spans) tuple, or None if the
+            instant index is not ready for the project or has no confident
+            match with line spans
+        """
+        if instant_detector.current_project != current_project or instant_detector.is_building():
+            return None
+        try:
+            matches = instant_detector.instant_detect_spans(message)
+        except Exception as e:
+            print(f"Error in instant span detection: {e}")
+            return None
+        if matches and matches[0][2] >= INSTANT_CONTEXT_CONFIDENCE and matches[0][3]:
+            return matches[0]
+        return None
+    
     def _build_full_project_context(self, project_name: str) -> str:
         """
         Build full project context including structure and all summaries.
         
         Args:
             project_name: Name of the project
-            
+        
         Returns:
             Full project context string
         """
@@ -326,17 +759,27 @@ class SmartContextManager:
         
         return context
     
-    def _build_file_context(self, file_path: str, similarity: float) -> str:
+    def _build_file_context(self, file_path: str, similarity: float,
+                            spans: List[Tuple[int, int]] = None) -> str:
         """
         Build context for a specific matched file.
         
+        When the matched line spans are known only the enclosing regions are
+        included; otherwise the file summary or the start of the file is.
+        
         Args:
             file_path: Path to the matched file
             similarity: Similarity score of the match
-            
+            spans: Matched (first_line, last_line) spans, 1-based and inclusive
+        
         Returns:
             File-specific context string
         """
+        if spans:
+            region_context = self._build_region_context(file_path, similarity, spans)
+            if region_context:
+                return region_context
+        
         file_name = os.path.basename(file_path)
         context = f"Matched File Context (similarity: {similarity:.2f}):\n"
         context += "=" * 50 + "\n\n"
@@ -354,8 +797,7 @@ class SmartContextManager:
         else:
             # Include truncated file content if no summary
             try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
+                content = read_text(file_path)
                 
                 if len(content) > 2000:  # Truncate large files
                     content = content[:2000] + f"\n\n... [File truncated - showing first 2000 characters of {len(content):,} total]"
@@ -363,13 +805,65 @@ class SmartContextManager:
                 context += f"File: {file_name}\n"
                 context += f"Path: {file_path}\n"
                 context += f"Content:\n{content}\n\n"
-                
+            
             except Exception as e:
                 context += f"File: {file_name}\n"
                 context += f"Path: {file_path}\n"
                 context += f"Error reading file: {str(e)}\n\n"
         
         return context
+    
+    def _build_region_context(self, file_path: str, similarity: float,
+                              spans: List[Tuple[int, int]]) -> Optional[str]:
+        """
+        Build context from the functions/regions enclosing the matched spans.
+        
+        Each span is widened to its enclosing definition and padded with the
+        configured margin; overlapping regions are merged.
+        
+        Args:
+            file_path: Path to the matched file
+            similarity: Similarity score of the match
+            spans: Matched (first_line, last_line) spans, 1-based and inclusive
+        
+        Returns:
+            Region context string, or None if the file cannot be read
+        """
+        try:
+            lines = read_text(file_path).split('\n')
+        except OSError as e:
+            print(f"Error reading {file_path} for region context: {e}")
+            return None
+        
+        margin = settings.context_margin_lines
+        max_region_lines = settings.context_max_region_lines
+        
+        regions = []
+        for first_line, last_line in sorted(spans):
+            first = min(max(first_line - 1, 0), len(lines) - 1)
+            last = min(max(last_line - 1, first), len(lines) - 1)
+            start, end = find_enclosing_region(lines, first, last, max_region_lines)
+            start, end = max(0, start - margin), min(len(lines) - 1, end + margin)
+            
+            if regions and start <= regions[-1][1] + 1:
+                regions[-1][1] = max(regions[-1][1], end)
+            else:
+                regions.append([start, end])
+        
+        file_name = os.path.basename(file_path)
+        context = f"Matched Region Context (similarity: {similarity:.2f}):\n"
+        context += "=" * 50 + "\n\n"
+        context += f"File: {file_name}\n"
+        context += f"Path: {file_path}\n"
+        context += f"Lines: {', '.join(f'{start + 1}-{end + 1}' for start, end in regions)} of {len(lines)}\n\n"
+        
+        for i, (start, end) in enumerate(regions):
+            if i:
+                context += "    ...\n"
+            for line_num in range(start, end + 1):
+                context += f"{line_num + 1:>5} | {lines[line_num]}\n"
+        
+        return context + "\n"
 
 
 # Create singleton instance